@@ -0,0 +1,90 @@
+"""Measure control server throughput and latency with many concurrent clients.
+
+Usage: python benchmarks/bench_control_server.py [clients] [commands_per_client]
+"""
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import system_log
+from control_client import ControlClient
+from control_server import ControlServer
+from file_system import FileSystem
+from kernel.kernel import Kernel
+from process_manager import ProcessManager
+
+COMMAND = "log_level"  # Cheap, and prints one line, so the protocol dominates
+
+
+def run_clients(clients, commands, mode):
+    """Return (seconds, per-request latencies) for ``clients`` threads sending ``commands`` each."""
+    latencies = []
+    lock = threading.Lock()
+    start_line = threading.Barrier(clients + 1)
+
+    def client_thread():
+        with ControlClient() as client:
+            start_line.wait()
+            mine = []
+            if mode == "one at a time":
+                for _ in range(commands):
+                    started = time.perf_counter()
+                    client.call(COMMAND)
+                    mine.append(time.perf_counter() - started)
+            elif mode == "pipelined":
+                client.pipeline([COMMAND] * commands)
+            else:
+                for start in range(0, commands, 1000):
+                    client.batch([COMMAND] * min(1000, commands - start))
+            with lock:
+                latencies.extend(mine)
+
+    threads = [threading.Thread(target=client_thread) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_line.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    system_log.set_level("warning")
+    original_directory = os.getcwd()
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_manager = ProcessManager()
+            server = ControlServer(Kernel(cpus=1), FileSystem(), process_manager)
+            server.start()
+        print(f"{clients} clients x {commands} commands")
+        for mode in ("one at a time", "pipelined", "batched (1000)"):
+            seconds, latencies = run_clients(clients, commands, mode)
+            line = f"{mode:16} {seconds:8.3f}s  ({clients * commands / seconds:10,.0f} commands/s)"
+            if latencies:
+                latencies.sort()
+                line += (f"  latency p50 {statistics.median(latencies) * 1000:.2f}ms, "
+                         f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms, max {latencies[-1] * 1000:.2f}ms")
+            print(line)
+        with contextlib.redirect_stdout(io.StringIO()):
+            server.stop()
+            process_manager.shutdown()
+    finally:
+        os.chdir(original_directory)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Run a synthetic trace through every CPU scheduling policy, then scale one policy across CPU counts.
+
+Usage: python benchmarks/bench_cpu_scheduler.py [processes] [load] [max_cpus]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kernel.scheduler import POLICIES, simulate, workload
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    load = float(sys.argv[2]) if len(sys.argv) > 2 else 0.9
+    max_cpus = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    print(f"{processes} processes at {load:.0%} load on 1 CPU")
+    print(f"{'policy':8} {'throughput':>10} {'turnaround':>11} {'p99':>9} {'wait':>9} {'p99':>9} "
+          f"{'response':>9} {'switches':>10} {'sim time':>9}")
+    for name in POLICIES:
+        result = simulate(name, workload(processes, load))
+        print(f"{name:8} {result['throughput']:10.4f} {result['avg_turnaround']:11.2f} "
+              f"{result['p99_turnaround']:9.2f} {result['avg_wait']:9.2f} {result['p99_wait']:9.2f} "
+              f"{result['avg_response']:9.2f} {result['context_switches']:10} {result['seconds']:8.2f}s")
+
+    # Per-CPU queues with round-robin placement, so imbalance builds up unless idle CPUs steal work
+    print(f"\ncfs at {load:.0%} load per CPU, 10% of processes pinned to one CPU, round-robin placement")
+    print(f"{'cpus':>4} {'stealing':>8} {'turnaround':>11} {'p99 wait':>9} {'utilization':>11} "
+          f"{'min-max core':>13} {'migrations':>10} {'sim time':>9}")
+    cpus = 1
+    while cpus <= max_cpus:
+        for stealing in (False, True):
+            trace = workload(processes, load, cpus=cpus, pinned_fraction=0.1)
+            result = simulate("cfs", trace, cpus=cpus, stealing=stealing, placement="round_robin")
+            cores = [core["utilization"] for core in result["per_cpu"]]
+            print(f"{cpus:4} {'yes' if stealing else 'no':>8} {result['avg_turnaround']:11.2f} "
+                  f"{result['p99_wait']:9.2f} {result['utilization']:11.1%} "
+                  f"{min(cores):6.1%}-{max(cores):6.1%} {result['migrations']:10} {result['seconds']:8.2f}s")
+        cpus *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare indexed find/grep with walking and reading the whole tree.
+
+Usage: python benchmarks/bench_fs_index.py [files]
+"""
+import contextlib
+import fnmatch
+import io
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_system import FileSystem
+from fs_index import INDEX_FILE, FileIndex
+
+
+def walk_find(root, pattern):
+    return [os.path.join(path, name) for path, _, names in os.walk(root) for name in fnmatch.filter(names, pattern)]
+
+
+def walk_grep(root, word):
+    regex = re.compile(word, re.IGNORECASE)
+    matches = 0
+    for path, _, names in os.walk(root):
+        for name in names:
+            if name == INDEX_FILE:
+                continue
+            with open(os.path.join(path, name), errors="replace") as file:
+                matches += sum(1 for line in file if regex.search(line))
+    return matches
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    vocabulary = [f"word{index}" for index in range(20000)]
+    root = tempfile.mkdtemp()
+    try:
+        for index in range(files):
+            directory = os.path.join(root, f"dir{index % 50}", f"sub{index % 7}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"file{index}.txt"), "w") as file:
+                for _ in range(50):
+                    file.write(" ".join(rng.choice(vocabulary) for _ in range(10)) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            file_system = FileSystem()
+        file_system.current_directory = root
+        index = FileIndex(file_system)
+        print(f"{files} files")
+        print(f"{'build index':24} {timed(index.refresh)[0]:8.3f}s")
+        print(f"{'save index':24} {timed(index.save)[0]:8.3f}s")
+        print(f"{'refresh, no changes':24} {timed(index.refresh)[0]:8.3f}s")
+        print(f"{'reload index':24} {timed(lambda: FileIndex(file_system).load())[0]:8.3f}s")
+        for label, function in (("find: walk", lambda: len(walk_find(root, "file1*.txt"))),
+                                ("find: index", lambda: len(index.find("file1*.txt"))),
+                                ("grep: walk + read", lambda: walk_grep(root, "word12345")),
+                                ("grep: index", lambda: len(list(index.grep("word12345"))))):
+            seconds, count = timed(function)
+            print(f"{label:24} {seconds:8.3f}s  ({count} matches)")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare FileSystem.list_files with the old listdir-plus-stat listing on a large directory.
+
+Usage: python benchmarks/bench_list_files.py [entries]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_system import FileSystem
+
+
+def listdir_listing(directory):
+    """The original listing: listdir, then isfile, getsize and isdir per entry."""
+    file_list = []
+    for item in os.listdir(directory):
+        file_list.append(item)
+        item_path = os.path.join(directory, item)
+        if os.path.isfile(item_path):
+            print(f"- File: {item} ({os.path.getsize(item_path)} bytes)")
+        elif os.path.isdir(item_path):
+            print(f"- Directory: {item}")
+    return file_list
+
+
+def timed(function):
+    with contextlib.redirect_stdout(io.StringIO()):  # Keep the listing itself out of the timing
+        start = time.perf_counter()
+        function()
+        return time.perf_counter() - start
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directory = tempfile.mkdtemp()
+    try:
+        for index in range(entries):
+            with open(os.path.join(directory, f"file{index:07d}.txt"), "w") as file:
+                file.write("x" * (index % 100))
+        with contextlib.redirect_stdout(io.StringIO()):
+            uncached = FileSystem()
+            cached = FileSystem(cache_listings=True)
+        uncached.current_directory = cached.current_directory = directory
+        print(f"{entries} entries")
+        runs = [
+            ("listdir + stat (original)", lambda: listdir_listing(directory)),
+            ("scandir, unsorted", lambda: uncached.list_files(sort=None)),
+            ("scandir, sorted by name", lambda: uncached.list_files()),
+            ("scandir, page 1 by size", lambda: uncached.list_files(sort="size", limit=50)),
+            ("cache, first call", lambda: cached.list_files(sort=None)),
+            ("cache, repeat call", lambda: cached.list_files(sort=None)),
+            ("cache, page 1 by size", lambda: cached.list_files(sort="size", limit=50)),
+        ]
+        for label, function in runs:
+            print(f"{label:28} {timed(function):8.3f}s")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare synchronous, queued and quiet logging while threads add and remove tasks.
+
+Each add/remove cycle on the shared ProcessManager logs four records, two
+of them while holding its lock. Output goes to a stand-in terminal that
+takes ``write_latency_us`` per write.
+
+Usage: python benchmarks/bench_logging.py [cycles per thread] [threads] [write_latency_us]
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import system_log
+from process_manager import ProcessManager
+
+
+class SlowTerminal:
+    """A stdout that takes a fixed time per write, like a terminal that is being scrolled."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        time.sleep(self.latency)  # Like real I/O, this releases the GIL while it waits
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def churn(manager, prefix, cycles):
+    for index in range(cycles):
+        name = f"{prefix}-{index}"
+        manager.add_task(name, 3600, 1)
+        manager.remove_task(name)
+
+
+def run(mode, cycles, threads, latency):
+    terminal = SlowTerminal(latency)
+    with contextlib.redirect_stdout(terminal):
+        system_log.configure(quiet=mode == "quiet", asynchronous=mode != "synchronous")
+        manager = ProcessManager(total_memory=threads * cycles)
+        dropped = system_log.DROPPED.snapshot()
+        workers = [threading.Thread(target=churn, args=(manager, f"t{number}", cycles)) for number in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        system_log.shutdown()  # Wait for the writer thread to drain the queue
+        drained = time.perf_counter() - start
+        manager.shutdown()
+    return elapsed, drained, terminal.writes, system_log.DROPPED.snapshot() - dropped
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1e6
+    directory = tempfile.mkdtemp()
+    previous = os.getcwd()
+    os.chdir(directory)  # ProcessManager keeps its task log in the working directory
+    try:
+        print(f"{threads} threads x {cycles} add/remove cycles, {latency * 1e6:g}us per terminal write")
+        print(f"{'mode':12} {'cycles/s':>10} {'workers':>9} {'drained':>9} {'written':>9} {'dropped':>9}")
+        for mode in ("synchronous", "queued", "quiet"):
+            elapsed, drained, writes, dropped = run(mode, cycles, threads, latency)
+            print(f"{mode:12} {threads * cycles / elapsed:10.0f} {elapsed:8.3f}s {drained:8.3f}s "
+                  f"{writes:9} {dropped:9}")
+    finally:
+        os.chdir(previous)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
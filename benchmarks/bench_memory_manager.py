@@ -0,0 +1,69 @@
+"""Compare the block allocators in MemoryManager with the old dict-sum accounting.
+
+Usage: python benchmarks/bench_memory_manager.py [allocations]
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memory_manager import MemoryManager, STRATEGIES
+
+
+class DictMemoryManager:
+    """The original accounting: a dict of sizes summed on every allocation."""
+
+    def __init__(self, total_memory):
+        self.total_memory = total_memory
+        self.allocated_memory = {}
+
+    def allocate_memory(self, task_name, memory_size):
+        if sum(self.allocated_memory.values()) + memory_size > self.total_memory:
+            return False
+        self.allocated_memory[task_name] = memory_size
+        return True
+
+    def deallocate_memory(self, task_name):
+        self.allocated_memory.pop(task_name, None)
+
+
+def run(manager, sizes, churn):
+    """Allocate every size, freeing a random earlier task with probability ``churn``."""
+    rng = random.Random(1)
+    live = []
+    start = time.perf_counter()
+    for index, size in enumerate(sizes):
+        if live and rng.random() < churn:
+            victim = live.pop(rng.randrange(len(live)))
+            manager.deallocate_memory(victim)
+        name = f"task{index}"
+        if manager.allocate_memory(name, size):
+            live.append(name)
+    return time.perf_counter() - start
+
+
+def main():
+    allocations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(0)
+    sizes = [rng.randint(1, 16) for _ in range(allocations)]
+    total_memory = sum(sizes)  # Room for everything, so every run does the same work
+    print(f"{allocations} allocations, 30% churn, {total_memory}MB address space")
+    candidates = [("dict (original)", lambda: DictMemoryManager(total_memory))]
+    candidates += [(strategy, lambda s=strategy: MemoryManager(total_memory, s)) for strategy in STRATEGIES]
+    for label, factory in candidates:
+        manager = factory()
+        with contextlib.redirect_stdout(io.StringIO()):  # Keep per-call prints out of the timing
+            elapsed = run(manager, sizes, churn=0.3)
+        detail = ""
+        if isinstance(manager, MemoryManager):
+            external, internal = manager.fragmentation()
+            detail = f"  fragmentation {external:.1%} external / {internal:.1%} internal"
+        print(f"{label:16} {elapsed:8.3f}s  {allocations / elapsed:12,.0f} allocs/s{detail}")
+
+
+if __name__ == "__main__":
+    main()
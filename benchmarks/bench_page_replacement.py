@@ -0,0 +1,27 @@
+"""Compare page replacement policies on synthetic access traces.
+
+Usage: python benchmarks/bench_page_replacement.py [accesses] [frames]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from virtual_memory import POLICIES, TRACES, simulate
+
+
+def main():
+    accesses = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    tasks, pages = 8, 64  # 512 pages of virtual memory, overcommitted 2x at 256 frames
+    print(f"{accesses} accesses, {tasks} tasks x {pages} pages, {frames} frames")
+    for trace_name, trace in TRACES.items():
+        for policy in POLICIES:
+            stats = simulate(policy, frames, trace(tasks, pages, accesses), tasks, pages)
+            print(f"{trace_name:11} {policy:6} hit ratio {stats['hit_ratio']:6.1%}  "
+                  f"fault rate {stats['fault_rate']:6.1%}  swap-outs {stats['swap_outs']:7}  "
+                  f"{stats['accesses_per_second']:12,.0f} accesses/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measure how many commands per second the shell runs from a script.
+
+Usage: python benchmarks/bench_shell.py [commands]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import system_log
+from file_system import FileSystem
+from kernel.kernel import Kernel
+from process_manager import ProcessManager
+from shell import Shell
+
+
+def scripts(commands):
+    """Yield (label, script lines) for each workload."""
+    yield "dispatch only (noop)", ["noop"] * commands
+    files = []
+    for index in range(commands // 4):
+        files += [f"create_file f{index}.txt", f"write_file f{index}.txt line {index}",
+                  f"read_file f{index}.txt", f"delete f{index}.txt"]
+    yield "file commands", files
+    tasks = []
+    for index in range(commands // 2):
+        tasks += [f"add task{index} 60 0", f"remove task{index}"]
+    yield "task commands", tasks
+    yield "one line, ';'-separated", ["; ".join(["noop"] * 100)] * (commands // 100)
+    yield "background (&) + wait", ["noop &"] * (commands // 10) + ["wait"]
+
+
+def main():
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    system_log.set_level("warning")
+    original_directory = os.getcwd()
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            process_manager = ProcessManager(total_memory=commands)
+            shell = Shell(Kernel(cpus=1), FileSystem(), process_manager)
+        shell.register_command("noop", lambda args: None)
+        for label, lines in scripts(commands):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                count = shell.run_script(line + "\n" for line in lines)
+                seconds = time.perf_counter() - start
+            print(f"{label:26} {count:8} commands {seconds:8.3f}s  ({count / seconds:12,.0f} commands/s)")
+        process_manager.shutdown()
+    finally:
+        os.chdir(original_directory)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
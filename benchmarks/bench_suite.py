@@ -0,0 +1,326 @@
+"""Benchmark the OS's hot paths and compare the results with a saved baseline.
+
+Covers ProcessManager.scheduler, MemoryManager allocation churn,
+InterruptHandler.trigger_interrupt throughput and latency, and
+FileSystem.list_files/read_file on a large tree. Each benchmark repeats its
+measurement and reports percentiles. Inputs come from fixed seeds, so runs
+are comparable from one commit to the next.
+
+Usage: python benchmarks/bench_suite.py [--quick] [--only NAME,...] [--repeat N]
+                                        [--output results.json] [--baseline baseline.json] [--threshold 0.10]
+
+Save one run's --output as the baseline. Later runs with --baseline print the
+change in each median and exit with status 1 if any is slower by more than
+the threshold.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_system import FileSystem
+from interrupt_handler import InterruptHandler
+from memory_manager import STRATEGIES, MemoryManager
+from process_manager import ProcessManager
+
+PERCENTILES = (50, 90, 99)
+
+
+def summarize(samples, operations=1):
+    """Summarize timing samples in seconds; ``operations`` is the work done per sample."""
+    ordered = sorted(samples)
+    count = len(ordered)
+    summary = {
+        "samples": count,
+        "mean": sum(ordered) / count,
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}"] = ordered[min(count - 1, percentile * count // 100)]
+    if operations > 1:
+        summary["operations"] = operations
+        summary["ops_per_second"] = operations / summary["p50"] if summary["p50"] else 0.0
+    return summary
+
+
+@contextlib.contextmanager
+def quiet():
+    """Send the per-operation prints of the code under test to /dev/null."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def scratch_directory():
+    """Run in a fresh temporary directory, so logs and state files stay out of the repo."""
+    original = os.getcwd()
+    path = tempfile.mkdtemp(prefix="os_bench_")
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(original)
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def timed(function, repeat, warmup=1):
+    """Return ``repeat`` wall-clock samples of a call, after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# Benchmarks. Each yields (name, summary) pairs.
+
+def bench_scheduler(quick, repeat):
+    """One ProcessManager.scheduler pass with every task due, at growing task counts."""
+    interval = 0.001  # Re-armed tasks fall due again after this, but never within the same pass
+    for tasks in ((10000,) if quick else (10000, 100000, 1000000)):
+        with scratch_directory(), quiet():
+            manager = ProcessManager(total_memory=tasks)
+            start = time.perf_counter()
+            for index in range(tasks):
+                manager.add_task(f"task{index}", interval, 1)
+            added = time.perf_counter() - start
+
+            def run_pass():
+                time.sleep(interval * 2)
+                manager.scheduler()
+
+            samples = timed(run_pass, repeat if tasks < 1000000 else 1, warmup=0)
+            manager.shutdown()
+        summary = summarize(samples, tasks)
+        summary["add_tasks_per_second"] = tasks / added
+        yield f"scheduler.pass.{tasks}", summary
+
+
+def bench_memory(quick, repeat):
+    """Allocate and free task memory with 30% churn, timing every call."""
+    operations = 20000 if quick else 200000
+    rng = random.Random(0)
+    sizes = [rng.randint(1, 16) for _ in range(operations)]
+    configurations = [(strategy, {"strategy": strategy}) for strategy in STRATEGIES]
+    configurations.append(("virtual_lru", {"swap_memory": sum(sizes) // 2, "page_policy": "lru"}))
+    for label, options in configurations:
+        samples = []
+        for _ in range(repeat):
+            with quiet():
+                # A virtual memory run overcommits: RAM holds half of it and the rest pages to swap
+                total = sum(sizes) // 2 if "swap_memory" in options else sum(sizes)
+                manager = MemoryManager(total, **options)
+                churn = random.Random(1)
+                live = []
+                gc.collect()
+                for index, size in enumerate(sizes):
+                    if live and churn.random() < 0.3:
+                        victim = live.pop(churn.randrange(len(live)))
+                        start = time.perf_counter()
+                        manager.deallocate_memory(victim)
+                        samples.append(time.perf_counter() - start)
+                    name = f"task{index}"
+                    start = time.perf_counter()
+                    allocated = manager.allocate_memory(name, size)
+                    samples.append(time.perf_counter() - start)
+                    if allocated:
+                        live.append(name)
+        summary = summarize(samples)
+        summary["ops_per_second"] = len(samples) / sum(samples)
+        yield f"memory.churn.{label}", summary
+
+
+def bench_interrupts(quick, repeat):
+    """Time trigger_interrupt calls, then delivery latency for a burst and for interrupts raised one at a time."""
+    count = 10000 if quick else 100000
+    call_samples, burst_latencies, idle_latencies, throughputs = [], [], [], []
+    for _ in range(repeat):
+        with quiet():
+            handler = InterruptHandler(workers=2)
+            done = threading.Event()
+            received = []
+
+            def on_interrupt(raised_at, expected):
+                received.append(time.perf_counter() - raised_at)
+                if len(received) == expected:
+                    done.set()
+
+            handler.register_interrupt("bench", on_interrupt)
+            handler.start()
+            gc.collect()
+            # A burst: latency here is mostly time spent queued behind earlier interrupts
+            start = time.perf_counter()
+            for _ in range(count):
+                before = time.perf_counter()
+                handler.trigger_interrupt("bench", before, count)
+                call_samples.append(time.perf_counter() - before)
+            done.wait(60)
+            throughputs.append(count / (time.perf_counter() - start))
+            burst_latencies.extend(received)
+            # One at a time: the cost of waking a dispatcher and running the handler
+            for _ in range(count // 20):
+                received.clear()
+                done.clear()
+                handler.trigger_interrupt("bench", time.perf_counter(), 1)
+                done.wait(5)
+                idle_latencies.extend(received)
+            handler.stop()
+    yield "interrupts.trigger_call", summarize(call_samples)
+    summary = summarize(burst_latencies)
+    summary["interrupts_per_second"] = sorted(throughputs)[len(throughputs) // 2]
+    yield "interrupts.latency.burst", summary
+    yield "interrupts.latency.idle", summarize(idle_latencies)
+
+
+def bench_file_system(quick, repeat):
+    """List a large directory and a nested tree, and stream a large file."""
+    entries = 5000 if quick else 50000
+    file_size = (8 if quick else 64) * 1024 * 1024
+    with scratch_directory() as root:
+        os.mkdir("flat")
+        for index in range(entries):
+            with open(os.path.join("flat", f"file{index:06d}.txt"), "w") as file:
+                file.write("x" * (index % 512))
+        os.mkdir("tree")
+        for index in range(entries // 10):
+            directory = os.path.join("tree", f"dir{index % 100}")
+            os.makedirs(directory, exist_ok=True)
+            open(os.path.join(directory, f"file{index}.txt"), "w").close()
+        rng = random.Random(0)
+        with open("large.log", "w") as file:
+            written = 0
+            while written < file_size:
+                line = f"{written:012d} " + "".join(rng.choice("abcdefgh ") for _ in range(100)) + "\n"
+                file.write(line)
+                written += len(line)
+
+        with quiet():
+            file_system = FileSystem()
+            cached = FileSystem(cache_listings=True)
+        file_system.current_directory = cached.current_directory = root
+        results = []
+        with quiet():  # Results are yielded afterwards, so the report itself is not silenced
+            cases = [
+                ("list_files.flat.name", lambda: file_system.list_files("flat")),
+                ("list_files.flat.size_page", lambda: file_system.list_files("flat", sort="size", limit=50)),
+                ("list_files.flat.glob", lambda: file_system.list_files("flat", pattern="file01*")),
+                ("list_files.flat.cached", lambda: cached.list_files("flat")),
+                ("list_files.tree.dirs", lambda: [file_system.list_files(os.path.join("tree", f"dir{index}"))
+                                                  for index in range(100)]),
+            ]
+            for name, function in cases:
+                results.append((f"fs.{name}", summarize(timed(function, repeat * 3))))
+            with open(os.devnull, "w") as devnull:
+                summary = summarize(timed(lambda: file_system.read_file("large.log", out=devnull), repeat))
+                summary["megabytes_per_second"] = file_size / 1024 / 1024 / summary["p50"]
+                results.append(("fs.read_file.full", summary))
+                results.append(("fs.read_file.tail", summarize(
+                    timed(lambda: file_system.read_file("large.log", tail=100, out=devnull), repeat * 10))))
+                results.append(("fs.read_file.range", summarize(
+                    timed(lambda: file_system.read_file("large.log", file_size // 2, 1024 * 1024, out=devnull),
+                          repeat * 10))))
+    yield from results
+
+BENCHMARKS = {
+    "scheduler": bench_scheduler,
+    "memory": bench_memory,
+    "interrupts": bench_interrupts,
+    "fs": bench_file_system,
+}
+
+
+def environment():
+    """Describe where the results came from, so baselines are compared like with like."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change in each median against a baseline. Returns the names that regressed."""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline['environment'].get('timestamp')} "
+          f"(commit {baseline['environment'].get('commit')}), threshold {threshold:.0%}:")
+    for name, summary in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"  {name:32} new")
+            continue
+        change = summary["p50"] / previous["p50"] - 1 if previous["p50"] else 0.0
+        verdict = ""
+        if change > threshold:
+            verdict = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "faster"
+        print(f"  {name:32} {previous['p50'] * 1000:10.3f}ms -> {summary['p50'] * 1000:10.3f}ms "
+              f"{change:+8.1%} {verdict}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler, memory manager, interrupts and filesystem.")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, for a fast check")
+    parser.add_argument("--only", help=f"comma-separated benchmarks to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=5, help="samples per measurement (default 5)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved by an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown of a median that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = {}
+    print(f"{'benchmark':32} {'p50':>11} {'p90':>11} {'p99':>11} {'samples':>8}")
+    for name in names:
+        for result_name, summary in BENCHMARKS[name](args.quick, args.repeat):
+            results[result_name] = summary
+            print(f"{result_name:32} {summary['p50'] * 1000:9.3f}ms {summary['p90'] * 1000:9.3f}ms "
+                  f"{summary['p99'] * 1000:9.3f}ms {summary['samples']:8}")
+
+    report = {"environment": environment(), "quick": args.quick, "repeat": args.repeat, "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nResults written to {args.output}.")
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get("quick") != args.quick:
+            print("Warning: the baseline was run with different input sizes (--quick).")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
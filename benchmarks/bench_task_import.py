@@ -0,0 +1,60 @@
+"""Compare adding tasks one at a time with a bulk import.
+
+Usage: python benchmarks/bench_task_import.py [tasks]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import system_log
+from process_manager import ProcessManager
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def fresh_manager(tasks):
+    manager = ProcessManager(total_memory=tasks * 2)
+    manager.load_state()  # Journal every change, as the shell does
+    return manager
+
+
+def main():
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    system_log.set_level("warning")  # Per-task info lines would dominate the one-at-a-time timing
+    original_directory = os.getcwd()
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+    try:
+        manager = fresh_manager(tasks)
+        seconds, _ = timed(lambda: [manager.add_task(f"task{index}", 60 + index % 600, 1) for index in range(tasks)])
+        print(f"{tasks} tasks")
+        print(f"{'add_task, one at a time':28} {seconds:8.3f}s  ({tasks / seconds:,.0f} tasks/s)")
+        for filename in ("tasks.jsonl", "tasks.csv", "tasks.json"):
+            seconds, _ = timed(lambda: manager.export_tasks(filename))
+            size = os.path.getsize(filename) / 1e6
+            print(f"{'export ' + filename:28} {seconds:8.3f}s  ({size:.1f}MB)")
+        manager.shutdown()
+        for filename in ("tasks.jsonl", "tasks.csv", "tasks.json"):
+            for path in (ProcessManager.SNAPSHOT_FILE, ProcessManager.JOURNAL_FILE):
+                if os.path.exists(path):
+                    os.remove(path)  # Start each import from an empty state
+            importer = fresh_manager(tasks)
+            seconds, added = timed(lambda: importer.import_tasks(filename))
+            assert added == tasks
+            print(f"{'import ' + filename:28} {seconds:8.3f}s  ({tasks / seconds:,.0f} tasks/s)")
+            importer.shutdown()
+    finally:
+        os.chdir(original_directory)
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
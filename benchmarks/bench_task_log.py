@@ -0,0 +1,74 @@
+"""Compare indexed task log queries with scanning the whole log.
+
+Usage: python benchmarks/bench_task_log.py [lines]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_log import TaskLog
+
+
+def scan(path, task=None, since=None, until=None):
+    """The old way: parse every line of the file."""
+    parser = TaskLog(path)
+    with open(path, "rb") as file:
+        for line in file:
+            entry = parser.parse(line)
+            if entry is None or (task is not None and entry[1] != task):
+                continue
+            if (since is None or entry[0] >= since) and (until is None or entry[0] <= until):
+                yield entry
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "task_log.txt")
+    try:
+        start = time.mktime((2024, 12, 1, 0, 0, 0, 0, 0, -1))
+        step = 30 * 86400 / lines  # Spread the runs over 30 days
+        with open(path, "w") as file:
+            for index in range(lines):
+                stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + index * step))
+                task = f"task{rng.randrange(100)}"
+                if index < lines // 10:
+                    file.write(f"[{stamp}] Task '{task}' executed.\n")
+                else:
+                    status = "success" if rng.random() < 0.95 else "failed (exit code 1)"
+                    file.write(f"[{stamp}] Task '{task}' executed with status: {status}\n")
+        end = start + lines * step
+        log = TaskLog(path)
+        print(f"{lines} lines ({os.path.getsize(path) / 1e6:.1f}MB)")
+        print(f"{'build index':32} {timed(log.refresh)[0]:8.3f}s")
+        print(f"{'save index':32} {timed(log.save)[0]:8.3f}s  ({os.path.getsize(log.index_path) / 1e6:.1f}MB)")
+        print(f"{'reload + refresh, no changes':32} {timed(lambda: TaskLog(path).refresh())[0]:8.3f}s")
+        last_hour = end - 3600
+        for label, function in (
+                ("runs of task7, last hour: scan", lambda: len(list(scan(path, "task7", last_hour)))),
+                ("runs of task7, last hour: index", lambda: len(list(log.runs("task7", last_hour)))),
+                ("all runs, last hour: scan", lambda: len(list(scan(path, since=last_hour)))),
+                ("all runs, last hour: index", lambda: len(list(log.runs(since=last_hour)))),
+                ("counts, all time: scan", lambda: sum(1 for _ in scan(path))),
+                ("counts, all time: index", lambda: sum(log.counts().values())),
+                ("task7 intervals, all time: index", lambda: log.intervals("task7")["count"])):
+            seconds, count = timed(function)
+            print(f"{label:32} {seconds:8.4f}s  ({count} runs)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
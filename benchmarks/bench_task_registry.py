@@ -0,0 +1,81 @@
+"""Measure the memory and lookup cost of task records: Task + TaskRegistry vs dicts in lists.
+
+Usage: python benchmarks/bench_task_registry.py [tasks]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_registry import Task, TaskRegistry
+
+
+def build_dicts(count, now):
+    """The old representation: a dict per task in a list, found by scanning."""
+    return [{"name": f"task{index}", "interval": 60, "next_run": now + 60, "memory": 1} for index in range(count)]
+
+
+def build_indexed_dicts(count, now):
+    """Dicts in a list plus a name -> [records] index, as ProcessManager kept them before the registry."""
+    tasks = build_dicts(count, now)
+    return tasks, {task["name"]: [task] for task in tasks}
+
+
+def build_registry(count, now):
+    registry = TaskRegistry()
+    for index in range(count):
+        registry.add(Task(f"task{index}", 60, now + 60, memory=1))
+    return registry
+
+
+def footprint(build, count):
+    """Return (bytes per task, seconds to build)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    tasks = build(count, time.time())
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tasks
+    return size / count, seconds
+
+
+def per_operation(function, repeat):
+    start = time.perf_counter()
+    for index in range(repeat):
+        function(index)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"{count} tasks")
+    for label, build in (("dicts in a list", build_dicts), ("dicts + name index", build_indexed_dicts),
+                         ("Task + TaskRegistry", build_registry)):
+        size, seconds = footprint(build, count)
+        print(f"{label:24} {size:8.0f} bytes/task  built in {seconds:.2f}s")
+
+    now = time.time()
+    tasks = build_dicts(count, now)
+    registry = build_registry(count, now)
+    step = max(1, count // 10)
+    names = [f"task{index * step + step - 1}" for index in range(10)]
+    scan = per_operation(lambda index: next(task for task in tasks if task["name"] == names[index]), 10)
+    remove = per_operation(lambda index: [task for task in tasks if task["name"] != names[index]], 3)
+    print(f"{'lookup, list scan':24} {scan * 1e6:12.1f}us")
+    print(f"{'remove, list rebuild':24} {remove * 1e6:12.1f}us")
+    lookups = [f"task{index * 7919 % count}" for index in range(100000)]
+    lookup = per_operation(lambda index: registry.get(lookups[index]), len(lookups))
+    print(f"{'lookup, registry':24} {lookup * 1e6:12.3f}us")
+    removed = per_operation(lambda index: registry.remove(f"task{index}"), min(count, 100000))
+    print(f"{'remove, registry':24} {removed * 1e6:12.3f}us")
+    added = per_operation(lambda index: registry.add(Task(f"task{index}", 60, now + 60, memory=1)), min(count, 100000))
+    print(f"{'add, registry':24} {added * 1e6:12.3f}us")
+
+
+if __name__ == "__main__":
+    main()
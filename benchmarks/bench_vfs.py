@@ -0,0 +1,62 @@
+"""Compare FileSystem operations on the host filesystem and on the in-memory VFS.
+
+Usage: python benchmarks/bench_vfs.py [files]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_system import FileSystem
+from vfs import MemoryBackend, OSBackend
+
+
+def workload(file_system, files):
+    """Create, list, read and delete ``files`` small files; return seconds per phase."""
+    timings = {}
+    start = time.perf_counter()
+    file_system.make_directory("bench")
+    for index in range(files):
+        file_system.write_file(f"bench/file{index}.txt", "x" * 1000)
+    timings["write"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(10):
+        file_system.list_files("bench", sort=None)
+    timings["list x10"] = time.perf_counter() - start
+    start = time.perf_counter()
+    for index in range(files):
+        for _ in file_system.iter_chunks(f"bench/file{index}.txt"):
+            pass
+    timings["read"] = time.perf_counter() - start
+    start = time.perf_counter()
+    file_system.delete("bench")
+    timings["delete"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    directory = tempfile.mkdtemp()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            host = FileSystem(OSBackend())
+            host.current_directory = directory
+            memory = FileSystem(MemoryBackend())
+            image = FileSystem(MemoryBackend(os.path.join(directory, "disk.img"), cache_blocks=256))
+        print(f"{files} files of 1KB")
+        for label, file_system in (("host", host), ("memory", memory), ("memory + image", image)):
+            with contextlib.redirect_stdout(io.StringIO()):  # Keep per-call prints out of the timing
+                timings = workload(file_system, files)
+                file_system.close()
+            print(f"{label:16}" + "".join(f"  {phase} {seconds:6.3f}s" for phase, seconds in timings.items()))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import errno
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNK_SIZE = 1024 * 1024  # Bytes per read/write or kernel copy call, between cancellation checks
+GLOB_MAGIC = re.compile(r"[*?[]")
+# errno values meaning "this copy syscall does not work for these files", so the next one is tried
+UNSUPPORTED_COPY = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
+
+
+def has_magic(pattern):
+    return GLOB_MAGIC.search(pattern) is not None
+
+
+class BulkOperation:
+    def __init__(self, kind, items, worker, max_workers):
+        """Initialize a bulk operation over ``items``, a list of (source, destination, size).
+
+        ``worker(operation, item)`` processes one item on a pool of
+        ``max_workers`` threads. Only a few items per worker are submitted at a
+        time, so cancelling stops the operation within about one chunk per
+        worker.
+        """
+        self.kind = kind
+        self.items = items
+        self.worker = worker
+        self.max_workers = max_workers
+        self.total_files = len(items)
+        self.total_bytes = sum(item[2] for item in items)
+        self.files_done = 0
+        self.bytes_done = 0
+        self.errors = []    # (path, message) for items that failed
+        self.results = {}   # Path -> result, e.g. a checksum
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self.thread = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"bulk-{self.kind}")
+        self.thread.start()
+        return self
+
+    def _run(self):
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for item in self.items:
+                    slots.acquire()
+                    if self.cancelled.is_set():
+                        slots.release()
+                        break
+                    pool.submit(self._process, item).add_done_callback(lambda _: slots.release())
+        finally:
+            self.finished_at = time.monotonic()
+            self.finished.set()
+
+    def _process(self, item):
+        if self.cancelled.is_set():
+            return
+        try:
+            self.worker(self, item)
+        except InterruptedError:
+            pass  # Stopped part-way by cancel()
+        except Exception as e:
+            with self.lock:
+                self.errors.append((item[0], str(e)))
+        else:
+            with self.lock:
+                self.files_done += 1
+
+    def add_bytes(self, count):
+        with self.lock:
+            self.bytes_done += count
+
+    def cancel(self):
+        """Stop submitting work and ask running items to stop after their current chunk."""
+        self.cancelled.set()
+
+    def wait(self, timeout=None):
+        """Wait for the operation to finish. Returns True if it has."""
+        return self.finished.wait(timeout)
+
+    def progress(self):
+        """Return a dict of progress counters and throughput."""
+        with self.lock:
+            files_done, bytes_done, errors = self.files_done, self.bytes_done, len(self.errors)
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        return {
+            "kind": self.kind,
+            "files_done": files_done,
+            "total_files": self.total_files,
+            "bytes_done": bytes_done,
+            "total_bytes": self.total_bytes,
+            "errors": errors,
+            "elapsed": elapsed,
+            "bytes_per_second": bytes_done / elapsed if elapsed else 0.0,
+            "state": "cancelled" if self.cancelled.is_set() else "done" if self.finished.is_set() else "running",
+        }
+
+    def report(self):
+        progress = self.progress()
+        errors = f", {progress['errors']} error(s)" if progress["errors"] else ""
+        print(f"BulkOperation: {progress['kind']} {progress['files_done']}/{progress['total_files']} files, "
+              f"{progress['bytes_done'] / 1e6:.1f}/{progress['total_bytes'] / 1e6:.1f}MB, "
+              f"{progress['bytes_per_second'] / 1e6:.1f}MB/s ({progress['state']}{errors})")
+
+
+def _zero_copy(operation, source_fd, destination_fd):
+    """Copy the rest of one host file into another inside the kernel.
+
+    Tries copy_file_range, then sendfile, picking up from the current file
+    offsets. Returns False if neither is supported, so the caller falls back
+    to read/write.
+    """
+    for name in ("copy_file_range", "sendfile"):
+        call = getattr(os, name, None)
+        if call is None:
+            continue
+        try:
+            while not operation.cancelled.is_set():
+                if name == "copy_file_range":
+                    copied = call(source_fd, destination_fd, CHUNK_SIZE)
+                else:
+                    copied = call(destination_fd, source_fd, None, CHUNK_SIZE)
+                if copied == 0:
+                    break
+                operation.add_bytes(copied)
+            return True
+        except OSError as e:
+            if e.errno not in UNSUPPORTED_COPY:
+                raise
+    return False
+
+
+class BulkFileOperations:
+    def __init__(self, file_system, max_workers=4):
+        """Initialize glob-based bulk copy, move, delete and checksum over a FileSystem.
+
+        Patterns are relative to the file system's current directory and
+        support ``*``, ``?``, ``[...]`` and ``**`` for any number of
+        directories. Each call returns a started BulkOperation.
+        """
+        self.file_system = file_system
+        self.max_workers = max_workers
+
+    @property
+    def backend(self):
+        return self.file_system.backend
+
+    # Pattern expansion
+
+    def _children(self, path):
+        try:
+            return list(self.backend.scandir(path))
+        except OSError:
+            return []
+
+    def _walk(self, path):
+        """Yield (path, kind, size) for everything below a directory."""
+        for name, kind, size, _ in self._children(path):
+            child = self.backend.join(path, name)
+            yield child, kind, size
+            if kind == "dir":
+                yield from self._walk(child)
+
+    def expand(self, pattern):
+        """Return sorted (path, kind, size) for the paths matching a glob pattern."""
+        base = self.file_system._path(".")
+        parts = [part for part in pattern.replace("\\", "/").split("/") if part]
+        if pattern.startswith(("/", "\\")):
+            base = self.backend.join(base, "/")
+        matches = [(base, "dir", 0)]
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            expanded = []
+            for path, kind, _ in matches:
+                if kind != "dir":
+                    continue
+                if part == "**":
+                    if not last:
+                        expanded.append((path, kind, 0))
+                    # A trailing "**" matches every file below; anywhere else it matches directories
+                    expanded.extend(entry for entry in self._walk(path) if (entry[1] != "dir") == last)
+                elif has_magic(part):
+                    matches_name = re.compile(fnmatch.translate(part)).match
+                    for name, child_kind, size, _ in self._children(path):
+                        if matches_name(name) and (part.startswith(".") or not name.startswith(".")):
+                            expanded.append((self.backend.join(path, name), child_kind, size))
+                else:
+                    child = self.backend.join(path, part)
+                    try:
+                        child_kind, size, _ = self.backend.stat(child)
+                    except OSError:
+                        continue
+                    expanded.append((child, child_kind, size))
+            matches = expanded
+        return sorted(set(matches)) if parts else []
+
+    def _files(self, matches, destination=None):
+        """Turn expanded matches into (source, destination, size) for every file, descending into directories.
+
+        With ``destination``, each file maps to a path below it that keeps its
+        position relative to the matched entry, and the needed directories are
+        created up front.
+        """
+        items = []
+        for path, kind, size in matches:
+            target = self.backend.join(destination, self.backend.basename(path)) if destination else None
+            if kind != "dir":
+                items.append((path, target, size))
+                continue
+            if target:
+                self._makedirs(target)
+            for child, child_kind, child_size in self._walk(path):
+                child_target = None
+                if target:
+                    child_target = self.backend.join(target, child[len(path):].lstrip("/\\"))
+                if child_kind == "dir":
+                    if child_target:
+                        self._makedirs(child_target)
+                else:
+                    items.append((child, child_target, child_size))
+        return items
+
+    def _makedirs(self, path):
+        try:
+            self.backend.mkdir(path)
+        except FileExistsError:
+            pass
+
+    def _within(self, path, directory):
+        while path != directory:
+            parent = self.backend.join(path, "..")
+            if parent == path:
+                return False
+            path = parent
+        return True
+
+    def _targets(self, pattern, destination):
+        """Expand a pattern for copy or move, then create the destination directory.
+
+        Expanding first keeps a new destination out of its own matches, and
+        the destination and anything below it are left out either way, so
+        ``copy * backup`` does not copy ``backup`` into itself.
+        """
+        target = self.file_system._path(destination)
+        matches = [match for match in self.expand(pattern) if not self._within(match[0], target)]
+        self._makedirs(target)
+        if self.backend.stat(target)[0] != "dir":
+            raise NotADirectoryError(errno.ENOTDIR, "Destination is not a directory", destination)
+        return matches, target
+
+    # Workers
+
+    def _copy(self, operation, item):
+        source, destination, _ = item
+        with self.backend.open(source, "rb") as source_file, self.backend.open(destination, "wb") as destination_file:
+            copied = False
+            if hasattr(source_file, "fileno") and hasattr(destination_file, "fileno"):
+                copied = _zero_copy(operation, source_file.fileno(), destination_file.fileno())
+            if not copied:
+                while not operation.cancelled.is_set():
+                    chunk = source_file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    destination_file.write(chunk)
+                    operation.add_bytes(len(chunk))
+        if operation.cancelled.is_set():
+            self.backend.remove(destination)  # Do not leave a partial copy behind
+            raise InterruptedError("cancelled")
+        self.file_system.invalidate(destination)
+
+    def _move(self, operation, item):
+        source, destination, size = item
+        self.backend.move(source, destination)
+        self.file_system.invalidate(source)
+        self.file_system.invalidate(destination)
+        operation.add_bytes(size)
+
+    def _delete(self, operation, item):
+        source, _, size = item
+        self.backend.remove(source)
+        self.file_system.invalidate(source)
+        operation.add_bytes(size)
+
+    def _checksum(self, operation, item, algorithm):
+        source = item[0]
+        digest = hashlib.new(algorithm)
+        with self.backend.open(source, "rb") as file:
+            while not operation.cancelled.is_set():
+                chunk = file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)  # hashlib releases the GIL for large chunks, so workers hash in parallel
+                operation.add_bytes(len(chunk))
+        if operation.cancelled.is_set():
+            raise InterruptedError("cancelled")
+        with operation.lock:
+            operation.results[source] = digest.hexdigest()
+
+    # Operations
+
+    def copy(self, pattern, destination):
+        """Copy every matching file or directory tree into a destination directory."""
+        items = self._files(*self._targets(pattern, destination))
+        return BulkOperation("copy", items, self._copy, self.max_workers).start()
+
+    def move(self, pattern, destination):
+        """Move every matching entry into a destination directory; directories move whole."""
+        matches, target = self._targets(pattern, destination)
+        items = [(path, self.backend.join(target, self.backend.basename(path)), size) for path, _, size in matches]
+        return BulkOperation("move", items, self._move, self.max_workers).start()
+
+    def delete(self, pattern):
+        """Delete every matching file or directory tree."""
+        items = []
+        directories = set()
+        for path, kind, size in self.expand(pattern):
+            parent = self.backend.join(path, "..")
+            while parent not in directories and self.backend.join(parent, "..") != parent:
+                parent = self.backend.join(parent, "..")
+            if parent in directories:
+                continue  # Removed along with a matched parent directory
+            if kind == "dir":
+                directories.add(path)
+                size = sum(entry[2] for entry in self._walk(path))
+            items.append((path, None, size))
+        return BulkOperation("delete", items, self._delete, self.max_workers).start()
+
+    def checksum(self, pattern, algorithm="sha256"):
+        """Hash every matching file; results end up in ``operation.results``."""
+        hashlib.new(algorithm)  # Fail fast on an unknown algorithm
+        worker = lambda operation, item: self._checksum(operation, item, algorithm)
+        return BulkOperation("checksum", self._files(self.expand(pattern)), worker, self.max_workers).start()
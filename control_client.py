@@ -0,0 +1,85 @@
+import itertools
+import json
+import socket
+
+PIPELINE_WINDOW = 128  # Requests sent ahead of their answers, so neither side blocks on a full socket buffer
+
+
+class ControlClient:
+    def __init__(self, path="os.sock", host=None, port=None, timeout=30.0, token=None, token_file="os.token"):
+        """Connect to a running ControlServer over its Unix socket, or over TCP when a port is given.
+
+        Over TCP the server's token is sent first: ``token`` if given,
+        otherwise the contents of ``token_file``, which the server wrote. The
+        connection stays open for every call until ``close``. Use it from one
+        thread at a time; open one client per thread for parallel work.
+        """
+        if port is not None:
+            if token is None:
+                with open(token_file) as file:
+                    token = file.read().strip()
+            self.socket = socket.create_connection((host or "127.0.0.1", port), timeout)
+        else:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(path)
+        self.reader = self.socket.makefile("rb")
+        self.ids = itertools.count(1)
+        if port is not None:
+            self.socket.sendall(json.dumps({"token": token}).encode("utf-8") + b"\n")
+            response = json.loads(self.reader.readline() or b"{}")
+            if not response.get("ok"):
+                self.close()
+                raise PermissionError(response.get("error", "The control server refused the token."))
+
+    def call(self, command):
+        """Run one command line and return what it printed. Raises RuntimeError if the server refused it."""
+        return _output(self._exchange([{"command": command}])[0])
+
+    def batch(self, commands):
+        """Run several commands in one request and return each one's output, in order."""
+        response = self._exchange([{"commands": list(commands)}])[0]
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error", "Batch refused."))
+        return [_output(result) for result in response["results"]]
+
+    def pipeline(self, commands):
+        """Send every command without waiting for answers, then collect them. Returns each one's output."""
+        return [_output(response) for response in self._exchange([{"command": command} for command in commands])]
+
+    def request(self, request):
+        """Send one raw request dict and return the response dict as is."""
+        return self._exchange([request])[0]
+
+    def _exchange(self, requests):
+        responses = []
+        for start in range(0, len(requests), PIPELINE_WINDOW):
+            window = requests[start:start + PIPELINE_WINDOW]
+            for request in window:
+                request.setdefault("id", next(self.ids))
+            self.socket.sendall(b"".join(json.dumps(request).encode("utf-8") + b"\n" for request in window))
+            for request in window:
+                line = self.reader.readline()
+                if not line:
+                    raise ConnectionError("The control server closed the connection.")
+                response = json.loads(line)
+                if response.get("id") != request["id"]:
+                    raise ConnectionError(f"Expected the answer to request {request['id']}, got {response.get('id')}.")
+                responses.append(response)
+        return responses
+
+    def close(self):
+        self.reader.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _output(response):
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response.get("output", "")
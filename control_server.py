@@ -0,0 +1,298 @@
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from metrics import REGISTRY
+from shell import Shell, split_commands
+from system_log import capture, get_logger
+
+
+log = get_logger("ControlServer")
+
+DEFAULT_SOCKET = "os.sock"
+DEFAULT_TOKEN_FILE = "os.token"
+AUTH_TIMEOUT = 10  # Seconds a TCP client has to present the token before it is dropped
+MAX_REQUEST_BYTES = 16 * 1024 * 1024  # Longest request line, e.g. a large batch
+MAX_BATCH = 10000  # Commands in one batch request
+MAX_PIPELINE = 256  # Pipelined requests read ahead and run in one go per connection
+
+CONNECTIONS = REGISTRY.gauge("control_connections", "Open control server connections.")
+_TOO_LONG = object()  # Queued in place of a request line that exceeded MAX_REQUEST_BYTES
+
+REQUESTS = REGISTRY.counter("control_requests_total", "Control server requests answered.")
+REQUEST_SECONDS = REGISTRY.histogram("control_request_seconds", "Time from reading a control request to answering it.")
+
+
+class ControlServer:
+    def __init__(self, kernel, file_system, process_manager, file_index=None, path=DEFAULT_SOCKET,
+                 host="127.0.0.1", port=None, max_workers=8, max_connections=256, token_file=DEFAULT_TOKEN_FILE):
+        """Initialize a server that runs shell commands for other processes.
+
+        It listens on the Unix socket ``path``, or on ``host:port`` when a
+        port is given (0 picks a free one). The protocol is one JSON object
+        per line each way, on persistent connections:
+
+            {"id": 1, "command": "add backup 60 10"}
+            {"id": 1, "ok": true, "output": "MemoryManager: Allocated 10MB for 'backup'.\\n..."}
+
+        ``{"id": 2, "commands": [...]}`` runs a batch and answers with
+        ``"results"``, one ``{"ok", "output"}`` per command. A line that is
+        not JSON is run as a command. Clients may pipeline requests; each
+        connection's requests run in order and are answered in order, while
+        connections run in parallel on ``max_workers`` threads. Every
+        connection has its own Shell, so its jobs, ``exit`` and current
+        directory are its own, but they share the kernel, file system and
+        process manager.
+
+        The Unix socket is created readable only by this user. Any local user
+        can reach a TCP port, so in TCP mode a random token is written to
+        ``token_file`` (mode 0600) and each connection must first send
+        ``{"token": "..."}``, which is answered with ``{"ok": true}``.
+        """
+        self.kernel = kernel
+        self.file_system = file_system
+        self.process_manager = process_manager
+        self.file_index = file_index
+        self.path = path
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.max_connections = max_connections
+        self.token_file = token_file
+        self.token = None
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.pool = None
+        self.slots = None  # Semaphore bounding open connections, created on the loop
+        self.sessions = threading.local()  # Each worker thread's event loop, for coroutine commands
+        self.session_loops = []            # Every such loop, closed by stop()
+        self.session_lock = threading.Lock()
+        self.ready = threading.Event()
+
+    @property
+    def address(self):
+        """Where clients connect: the socket path, or (host, port) once listening on TCP."""
+        if self.port is None:
+            return self.path
+        if self.server is not None and self.server.sockets:
+            return self.server.sockets[0].getsockname()[:2]
+        return (self.host, self.port)
+
+    def start(self):
+        """Start serving on a background thread. Returns True once listening."""
+        if self.port is not None:
+            self.token = secrets.token_hex(32)
+            try:
+                self._write_token()
+            except OSError as e:
+                log.error("Could not write the control token to '%s': %s", self.token_file, e)
+                return False
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="control")
+        self.thread = threading.Thread(target=self._run, daemon=True, name="control-server")
+        self.thread.start()
+        self.ready.wait()
+        return self.server is not None
+
+    def _write_token(self):
+        if os.path.lexists(self.token_file):
+            os.remove(self.token_file)  # A fresh file, so nobody else can hold it open or own it
+        descriptor = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "w") as file:
+            file.write(self.token + "\n")
+
+    def stop(self):
+        """Stop accepting connections, close open ones, and wait for running commands."""
+        if self.loop is None:
+            return
+        loop, self.loop = self.loop, None
+        loop.call_soon_threadsafe(loop.stop)
+        self.thread.join()
+        self.pool.shutdown(wait=True)
+        with self.session_lock:
+            loops, self.session_loops = self.session_loops, []
+        for session_loop in loops:
+            session_loop.close()
+        if self.port is None and os.path.exists(self.path):
+            os.remove(self.path)
+        if self.token is not None and os.path.exists(self.token_file):
+            os.remove(self.token_file)
+        log.info("Stopped.")
+
+    def _run(self):
+        loop = self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self.slots = asyncio.Semaphore(self.max_connections)
+            self.server = loop.run_until_complete(self._listen())
+        except OSError as e:
+            log.error("Could not listen on %s: %s", self.address, e)
+            self.loop = None
+            self.ready.set()
+            loop.close()
+            return
+        log.info("Listening on %s.", self.address)
+        self.ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self.server.close()
+            for task in asyncio.all_tasks(loop):
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop), return_exceptions=True))
+            loop.run_until_complete(self.server.wait_closed())
+            loop.close()
+
+    async def _listen(self):
+        if self.port is not None:
+            return await asyncio.start_server(self._connection, self.host, self.port, limit=MAX_REQUEST_BYTES)
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left over from an instance that did not shut down cleanly
+        umask = os.umask(0o077)  # Only this user may drive the OS, from the moment the socket exists
+        try:
+            return await asyncio.start_unix_server(self._connection, self.path, limit=MAX_REQUEST_BYTES)
+        finally:
+            os.umask(umask)
+
+    async def _connection(self, reader, writer):
+        try:
+            await self._session(reader, writer)
+        except asyncio.CancelledError:
+            writer.close()  # The server is stopping; returning normally keeps asyncio from reporting it
+
+    async def _session(self, reader, writer):
+        """Answer one client's requests in order until it disconnects or sends ``exit``."""
+        async with self.slots:
+            if self.token is not None and not await self._authenticate(reader, writer):
+                writer.close()
+                return
+            CONNECTIONS.inc()
+            shell = Shell(self.kernel, self.file_system.view(), self.process_manager, self.file_index)
+            shell.running = True
+            lines = asyncio.Queue(MAX_PIPELINE)  # Read ahead of execution, so pipelined requests run together
+            reading = asyncio.ensure_future(self._read(reader, lines))
+            loop = asyncio.get_running_loop()
+            try:
+                while shell.running:
+                    batch = [await lines.get()]
+                    while not lines.empty() and len(batch) < MAX_PIPELINE:
+                        batch.append(lines.get_nowait())
+                    if batch[-1] is None:
+                        batch.pop()  # The client hung up after these
+                        shell.running = False
+                    if not batch:
+                        break
+                    started = time.perf_counter()
+                    responses = await loop.run_in_executor(self.pool, self._answer_all, shell, batch)
+                    writer.write(b"".join(_encode(response) for response in responses))
+                    await writer.drain()  # A client that stops reading stops getting its requests run
+                    REQUESTS.inc(len(responses))
+                    REQUEST_SECONDS.observe(time.perf_counter() - started)
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                reading.cancel()
+                CONNECTIONS.dec()
+                try:
+                    await asyncio.gather(reading, return_exceptions=True)  # Stop reading before the socket closes
+                finally:
+                    writer.close()
+
+    async def _authenticate(self, reader, writer):
+        """Check the first line is ``{"token": ...}`` with this server's token, and answer it."""
+        try:
+            line = await asyncio.wait_for(reader.readline(), AUTH_TIMEOUT)
+            request = json.loads(line)
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            request = None
+        token = request.get("token") if isinstance(request, dict) else None
+        if isinstance(token, str) and hmac.compare_digest(token.encode(), self.token.encode()):
+            writer.write(_encode({"ok": True}))
+            return True
+        log.warning("Refused a connection without a valid token.")
+        writer.write(_encode({"ok": False, "error": "A valid token is required."}))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        return False
+
+    async def _read(self, reader, lines):
+        """Queue each request line, then None once the client hangs up."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await lines.put(line)
+        except ValueError:
+            await lines.put(_TOO_LONG)  # The rest of the stream cannot be framed, so the connection ends
+        except ConnectionError:
+            pass
+        await lines.put(None)
+
+    def _answer_all(self, shell, lines):
+        """Answer requests in order, stopping if one of them exits the session."""
+        responses = []
+        for line in lines:
+            if not shell.running:
+                break
+            responses.append(self._answer(shell, line))
+        return responses
+
+    def _answer(self, shell, line):
+        """Parse one request and run it on this worker thread. Returns the response."""
+        if line is _TOO_LONG:
+            return {"id": None, "ok": False, "error": f"Requests are limited to {MAX_REQUEST_BYTES} bytes."}
+        try:
+            request = json.loads(line)
+        except ValueError:
+            request = None
+        if not isinstance(request, dict):
+            if line.lstrip().startswith(b"{"):
+                return {"id": None, "ok": False, "error": "Invalid JSON request."}
+            request = {"command": line.decode("utf-8", "replace").strip()}
+        response = {"id": request.get("id")}
+        commands = request.get("commands")
+        if commands is not None:
+            if not isinstance(commands, list) or len(commands) > MAX_BATCH:
+                response.update(ok=False, error=f"'commands' must be a list of at most {MAX_BATCH} strings.")
+            else:
+                response.update(ok=True, results=[self._run_command(shell, command) for command in commands])
+        elif isinstance(request.get("command"), str):
+            response.update(self._run_command(shell, request["command"]))
+        else:
+            response.update(ok=False, error="A request needs a 'command' string or a 'commands' list.")
+        return response
+
+    def _run_command(self, shell, command):
+        """Run one command line, capturing what it prints and logs. "ok" is False if a command was invalid."""
+        if not isinstance(command, str):
+            return {"ok": False, "error": "Commands must be strings."}
+        if not shell.running:
+            return {"ok": False, "error": "The session has exited."}
+        loop = getattr(self.sessions, "loop", None)
+        if loop is None:
+            loop = self.sessions.loop = asyncio.new_event_loop()
+            with self.session_lock:
+                self.session_loops.append(loop)
+        ok = True
+        with capture() as output:
+            try:
+                for words, background in split_commands(command):
+                    if not shell.running:
+                        break
+                    ok = loop.run_until_complete(shell.dispatch(words, background)) and ok
+            except Exception as e:
+                log.error("Command '%s' failed: %s", command, e)
+                return {"ok": False, "error": str(e), "output": output.getvalue()}
+        return {"ok": ok, "output": output.getvalue()}
+
+
+def _encode(response):
+    return json.dumps(response).encode("utf-8") + b"\n"
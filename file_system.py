@@ -1,134 +1,331 @@
-import os
-import shutil
+import codecs
+import copy
+import fnmatch
+import heapq
+import itertools
+import re
+import sys
+from metrics import REGISTRY, timed
+from vfs import OSBackend
+from system_log import get_logger
+
+
+log = get_logger("FileSystem")
+
+
+CHUNK_SIZE = 64 * 1024  # Bytes per read when streaming files
+MMAP_THRESHOLD = 8 * 1024 * 1024  # Stream ranges at least this large from a memory map
+
+SORT_KEYS = {
+    "name": lambda entry: entry[0],
+    "size": lambda entry: entry[2],
+    "mtime": lambda entry: entry[3],
+}
+
+
+def _operation(name):
+    """Time a FileSystem operation in the fs_operation_seconds histogram."""
+    return timed(REGISTRY.histogram("fs_operation_seconds", "Latency of FileSystem operations.", op=name))
 
 
 class FileSystem:
-    def __init__(self):
-        """Initialize the file system."""
-        self.current_directory = os.getcwd()
-        print(f"FileSystem: Current directory set to {self.current_directory}")
+    def __init__(self, backend=None, cache_listings=False):
+        """Initialize the file system.
+
+        Operations go through ``backend``: the host filesystem (``vfs.OSBackend``,
+        the default) or an in-memory ``vfs.MemoryBackend``. The current
+        directory is tracked here, so the process working directory never
+        changes. With ``cache_listings``, each directory's listing is kept and reused
+        until the directory's mtime changes or ``invalidate`` is called for a
+        path inside it (the filesystem watcher does this, which also catches
+        size changes of existing files).
+        """
+        self.backend = backend or OSBackend()
+        self.current_directory = self.backend.root
+        self.cache_listings = cache_listings
+        self.listing_cache = {}  # Directory -> (mtime, entries)
+        log.info("Current directory set to %s", self.current_directory)
 
-    def list_files(self):
-        """List all files and directories in the current directory."""
+    def view(self):
+        """Return a FileSystem on the same backend and listing cache, with its own current directory."""
+        return copy.copy(self)
+
+    def invalidate(self, path):
+        """Drop cached listings of ``path`` and of the directory containing it."""
+        path = self._path(path)
+        self.listing_cache.pop(path, None)
+        self.listing_cache.pop(self.backend.join(path, ".."), None)
+
+    def _path(self, path):
+        return self.backend.join(self.current_directory, path)
+
+    def _exists(self, path):
+        try:
+            self.backend.stat(path)
+            return True
+        except OSError:
+            return False
+
+    def _entries(self, directory):
+        if not self.cache_listings:
+            return self.backend.scandir(directory)  # Streams straight from the directory
+        mtime = self.backend.stat(directory)[2]
+        cached = self.listing_cache.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        entries = list(self.backend.scandir(directory))
+        self.listing_cache[directory] = (mtime, entries)
+        return entries
+
+    def iter_files(self, path=".", pattern=None, kind=None):
+        """Yield (name, kind, size, mtime) for entries of a directory, optionally filtered.
+
+        ``pattern`` is a shell-style glob matched against names and ``kind`` is
+        "file" or "dir". Entries are yielded in directory order as they are
+        read, unless the listing is served from the cache.
+        """
+        directory = self._path(path)
+        matches = re.compile(fnmatch.translate(pattern)).match if pattern is not None else None
+        for entry in self._entries(directory):
+            if kind is not None and entry[1] != kind:
+                continue
+            if matches is not None and not matches(entry[0]):
+                continue
+            yield entry
+
+    @_operation("list_files")
+    def list_files(self, path=".", pattern=None, kind=None, sort="name", reverse=False, offset=0, limit=None):
+        """List files and directories in a directory, returning the listed names.
+
+        ``sort`` is "name", "size", "mtime" or None for directory order; ``offset``
+        and ``limit`` select one page. A page of a sorted listing only keeps
+        ``offset + limit`` entries in memory, and an unsorted listing is printed
+        as it streams in.
+        """
+        if sort is not None and sort not in SORT_KEYS:
+            log.error("Unknown sort key '%s'.", sort)
+            return []
         try:
             file_list = []
-            print(f"Contents of '{self.current_directory}':")
-            for item in os.listdir(self.current_directory):
-                file_list.append(item)
-                item_path = os.path.join(self.current_directory, item)
-                if os.path.isfile(item_path):
-                    size = os.path.getsize(item_path)
-                    print(f"- File: {item} ({size} bytes)")
-                elif os.path.isdir(item_path):
-                    print(f"- Directory: {item}")
+            print(f"Contents of '{self._path(path)}':")
+            entries = self.iter_files(path, pattern, kind)
+            if sort is not None:
+                key = SORT_KEYS[sort]
+                if limit is None:
+                    entries = sorted(entries, key=key, reverse=reverse)
+                elif reverse:
+                    entries = heapq.nlargest(offset + limit, entries, key=key)
+                else:
+                    entries = heapq.nsmallest(offset + limit, entries, key=key)
+            stop = offset + limit if limit is not None else None
+            for name, entry_kind, size, _ in itertools.islice(entries, offset, stop):
+                file_list.append(name)
+                if entry_kind == "file":
+                    print(f"- File: {name} ({size} bytes)")
+                elif entry_kind == "dir":
+                    print(f"- Directory: {name}")
             return file_list
         except Exception as e:
-            print(f"Error listing files: {e}")
+            log.error("Could not list files: %s", e)
             return []
 
+    @_operation("make_directory")
     def make_directory(self, dir_name):
         """Create a new directory."""
         try:
-            path = os.path.join(self.current_directory, dir_name)
-            os.mkdir(path)
-            print(f"Directory '{dir_name}' created.")
+            path = self._path(dir_name)
+            self.backend.mkdir(path)
+            self.invalidate(path)
+            log.info("Directory '%s' created.", dir_name, extra={"path": path})
         except FileExistsError:
-            print(f"Error: Directory '{dir_name}' already exists.")
+            log.error("Directory '%s' already exists.", dir_name)
         except Exception as e:
-            print(f"Error creating directory '{dir_name}': {e}")
+            log.error("Could not create directory '%s': %s", dir_name, e)
 
+    @_operation("delete")
     def delete(self, path):
         """Delete a file or directory."""
         try:
-            full_path = os.path.join(self.current_directory, path)
-            if os.path.isfile(full_path):
-                os.remove(full_path)
-                print(f"Deleted file: {path}")
-            elif os.path.isdir(full_path):
-                shutil.rmtree(full_path)
-                print(f"Deleted directory: {path}")
-            else:
-                print(f"Path '{path}' does not exist.")
+            full_path = self._path(path)
+            kind = self.backend.stat(full_path)[0]
+            self.backend.remove(full_path)
+            self.invalidate(full_path)
+            log.info("Deleted %s: %s", "directory" if kind == "dir" else "file", path, extra={"path": full_path})
+        except FileNotFoundError:
+            log.error("Path '%s' does not exist.", path)
         except Exception as e:
-            print(f"Error deleting '{path}': {e}")
+            log.error("Could not delete '%s': %s", path, e)
 
+    @_operation("change_directory")
     def change_directory(self, dir_name):
         """Change to a different directory."""
         try:
-            new_dir = os.path.join(self.current_directory, dir_name)
-            os.chdir(new_dir)
-            self.current_directory = os.getcwd()
-            print(f"Changed directory to {self.current_directory}.")
+            new_dir = self._path(dir_name)
+            if self.backend.stat(new_dir)[0] != "dir":
+                log.error("'%s' is not a directory.", dir_name)
+                return
+            self.current_directory = new_dir
+            log.info("Changed directory to %s.", self.current_directory)
         except FileNotFoundError:
-            print(f"Directory '{dir_name}' not found.")
+            log.error("Directory '%s' not found.", dir_name)
         except Exception as e:
-            print(f"Error changing directory: {e}")
+            log.error("Could not change directory: %s", e)
 
+    @_operation("create_file")
     def create_file(self, filename):
         """Create an empty file."""
         try:
-            file_path = os.path.join(self.current_directory, filename)
-            with open(file_path, "w") as file:
-                print(f"File '{filename}' created.")
+            file_path = self._path(filename)
+            with self.backend.open(file_path, "wb"):
+                log.info("File '%s' created.", filename, extra={"path": file_path})
+            self.invalidate(file_path)
         except FileExistsError:
-            print(f"Error: File '{filename}' already exists.")
+            log.error("File '%s' already exists.", filename)
         except Exception as e:
-            print(f"Error creating file '{filename}': {e}")
+            log.error("Could not create file '%s': %s", filename, e)
+
+    @_operation("write_file")
+    def write_file(self, filename, content, append=False, binary=False):
+        """Write or append content to a file.
 
-    def write_file(self, filename, content):
-        """Write content to a file."""
+        ``content`` is a string (bytes with ``binary``) or an iterable of them,
+        which is written chunk by chunk without being joined in memory.
+        """
         try:
-            file_path = os.path.join(self.current_directory, filename)
-            with open(file_path, "w") as file:
-                file.write(content)
-            print(f"Content written to '{filename}'.")
+            file_path = self._path(filename)
+            chunks = [content] if isinstance(content, (str, bytes, bytearray, memoryview)) else content
+            written = 0
+            with self.backend.open(file_path, "ab" if append else "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk if binary else chunk.encode("utf-8"))
+                    written += len(chunk)
+            self.invalidate(file_path)
+            unit = "bytes" if binary else "characters"
+            log.info("Content %s to '%s' (%d %s).", "appended" if append else "written", filename, written, unit,
+                     extra={"path": file_path, "size": written})
         except FileNotFoundError:
-            print(f"Error: File '{filename}' does not exist.")
+            log.error("File '%s' does not exist.", filename)
         except Exception as e:
-            print(f"Error writing to file '{filename}': {e}")
+            log.error("Could not write to file '%s': %s", filename, e)
+
+    def map_file(self, filename):
+        """Map a file read-only for zero-copy access (an mmap on the host filesystem)."""
+        return self.backend.map(self._path(filename))
 
-    def read_file(self, filename):
-        """Read content from a file."""
+    def line_range(self, filename, head=None, tail=None):
+        """Return the (offset, length) in bytes of the first ``head`` or last ``tail`` lines.
+
+        Newlines are located with find/rfind on the mapped file, so on the host
+        filesystem only the pages that hold the wanted lines are read.
+        """
+        with self.map_file(filename) as mapped:
+            size = len(mapped)
+            if head is not None:
+                end = 0
+                for _ in range(head):
+                    end = mapped.find(b"\n", end) + 1
+                    if end == 0:
+                        end = size
+                        break
+                return 0, end
+            start = size - 1 if size and mapped[size - 1] == ord("\n") else size
+            for _ in range(tail):
+                start = mapped.rfind(b"\n", 0, start)
+                if start < 0:
+                    break
+            start += 1
+            return start, size - start
+
+    def iter_chunks(self, filename, offset=0, length=None, chunk_size=CHUNK_SIZE):
+        """Yield the bytes of a file, or of ``length`` bytes from ``offset``, in chunks.
+
+        Ranges of at least MMAP_THRESHOLD bytes are sliced out of a memory map
+        instead of going through read() calls.
+        """
+        file_path = self._path(filename)
+        with self.backend.open(file_path, "rb") as file:
+            size = self.backend.stat(file_path)[1]
+            end = size if length is None else min(size, offset + length)
+            if end - offset >= MMAP_THRESHOLD:
+                with self.backend.map(file_path) as mapped:
+                    for position in range(offset, end, chunk_size):
+                        yield mapped[position:min(position + chunk_size, end)]
+                return
+            file.seek(offset)
+            remaining = end - offset
+            while remaining > 0:
+                chunk = file.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    @_operation("read_file")
+    def read_file(self, filename, offset=0, length=None, head=None, tail=None, out=None):
+        """Stream a file, a byte range of it, or its first/last lines to ``out`` (stdout by default).
+
+        Content is decoded as UTF-8 chunk by chunk, so memory use stays flat
+        however large the file is. Returns the number of bytes read.
+        """
+        out = out or sys.stdout
         try:
-            file_path = os.path.join(self.current_directory, filename)
-            with open(file_path, "r") as file:
-                content = file.read()
-            print(f"Content of '{filename}':\n{content}")
+            if head is not None or tail is not None:
+                offset, length = self.line_range(filename, head, tail)
+            print(f"Content of '{filename}':", file=out)
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            read = 0
+            for chunk in self.iter_chunks(filename, offset, length):
+                read += len(chunk)
+                out.write(decoder.decode(chunk))
+            out.write(decoder.decode(b"", final=True) + "\n")
+            out.flush()
+            return read
         except FileNotFoundError:
-            print(f"File '{filename}' not found.")
+            log.error("File '%s' not found.", filename)
         except Exception as e:
-            print(f"Error reading file '{filename}': {e}")
+            log.error("Could not read file '%s': %s", filename, e)
+        return 0
 
+    @_operation("move")
     def move(self, source, destination):
         """Move a file or directory to a new location."""
         try:
-            source_path = os.path.join(self.current_directory, source)
-            destination_path = os.path.join(self.current_directory, destination)
+            source_path = self._path(source)
+            destination_path = self._path(destination)
 
-            if not os.path.exists(source_path):
-                print(f"Error: Source '{source}' does not exist.")
+            if not self._exists(source_path):
+                log.error("Source '%s' does not exist.", source)
                 return
 
             # If the destination is a directory, append the source name
-            if os.path.isdir(destination_path):
-                destination_path = os.path.join(destination_path, os.path.basename(source_path))
+            if self._exists(destination_path) and self.backend.stat(destination_path)[0] == "dir":
+                destination_path = self.backend.join(destination_path, self.backend.basename(source_path))
 
-            shutil.move(source_path, destination_path)
-            print(f"Moved '{source}' to '{destination}'.")
+            self.backend.move(source_path, destination_path)
+            self.invalidate(source_path)
+            self.invalidate(destination_path)
+            log.info("Moved '%s' to '%s'.", source, destination, extra={"path": source_path, "destination": destination_path})
         except Exception as e:
-            print(f"Error moving '{source}' to '{destination}': {e}")
+            log.error("Could not move '%s' to '%s': %s", source, destination, e)
 
+    @_operation("rename")
     def rename(self, old_name, new_name):
         """Rename a file or directory."""
         try:
-            old_path = os.path.join(self.current_directory, old_name)
-            new_path = os.path.join(self.current_directory, new_name)
+            old_path = self._path(old_name)
+            new_path = self._path(new_name)
 
-            if not os.path.exists(old_path):
-                print(f"Error: Path '{old_name}' does not exist.")
+            if not self._exists(old_path):
+                log.error("Path '%s' does not exist.", old_name)
                 return
 
-            os.rename(old_path, new_path)
-            print(f"Renamed '{old_name}' to '{new_name}'.")
+            self.backend.rename(old_path, new_path)
+            self.invalidate(old_path)
+            self.invalidate(new_path)
+            log.info("Renamed '%s' to '%s'.", old_name, new_name, extra={"path": old_path, "destination": new_path})
         except Exception as e:
-            print(f"Error renaming '{old_name}' to '{new_name}': {e}")
+            log.error("Could not rename '%s' to '%s': %s", old_name, new_name, e)
+
+    def close(self):
+        """Flush and release the backend."""
+        self.backend.close()
@@ -0,0 +1,406 @@
+import fnmatch
+import json
+import re
+import threading
+import time
+
+
+INDEX_FILE = ".fs_index.json"
+INDEX_VERSION = 1
+IGNORED_NAMES = {INDEX_FILE, INDEX_FILE + ".tmp", ".git", "__pycache__"}
+TOKEN = re.compile(rb"\w{2,}")
+WORD = re.compile(r"\w{2,}", re.ASCII)  # Same characters as TOKEN, which only sees ASCII in bytes
+
+
+def _grams(word):
+    """Return the trigrams of a word, or the word itself if it is too short to have any."""
+    if len(word) < 3:
+        return {word}
+    return {word[index:index + 3] for index in range(len(word) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "is_file")
+
+    def __init__(self):
+        self.children = {}  # Path component -> _TrieNode
+        self.is_file = False
+
+
+class FileIndex:
+    def __init__(self, file_system, root=None, index_file=INDEX_FILE, index_content=True,
+                 max_content_bytes=1024 * 1024, max_age=60, watcher=None):
+        """Initialize an index of the tree under ``root`` (the current directory by default).
+
+        Paths live in a trie keyed by path component, with a basename map for
+        name lookups. With ``index_content``, an inverted index maps each word
+        of a text file (up to ``max_content_bytes``) to the files containing it,
+        and a trigram index over those words finds the ones containing a substring.
+        The index is saved as ``index_file`` under the root. ``refresh`` only
+        re-reads files whose mtime or size changed; ``update_path`` applies a
+        single change and is fed by ``watcher`` (a FileSystemWatcher) if given.
+        Queries refresh first if the last refresh is older than ``max_age``
+        seconds, unless the watcher is covering the whole indexed tree.
+        """
+        self.file_system = file_system
+        self.backend = file_system.backend
+        self.root = root or file_system.current_directory
+        self.index_path = self.backend.join(self.root, index_file)
+        self.index_content = index_content
+        self.max_content_bytes = max_content_bytes
+        self.max_age = max_age
+        self.watcher = watcher
+        self.listener = lambda kind, path: self.update_path(path)
+        if watcher is not None:
+            watcher.listeners.append(self.listener)
+        self.lock = threading.RLock()  # Watcher updates arrive on another thread
+        self.trie = _TrieNode()
+        self.files = {}              # Relative path -> (mtime, size)
+        self.names = {}              # Basename -> set of relative paths
+        self.postings = {}           # Word -> set of relative paths
+        self.grams = {}              # Trigram (or a whole two-letter word) -> indexed words containing it
+        self.file_words = {}         # Relative path -> words indexed for it
+        self.unindexed = set()       # Text files too large to index, which grep scans instead
+        self.refreshed_at = None
+
+    # Paths
+
+    def _relative(self, path):
+        """Return a path relative to the root with "/" separators, or None if it is outside the root."""
+        path = self.backend.join(self.root, path)
+        if path == self.root:
+            return ""
+        prefix = self.root.rstrip("/\\")
+        if not path.startswith(prefix) or path[len(prefix)] not in "/\\":
+            return None
+        return path[len(prefix) + 1:].replace("\\", "/")
+
+    def _absolute(self, relative):
+        return self.backend.join(self.root, relative)
+
+    def _ignored(self, relative):
+        return any(part in IGNORED_NAMES for part in relative.split("/"))
+
+    # Index maintenance
+
+    def _add(self, relative, mtime, size):
+        self._remove(relative)
+        node = self.trie
+        for part in relative.split("/"):
+            node = node.children.setdefault(part, _TrieNode())
+        node.is_file = True
+        self.files[relative] = (mtime, size)
+        self.names.setdefault(relative.rsplit("/", 1)[-1], set()).add(relative)
+        if self.index_content:
+            words = self._read_words(relative, size)
+            if words is None:
+                self.unindexed.add(relative)
+            else:
+                self._post(relative, words)
+
+    def _post(self, relative, words):
+        self.file_words[relative] = words
+        for word in words:
+            paths = self.postings.get(word)
+            if paths is None:
+                paths = self.postings[word] = set()
+                for gram in _grams(word):
+                    self.grams.setdefault(gram, set()).add(word)
+            paths.add(relative)
+
+    def _read_words(self, relative, size):
+        """Return the distinct words of a text file, [] for binary files, or None if it is too large."""
+        if size > self.max_content_bytes:
+            return None
+        try:
+            with self.backend.open(self._absolute(relative), "rb") as file:
+                data = file.read(self.max_content_bytes)
+        except OSError:
+            return []
+        if b"\0" in data[:8192]:
+            return []  # Binary
+        return sorted({word.decode("utf-8", "replace") for word in TOKEN.findall(data.lower())})
+
+    def _remove(self, relative):
+        if relative not in self.files:
+            return
+        del self.files[relative]
+        name = relative.rsplit("/", 1)[-1]
+        self.names[name].discard(relative)
+        if not self.names[name]:
+            del self.names[name]
+        for word in self.file_words.pop(relative, ()):
+            paths = self.postings[word]
+            paths.discard(relative)
+            if not paths:
+                del self.postings[word]
+                for gram in _grams(word):
+                    words = self.grams[gram]
+                    words.discard(word)
+                    if not words:
+                        del self.grams[gram]
+        self.unindexed.discard(relative)
+        # Unlink the file from the trie, pruning directories left empty
+        path = [self.trie]
+        for part in relative.split("/"):
+            path.append(path[-1].children[part])
+        path[-1].is_file = False
+        for parent, part, node in zip(reversed(path[:-1]), reversed(relative.split("/")), reversed(path[1:])):
+            if node.children or node.is_file:
+                break
+            del parent.children[part]
+
+    def _subtree(self, relative):
+        """Return the relative paths of every indexed file at or below a path."""
+        node = self.trie
+        if relative:
+            for part in relative.split("/"):
+                node = node.children.get(part)
+                if node is None:
+                    return []
+        found = []
+        stack = [(node, relative)]
+        while stack:
+            node, prefix = stack.pop()
+            if node.is_file:
+                found.append(prefix)
+            for part, child in node.children.items():
+                stack.append((child, f"{prefix}/{part}" if prefix else part))
+        return found
+
+    def _scan(self, relative, seen):
+        """Index new or changed files below a directory, recording every file found in ``seen``."""
+        try:
+            entries = list(self.backend.scandir(self._absolute(relative)))
+        except OSError:
+            return 0
+        changed = 0
+        for name, kind, size, mtime in entries:
+            child = f"{relative}/{name}" if relative else name
+            if self._ignored(child):
+                continue
+            if kind == "dir":
+                changed += self._scan(child, seen)
+            elif kind == "file":
+                seen.add(child)
+                if self.files.get(child) != (mtime, size):
+                    self._add(child, mtime, size)
+                    changed += 1
+        return changed
+
+    def refresh(self):
+        """Bring the index up to date with the tree, re-reading only changed files. Returns the change count."""
+        with self.lock:
+            seen = set()
+            changed = self._scan("", seen)
+            for relative in [relative for relative in self.files if relative not in seen]:
+                self._remove(relative)
+                changed += 1
+            self.refreshed_at = time.monotonic()
+            return changed
+
+    def update_path(self, path):
+        """Apply a change to one file or directory (created, modified or deleted)."""
+        relative = self._relative(path)
+        if relative is None or self._ignored(relative):
+            return
+        with self.lock:
+            self._update(relative)
+
+    def _update(self, relative):
+        try:
+            kind, size, mtime = self.backend.stat(self._absolute(relative))
+        except OSError:
+            for gone in self._subtree(relative):
+                self._remove(gone)
+            return
+        if kind == "dir":
+            seen = set()
+            self._scan(relative, seen)
+            for gone in self._subtree(relative):
+                if gone not in seen:
+                    self._remove(gone)
+        elif self.files.get(relative) != (mtime, size):
+            self._add(relative, mtime, size)
+
+    def covers(self, path):
+        """True if a path is the index root or inside it."""
+        return self._relative(path) is not None
+
+    def _live(self):
+        """True while the watcher is running over the index root, so every change reaches update_path."""
+        return self.watcher is not None and self.watcher.running and self.watcher.root == self.root
+
+    def ensure_fresh(self):
+        """Load the saved index on first use, then refresh it if it may be stale, saving any changes."""
+        if self.refreshed_at is None:
+            self.load()
+        elif self._live() or time.monotonic() - self.refreshed_at <= self.max_age:
+            return
+        if self.refresh():
+            self.save()
+
+    # Persistence
+
+    def save(self):
+        """Write the index under the root, atomically."""
+        with self.lock:
+            data = {
+                "version": INDEX_VERSION,
+                "content": self.index_content,
+                "files": {relative: [mtime, size, self.file_words.get(relative)]
+                          for relative, (mtime, size) in self.files.items()},
+            }
+        temporary = self.index_path + ".tmp"
+        with self.backend.open(temporary, "wb") as file:
+            file.write(json.dumps(data, separators=(",", ":")).encode())
+        self.backend.rename(temporary, self.index_path)
+
+    def load(self):
+        """Load a saved index. Returns False if there is none or it does not match these settings."""
+        try:
+            with self.backend.open(self.index_path, "rb") as file:
+                data = json.loads(file.read())
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("content") != self.index_content:
+            return False
+        for relative, (mtime, size, words) in data["files"].items():
+            node = self.trie
+            for part in relative.split("/"):
+                node = node.children.setdefault(part, _TrieNode())
+            node.is_file = True
+            self.files[relative] = (mtime, size)
+            self.names.setdefault(relative.rsplit("/", 1)[-1], set()).add(relative)
+            if words is not None:
+                self._post(relative, words)
+            elif self.index_content:
+                self.unindexed.add(relative)
+        return True
+
+    def close(self):
+        """Stop following the watcher and save the index if it has been used."""
+        if self.watcher is not None and self.listener in self.watcher.listeners:
+            self.watcher.listeners.remove(self.listener)
+        if self.refreshed_at is not None:
+            self.save()
+
+    # Queries
+
+    def find(self, pattern):
+        """Return sorted relative paths matching a glob.
+
+        A pattern without "/" matches file names anywhere in the tree through
+        the basename map; one with "/" is matched component by component down
+        the trie, where "**" spans any number of directories.
+        """
+        self.ensure_fresh()
+        with self.lock:
+            if "/" not in pattern:
+                if not re.search(r"[*?[]", pattern):
+                    return sorted(self.names.get(pattern, ()))
+                matches = re.compile(fnmatch.translate(pattern)).match
+                return sorted(path for name, paths in self.names.items() if matches(name) for path in paths)
+            found = set()
+            self._match(self.trie, "", [part for part in pattern.split("/") if part], found)
+            return sorted(found)
+
+    def _match(self, node, prefix, parts, found):
+        if not parts:
+            if node.is_file:
+                found.add(prefix)
+            return
+        part, rest = parts[0], parts[1:]
+        if part == "**":
+            self._match(node, prefix, rest, found)  # Zero directories
+            for name, child in node.children.items():
+                self._match(child, f"{prefix}/{name}" if prefix else name, parts, found)
+            return
+        if re.search(r"[*?[]", part):
+            matches = re.compile(fnmatch.translate(part)).match
+            children = [(name, child) for name, child in node.children.items() if matches(name)]
+        else:
+            child = node.children.get(part)
+            children = [(part, child)] if child is not None else []
+        for name, child in children:
+            self._match(child, f"{prefix}/{name}" if prefix else name, rest, found)
+
+    def candidates(self, query):
+        """Return the files that may contain a regex, narrowed by the words it requires when possible."""
+        self.ensure_fresh()
+        with self.lock:
+            # Plain words (no regex syntax) must each appear in a matching file, possibly inside a longer word
+            if self.index_content and not re.search(r"[\\.^$*+?{}\[\]|()]", query):
+                words = WORD.findall(query.lower())
+                if words:
+                    sets = sorted((self._containing(word) for word in words), key=len)
+                    return sorted(set.intersection(*sets) | self.unindexed)
+            return sorted(self.files)
+
+    def _containing(self, word):
+        """Return the files with an indexed word containing ``word``, e.g. "scheduler_thread" for "schedul".
+
+        The words sharing every trigram of ``word`` are the candidates, checked
+        with a substring test. A two-letter word has no trigram, so the trigram
+        keys are scanned instead, whose number is bounded by the alphabet
+        rather than the vocabulary.
+        """
+        if len(word) < 3:
+            tokens = set(self.grams.get(word, ()))
+            for gram, found in self.grams.items():
+                if len(gram) == 3 and word in gram:
+                    tokens |= found
+        else:
+            sets = sorted((self.grams.get(gram, set()) for gram in _grams(word)), key=len)
+            tokens = [token for token in sets[0] if word in token and all(token in found for found in sets[1:])]
+        paths = set()
+        for token in tokens:
+            paths |= self.postings[token]
+        return paths
+
+    def grep(self, query, pattern=None, ignore_case=True):
+        """Yield (relative path, line number, line) for every line matching a regex.
+
+        Only candidate files from the inverted index are read, and only those
+        whose path matches the optional ``pattern`` glob.
+        """
+        regex = re.compile(query, re.IGNORECASE if ignore_case else 0)
+        allowed = set(self.find(pattern)) if pattern else None
+        for relative in self.candidates(query):
+            if allowed is not None and relative not in allowed:
+                continue
+            try:
+                for number, line in enumerate(self._lines(relative), 1):
+                    if regex.search(line):
+                        yield relative, number, line
+            except OSError:
+                continue
+
+    def _lines(self, relative):
+        """Yield the decoded lines of a file, streaming it in chunks."""
+        with self.backend.open(self._absolute(relative), "rb") as file:
+            head = file.read(8192)
+            if b"\0" in head:
+                return  # Binary
+            pending = head
+            while True:
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    yield line.decode("utf-8", "replace")
+                chunk = file.read(64 * 1024)
+                if not chunk:
+                    break
+                pending += chunk
+            if pending:
+                yield pending.decode("utf-8", "replace")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "root": self.root,
+                "files": len(self.files),
+                "names": len(self.names),
+                "words": len(self.postings),
+                "trigrams": len(self.grams),
+                "unindexed": len(self.unindexed),
+            }
@@ -0,0 +1,283 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from system_log import get_logger
+
+
+log = get_logger("FileSystemWatcher")
+
+
+# inotify event flags (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+# Files the OS itself rewrites constantly; watching them would only echo our own activity
+DEFAULT_IGNORE = ("task_log.txt*", "task_state.*", "os.sock", "os.token", ".fs_index.json*", "*.tmp", "*.swp",
+                  "__pycache__", ".git", "*.pyc")
+
+
+def _load_libc():
+    """Return libc with the inotify functions, or None where inotify is unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyBackend:
+    def __init__(self, libc):
+        """Initialize an inotify instance."""
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {}  # Watch descriptor -> directory path
+
+    def watch_tree(self, root, ignored):
+        """Add a watch on ``root`` and every directory below it. Returns the files found."""
+        found = []
+        for directory, subdirectories, files in os.walk(root):
+            subdirectories[:] = [name for name in subdirectories if not ignored(name)]
+            self._add_watch(directory)
+            found.extend(os.path.join(directory, name) for name in subdirectories + files if not ignored(name))
+        return found
+
+    def _add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self.paths[wd] = directory
+
+    def clear(self):
+        """Remove every watch."""
+        for wd in list(self.paths):
+            self.libc.inotify_rm_watch(self.fd, wd)
+        self.paths.clear()
+
+    def read_events(self, timeout, ignored):
+        """Wait up to ``timeout`` seconds and return a list of (kind, path) changes."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        changes = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changes.append(("overflow", None))
+                continue
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            directory = self.paths.get(wd)
+            if directory is None or not name or ignored(name):
+                continue
+            path = os.path.join(directory, name)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                changes.append(("created", path))
+                if mask & IN_ISDIR:
+                    # Watch the new directory and report anything created in it before the watch existed
+                    changes.extend(("created", found) for found in self.watch_tree(path, ignored))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                changes.append(("deleted", path))
+            elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                changes.append(("modified", path))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    def __init__(self, interval):
+        """Initialize an mtime-snapshot poller."""
+        self.interval = interval
+        self.root = None
+        self.snapshot = {}  # Path -> (mtime_ns, size)
+        self.ignored = None
+
+    def _scan(self, root):
+        snapshot = {}
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self.ignored(entry.name):
+                            continue
+                        try:
+                            info = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        snapshot[entry.path] = (info.st_mtime_ns, info.st_size)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return snapshot
+
+    def watch_tree(self, root, ignored):
+        self.root = root
+        self.ignored = ignored
+        self.snapshot = self._scan(root)
+        return []
+
+    def clear(self):
+        self.snapshot = {}
+
+    def read_events(self, timeout, ignored):
+        """Sleep up to one poll interval, rescan and diff against the last snapshot."""
+        time.sleep(min(timeout, self.interval))
+        current = self._scan(self.root)
+        changes = [("deleted", path) for path in self.snapshot if path not in current]
+        for path, signature in current.items():
+            previous = self.snapshot.get(path)
+            if previous is None:
+                changes.append(("created", path))
+            elif previous != signature:
+                changes.append(("modified", path))
+        self.snapshot = current
+        return changes
+
+    def close(self):
+        pass
+
+
+class FileSystemWatcher:
+    EVENT_INTERRUPTS = {"created": "file_created", "modified": "file_modified", "deleted": "file_deleted"}
+
+    def __init__(self, file_system, interrupt_handler, debounce=0.2, backend="auto",
+                 poll_interval=1.0, ignore=DEFAULT_IGNORE):
+        """Initialize the watcher.
+
+        Watches ``file_system.current_directory`` and its subdirectories,
+        following the file system when it changes directory, and raises
+        ``file_created`` / ``file_modified`` / ``file_deleted`` interrupts with
+        the path. A path's events are merged and only raised once it has been
+        quiet for ``debounce`` seconds. ``backend`` is "inotify", "polling" or
+        "auto" (inotify where the OS provides it).
+        """
+        self.file_system = file_system
+        self.interrupt_handler = interrupt_handler
+        self.debounce = debounce
+        self.ignore = ignore
+        self.backend = None
+        if backend in ("auto", "inotify"):
+            libc = _load_libc()
+            if libc is not None:
+                try:
+                    self.backend = InotifyBackend(libc)
+                except OSError as e:
+                    log.warning("inotify unavailable (%s), falling back to polling.", e)
+            elif backend == "inotify":
+                log.warning("inotify unavailable, falling back to polling.")
+        if self.backend is None:
+            self.backend = PollingBackend(poll_interval)
+        self.root = None
+        self.pending = {}  # Path -> [merged event kind, time of last event]
+        self.running = False
+        self.thread = None
+        self.listeners = []  # Extra callbacks(kind, path) run for every raised event
+
+    def _ignored(self, name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.ignore)
+
+    def start(self):
+        """Start watching in a background thread."""
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._watch_loop, daemon=True, name="fs-watcher")
+            self.thread.start()
+            kind = "inotify" if isinstance(self.backend, InotifyBackend) else "polling"
+            log.info("Watching '%s' (%s).", self.file_system.current_directory, kind)
+
+    def stop(self):
+        """Stop watching."""
+        self.running = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.thread = None
+        log.info("Stopped.")
+
+    def _rewatch(self):
+        """Point the backend at the file system's current directory."""
+        self.backend.clear()
+        self.pending.clear()
+        self.root = self.file_system.current_directory
+        self.backend.watch_tree(self.root, self._ignored)
+
+    def _merge(self, kind, path, now):
+        """Fold a new event for a path into its pending one."""
+        pending = self.pending.get(path)
+        if pending is None:
+            self.pending[path] = [kind, now]
+            return
+        previous = pending[0]
+        if previous == "created" and kind == "deleted":
+            del self.pending[path]  # Came and went within the window
+            return
+        if previous == "created" and kind == "modified":
+            kind = "created"
+        elif previous == "deleted" and kind == "created":
+            kind = "modified"  # Replaced in place, e.g. by an atomic rename
+        pending[0] = kind
+        pending[1] = now
+
+    def _flush(self, now):
+        """Raise interrupts for every path that has been quiet for the debounce window."""
+        for path, (kind, last_seen) in list(self.pending.items()):
+            if now - last_seen >= self.debounce:
+                del self.pending[path]
+                self.interrupt_handler.trigger_interrupt(self.EVENT_INTERRUPTS[kind], path)
+                for listener in self.listeners:
+                    listener(kind, path)
+
+    def _watch_loop(self):
+        try:
+            while self.running:
+                if self.root != self.file_system.current_directory:
+                    self._rewatch()
+                timeout = self.debounce / 2 if self.pending else 0.5
+                changes = self.backend.read_events(timeout, self._ignored)
+                now = time.monotonic()
+                for kind, path in changes:
+                    if kind == "overflow":
+                        log.warning("Event queue overflowed; some changes were missed.")
+                        self._rewatch()
+                        continue
+                    self._merge(kind, path, now)
+                self._flush(now)
+        finally:
+            self.backend.clear()
+            self.backend.close()
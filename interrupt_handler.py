@@ -1,53 +1,400 @@
+import itertools
+import queue
 import threading
 import time
+from collections import deque
+from metrics import REGISTRY
+from system_log import get_logger
+
+
+log = get_logger("InterruptHandler")
 
 
 class InterruptHandler:
-    def __init__(self):
+    DEFAULT_PRIORITY = 5   # IRQ priority level; lower numbers are dispatched first
+    MAX_PENDING = 1000     # Interrupts held per masked type before the oldest are dropped
+
+    def __init__(self, workers=2):
         """Initialize the interrupt handler."""
-        self.interrupts = {}  # Dictionary to store interrupt types and their handlers
+        self.interrupts = {}  # Dictionary to store interrupt types and their chained handlers
+        self.priorities = {}  # IRQ priority level of each interrupt type
+        self.masked = set()   # Interrupt types whose delivery is held back
+        self.pending = {}     # Interrupts raised while masked, per type
+        self.queue = queue.PriorityQueue()  # (priority, sequence, raised_at, type, args, kwargs)
+        self.sequence = itertools.count()   # Keeps FIFO order within a priority level
+        self.workers = workers  # Number of dispatcher threads
+        self.worker_threads = []
         self.running = False  # Flag to control the interrupt loop
-        self.lock = threading.Lock()  # Thread safety
+        self.lock = threading.Lock()  # Guards the tables above; never held while a handler runs
         self.timer_interval = 5  # Default timer interval in seconds
+        self.timer_wakeup = threading.Condition()  # Guards self.timers; signalled on stop or reconfigure
+        self.timers = {}  # Timer name -> state dict, see add_timer
+        self.timer_thread = None
+        self.stats = {}  # Per-type dispatch counters
+        self.max_queue_depth = 0
+        self.coalesce_windows = {}  # Interrupt type -> batching window in seconds
+        self.batches = {}           # Interrupt type -> (first raised_at, collected args) of the open batch
+        self.rate_limits = {}       # Interrupt type -> [rate per second, burst, tokens, last refill]
+        self.add_timer("timer", self.timer_interval, announce=False)
 
-    def register_interrupt(self, interrupt_type, handler):
-        """Register a handler for a specific interrupt type."""
+    def register_interrupt(self, interrupt_type, handler, priority=None):
+        """Add a handler to the chain for a specific interrupt type."""
         with self.lock:
-            self.interrupts[interrupt_type] = handler
-            print(f"InterruptHandler: Registered interrupt '{interrupt_type}'.")
+            handlers = self.interrupts.setdefault(interrupt_type, [])
+            if handler not in handlers:
+                handlers.append(handler)
+            if priority is not None or interrupt_type not in self.priorities:
+                self.priorities[interrupt_type] = self.DEFAULT_PRIORITY if priority is None else priority
+            log.info("Registered interrupt '%s' (priority %s, %d handler(s)).", interrupt_type,
+                     self.priorities[interrupt_type], len(handlers), extra={"interrupt": interrupt_type})
 
-    def trigger_interrupt(self, interrupt_type, *args, **kwargs):
-        """Trigger an interrupt and call the associated handler."""
+    def unregister_interrupt(self, interrupt_type, handler=None):
+        """Remove one handler, or every handler when none is given, from an interrupt type."""
+        with self.lock:
+            handlers = self.interrupts.get(interrupt_type)
+            if handlers is None:
+                log.warning("Unknown interrupt '%s'.", interrupt_type)
+                return
+            if handler is None:
+                del self.interrupts[interrupt_type]
+            elif handler in handlers:
+                handlers.remove(handler)
+                if not handlers:
+                    del self.interrupts[interrupt_type]
+            log.info("Unregistered handler for interrupt '%s'.", interrupt_type, extra={"interrupt": interrupt_type})
+
+    def set_coalescing(self, interrupt_type, window):
+        """Batch triggers of a type that arrive within ``window`` seconds of the first one.
+
+        Handlers of a coalesced type are called once per batch with a single
+        argument: the list of positional-argument tuples of every trigger in
+        the batch. A window of 0 turns coalescing off.
+        """
         with self.lock:
-            if interrupt_type in self.interrupts:
-                print(f"InterruptHandler: Handling interrupt '{interrupt_type}'...")
-                self.interrupts[interrupt_type](*args, **kwargs)
+            if window > 0:
+                self.coalesce_windows[interrupt_type] = window
+                log.info("Coalescing '%s' over %s seconds.", interrupt_type, window, extra={"interrupt": interrupt_type})
             else:
-                print(f"InterruptHandler: Unknown interrupt '{interrupt_type}'.")
+                self.coalesce_windows.pop(interrupt_type, None)
+                log.info("Coalescing disabled for '%s'.", interrupt_type, extra={"interrupt": interrupt_type})
+
+    def set_rate_limit(self, interrupt_type, rate, burst=None):
+        """Drop triggers of a type beyond ``rate`` per second, allowing bursts of ``burst``.
+
+        A rate of 0 or None removes the limit.
+        """
+        with self.lock:
+            if rate:
+                burst = burst or max(1, int(rate))
+                self.rate_limits[interrupt_type] = [rate, burst, burst, time.monotonic()]
+                log.info("Rate limit for '%s' set to %s/s (burst %s).", interrupt_type, rate, burst,
+                         extra={"interrupt": interrupt_type})
+            else:
+                self.rate_limits.pop(interrupt_type, None)
+                log.info("Rate limit removed for '%s'.", interrupt_type, extra={"interrupt": interrupt_type})
+
+    def _counters(self, interrupt_type):
+        """Return the counter dict for a type, creating it. Caller must hold the lock."""
+        stats = self.stats.get(interrupt_type)
+        if stats is None:
+            stats = self.stats[interrupt_type] = {
+                "count": 0, "latency_total": 0.0, "latency_max": 0.0, "handler_total": 0.0,
+                "dropped": 0, "coalesced": 0,
+                # Shared with the metrics registry, which keeps full latency distributions
+                "latency_histogram": REGISTRY.histogram(
+                    "interrupt_dispatch_latency_seconds", "Time from raising an interrupt to its handlers starting.",
+                    type=interrupt_type),
+                "handler_histogram": REGISTRY.histogram(
+                    "interrupt_handler_seconds", "Time spent running an interrupt's handlers.", type=interrupt_type),
+                "dropped_counter": REGISTRY.counter(
+                    "interrupt_dropped_total", "Interrupts dropped by rate limits.", type=interrupt_type),
+                "coalesced_counter": REGISTRY.counter(
+                    "interrupt_coalesced_total", "Interrupts merged into an open batch.", type=interrupt_type)}
+        return stats
+
+    def _allow(self, interrupt_type):
+        """Take a token from the type's bucket, if it has a rate limit. Caller must hold the lock."""
+        limit = self.rate_limits.get(interrupt_type)
+        if limit is None:
+            return True
+        rate, burst, tokens, last_refill = limit
+        now = time.monotonic()
+        tokens = min(burst, tokens + (now - last_refill) * rate)
+        limit[3] = now
+        if tokens < 1:
+            limit[2] = tokens
+            return False
+        limit[2] = tokens - 1
+        return True
+
+    def trigger_interrupt(self, interrupt_type, *args, **kwargs):
+        """Raise an interrupt. The handlers run later on a dispatcher thread."""
+        with self.lock:
+            if interrupt_type not in self.interrupts:
+                log.warning("Unknown interrupt '%s'.", interrupt_type)
+                return
+            if not self._allow(interrupt_type):
+                stats = self._counters(interrupt_type)
+                stats["dropped"] += 1
+                stats["dropped_counter"].inc()
+                return
+            raised_at = time.perf_counter()
+            window = self.coalesce_windows.get(interrupt_type)
+            if window is not None:
+                if kwargs:
+                    log.error("Coalesced interrupt '%s' does not take keyword arguments.", interrupt_type)
+                    return
+                batch = self.batches.get(interrupt_type)
+                if batch is not None:
+                    batch[1].append(args)
+                    stats = self._counters(interrupt_type)
+                    stats["coalesced"] += 1
+                    stats["coalesced_counter"].inc()
+                    return
+                self.batches[interrupt_type] = (raised_at, [args])
+                flush = threading.Timer(window, self._flush_batch, args=(interrupt_type,))
+                flush.daemon = True
+                flush.start()
+                return
+            self._deliver(interrupt_type, raised_at, args, kwargs)
+
+    def _flush_batch(self, interrupt_type):
+        """Close the open batch of a coalesced type and deliver it as one interrupt."""
+        with self.lock:
+            batch = self.batches.pop(interrupt_type, None)
+            if batch is not None and interrupt_type in self.interrupts:
+                raised_at, collected = batch
+                self._deliver(interrupt_type, raised_at, (collected,), {})
+
+    def _deliver(self, interrupt_type, raised_at, args, kwargs):
+        """Queue an interrupt, or hold it if its type is masked. Caller must hold the lock."""
+        if interrupt_type in self.masked:
+            held = self.pending.setdefault(interrupt_type, deque(maxlen=self.MAX_PENDING))
+            held.append((raised_at, args, kwargs))
+            return
+        self._enqueue(interrupt_type, raised_at, args, kwargs)
+
+    def _enqueue(self, interrupt_type, raised_at, args, kwargs):
+        """Put an interrupt on the dispatch queue. Caller must hold the lock."""
+        self.queue.put((self.priorities[interrupt_type], next(self.sequence), raised_at,
+                        interrupt_type, args, kwargs))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def mask_interrupt(self, interrupt_type):
+        """Hold back delivery of an interrupt type until it is unmasked."""
+        with self.lock:
+            self.masked.add(interrupt_type)
+            log.info("Masked interrupt '%s'.", interrupt_type, extra={"interrupt": interrupt_type})
+
+    def unmask_interrupt(self, interrupt_type):
+        """Resume delivery of an interrupt type, releasing anything held while masked."""
+        with self.lock:
+            self.masked.discard(interrupt_type)
+            for raised_at, args, kwargs in self.pending.pop(interrupt_type, ()):
+                self._enqueue(interrupt_type, raised_at, args, kwargs)
+            log.info("Unmasked interrupt '%s'.", interrupt_type, extra={"interrupt": interrupt_type})
+
+    def _dispatch_loop(self):
+        """Dispatcher worker: take interrupts off the queue in priority order and run them."""
+        while True:
+            priority, _, raised_at, interrupt_type, args, kwargs = self.queue.get()
+            if interrupt_type is None:
+                return  # Stop sentinel
+            with self.lock:
+                handlers = list(self.interrupts.get(interrupt_type, ()))
+            if not handlers:
+                continue
+            started = time.perf_counter()
+            log.debug("Handling interrupt '%s'...", interrupt_type, extra={"interrupt": interrupt_type})
+            for handler in handlers:
+                try:
+                    handler(*args, **kwargs)
+                except Exception as e:
+                    log.error("Handler for '%s' failed: %s", interrupt_type, e, extra={"interrupt": interrupt_type})
+            self._record(interrupt_type, started - raised_at, time.perf_counter() - started)
+
+    def _record(self, interrupt_type, latency, duration):
+        """Update the dispatch counters for one handled interrupt."""
+        with self.lock:
+            stats = self._counters(interrupt_type)
+            stats["count"] += 1
+            stats["latency_total"] += latency
+            stats["handler_total"] += duration
+            if latency > stats["latency_max"]:
+                stats["latency_max"] = latency
+        stats["latency_histogram"].observe(latency)
+        stats["handler_histogram"].observe(duration)
+
+    def get_stats(self):
+        """Return queue depth and per-interrupt latency counters (latencies in seconds)."""
+        with self.lock:
+            per_type = {}
+            for interrupt_type, stats in self.stats.items():
+                count = stats["count"]
+                per_type[interrupt_type] = {
+                    "count": count,
+                    "avg_latency": stats["latency_total"] / count if count else 0.0,
+                    "max_latency": stats["latency_max"],
+                    "avg_handler_time": stats["handler_total"] / count if count else 0.0,
+                    "dropped": stats["dropped"],
+                    "coalesced": stats["coalesced"],
+                }
+            return {
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "pending_masked": sum(len(held) for held in self.pending.values()),
+                "interrupts": per_type,
+            }
+
+    def show_stats(self):
+        """Print dispatch statistics."""
+        stats = self.get_stats()
+        print(f"InterruptHandler: Queue depth {stats['queue_depth']} (max {stats['max_queue_depth']}), "
+              f"{stats['pending_masked']} held by masks.")
+        for interrupt_type, counters in stats["interrupts"].items():
+            print(f"  - {interrupt_type}: {counters['count']} handled, {counters['coalesced']} coalesced, "
+                  f"{counters['dropped']} dropped, latency avg {counters['avg_latency'] * 1000:.2f}ms "
+                  f"/ max {counters['max_latency'] * 1000:.2f}ms")
 
     def start(self):
-        """Start the interrupt loop in a separate thread."""
+        """Start the dispatcher workers and the timer loop in separate threads."""
         if not self.running:
             self.running = True
-            threading.Thread(target=self._interrupt_loop, daemon=True).start()
-            print("InterruptHandler: Interrupt loop started.")
+            self.worker_threads = [
+                threading.Thread(target=self._dispatch_loop, daemon=True, name=f"irq-dispatch-{index}")
+                for index in range(self.workers)
+            ]
+            for worker in self.worker_threads:
+                worker.start()
+            with self.timer_wakeup:
+                now = time.monotonic()
+                for timer in self.timers.values():
+                    self._arm(timer, now)
+            self.timer_thread = threading.Thread(target=self._interrupt_loop, daemon=True, name="irq-timer")
+            self.timer_thread.start()
+            log.info("Interrupt loop started.")
+
+    def stop(self, timeout=2):
+        """Stop the interrupt loop and let the dispatchers drain the queue."""
+        with self.timer_wakeup:
+            self.running = False
+            self.timer_wakeup.notify()  # Wake the timer loop now rather than at its next tick
+        if self.timer_thread is not None and self.timer_thread is not threading.current_thread():
+            self.timer_thread.join(timeout)
+        self.timer_thread = None
+        for _ in self.worker_threads:
+            # Sentinels sort after every real interrupt, so queued work is handled first
+            self.queue.put((float("inf"), next(self.sequence), 0, None, (), {}))
+        for worker in self.worker_threads:
+            if worker is not threading.current_thread():
+                worker.join(timeout)
+        self.worker_threads = []
+        log.info("Interrupt loop stopped.")
+
+    def add_timer(self, name, interval, interrupt_type=None, announce=True):
+        """Add a named periodic timer that raises ``interrupt_type`` (default: ``name``).
+
+        Intervals may be fractions of a second. Ticks are scheduled on the
+        monotonic clock at fixed multiples of the interval from when the timer
+        was armed, so handler time and wakeup delays never accumulate as drift.
+        """
+        if interval <= 0:
+            log.error("Invalid interval. Must be greater than 0.")
+            return
+        with self.timer_wakeup:
+            timer = {
+                "interval": interval,
+                "interrupt_type": interrupt_type or name,
+                "anchor": 0.0,      # Monotonic time the current schedule counts from
+                "deadline": 0.0,    # Monotonic time of the next tick
+                "ticks": 0,
+                "missed": 0,        # Ticks skipped because the loop fell a whole interval behind
+                "jitter_total": 0.0,
+                "jitter_max": 0.0,
+            }
+            self.timers[name] = timer
+            if self.running:
+                self._arm(timer, time.monotonic())
+                self.timer_wakeup.notify()
+        if announce:
+            log.info("Timer '%s' raises '%s' every %s seconds.", name, timer["interrupt_type"], interval,
+                     extra={"timer": name, "interval": interval})
 
-    def stop(self):
-        """Stop the interrupt loop."""
-        self.running = False
-        print("InterruptHandler: Interrupt loop stopped.")
+    def remove_timer(self, name):
+        """Remove a named timer."""
+        with self.timer_wakeup:
+            removed = self.timers.pop(name, None)
+            self.timer_wakeup.notify()
+        if removed is None:
+            log.warning("Timer '%s' not found.", name)
+        else:
+            log.info("Removed timer '%s'.", name, extra={"timer": name})
+
+    def _arm(self, timer, anchor):
+        """Schedule a timer's ticks from ``anchor``. Caller must hold timer_wakeup."""
+        timer["anchor"] = anchor
+        timer["deadline"] = anchor + timer["interval"]
 
     def _interrupt_loop(self):
-        """Internal loop to trigger timer interrupts periodically."""
-        while self.running:
-            time.sleep(self.timer_interval)  # Wait for the timer interval
-            self.trigger_interrupt("timer")
+        """Internal loop to raise timer interrupts at their deadlines."""
+        while True:
+            due = []
+            with self.timer_wakeup:
+                if not self.running:
+                    return
+                now = time.monotonic()
+                next_deadline = None
+                for timer in self.timers.values():
+                    if timer["deadline"] <= now:
+                        jitter = now - timer["deadline"]
+                        timer["ticks"] += 1
+                        timer["jitter_total"] += jitter
+                        timer["jitter_max"] = max(timer["jitter_max"], jitter)
+                        # Next tick stays on the original grid; skip any we are a whole interval past
+                        missed = int(jitter // timer["interval"])
+                        timer["missed"] += missed
+                        timer["deadline"] += (missed + 1) * timer["interval"]
+                        due.append(timer["interrupt_type"])
+                    if next_deadline is None or timer["deadline"] < next_deadline:
+                        next_deadline = timer["deadline"]
+                if not due:
+                    self.timer_wakeup.wait(None if next_deadline is None else next_deadline - now)
+                    continue
+            for interrupt_type in due:
+                self.trigger_interrupt(interrupt_type)
 
-    def set_timer_interval(self, interval):
-        """Set a new interval for timer interrupts."""
-        with self.lock:
-            if interval > 0:
+    def get_timer_stats(self):
+        """Return per-timer tick counts and measured jitter (seconds late versus the deadline)."""
+        with self.timer_wakeup:
+            return {
+                name: {
+                    "interval": timer["interval"],
+                    "ticks": timer["ticks"],
+                    "missed": timer["missed"],
+                    "avg_jitter": timer["jitter_total"] / timer["ticks"] if timer["ticks"] else 0.0,
+                    "max_jitter": timer["jitter_max"],
+                }
+                for name, timer in self.timers.items()
+            }
+
+    def set_timer_interval(self, interval, name="timer"):
+        """Set a new interval for a timer. Takes effect immediately."""
+        if interval <= 0:
+            log.error("Invalid interval. Must be greater than 0.")
+            return
+        with self.timer_wakeup:
+            timer = self.timers.get(name)
+            if timer is None:
+                log.warning("Timer '%s' not found.", name)
+                return
+            last_tick = timer["deadline"] - timer["interval"] if timer["ticks"] else timer["anchor"]
+            timer["interval"] = interval
+            if name == "timer":
                 self.timer_interval = interval
-                print(f"InterruptHandler: Timer interval set to {self.timer_interval} seconds.")
-            else:
-                print("InterruptHandler: Invalid interval. Must be greater than 0.")
+            if self.running:
+                # Count the new interval from the last tick; fire at once if that is already past
+                self._arm(timer, min(last_tick, time.monotonic()))
+                self.timer_wakeup.notify()
+        log.info("Timer interval set to %s seconds.", interval, extra={"timer": name, "interval": interval})
@@ -1,46 +1,106 @@
+from kernel.pcb import DEFAULT_BURST, DEFAULT_PRIORITY, ProcessTable
+from kernel.scheduler import make_policy, simulate
+from system_log import get_logger
+
+
+log = get_logger("Kernel")
+
+
 class Kernel:
-    def __init__(self):
-        """Initialize the Kernel."""
-        self.process_table = []  # List to store process names
+    def __init__(self, cpus=1):
+        """Initialize the Kernel with a number of simulated CPUs."""
+        self.process_table = ProcessTable()  # PCBs indexed by PID and by name
+        self.cpus = cpus
         self.memory = {}         # Dictionary to manage memory allocations
-        print("Kernel: Initialized.")
+        log.info("Initialized.")
 
-    def manage_processes(self, action, process_name=None):
+    def manage_processes(self, action, process_name=None, priority=DEFAULT_PRIORITY, burst_time=DEFAULT_BURST,
+                         arrival_time=0.0):
         """Manage process creation and termination."""
         if action == "create":
-            if process_name not in self.process_table:
-                self.process_table.append(process_name)
-                print(f"Kernel: Process '{process_name}' created.")
+            try:
+                created = self.process_table.create(process_name, priority, arrival_time, burst_time)
+            except ValueError as e:
+                log.error("Cannot create process '%s': %s", process_name, e)
+                return
+            if created:
+                log.info("Process '%s' created.", process_name, extra={"process_name": process_name})
             else:
-                print(f"Kernel: Process '{process_name}' already exists.")
+                log.warning("Process '%s' already exists.", process_name)
         elif action == "terminate":
-            if process_name in self.process_table:
-                self.process_table.remove(process_name)
-                print(f"Kernel: Process '{process_name}' terminated.")
+            if self.process_table.terminate(process_name):
+                log.info("Process '%s' terminated.", process_name, extra={"process_name": process_name})
             else:
-                print(f"Kernel: Process '{process_name}' not found.")
+                log.warning("Process '%s' not found.", process_name)
+
+    def set_affinity(self, process_name, cpus):
+        """Restrict a process to a set of CPU numbers, or let it run anywhere if ``cpus`` is None."""
+        pcb = self.process_table.get(process_name)
+        if pcb is None:
+            log.warning("Process '%s' not found.", process_name)
+            return
+        if cpus is None:
+            pcb.affinity = None
+            log.info("Process '%s' may run on any CPU.", process_name, extra={"process_name": process_name})
+            return
+        if not cpus or any(cpu < 0 or cpu >= self.cpus for cpu in cpus):
+            log.error("Invalid CPUs %s; this kernel has CPUs 0-%d.", sorted(cpus), self.cpus - 1)
+            return
+        pcb.affinity = sum(1 << cpu for cpu in set(cpus))
+        log.info("Process '%s' pinned to CPUs %s.", process_name, sorted(set(cpus)), extra={"process_name": process_name})
 
     def allocate_memory(self, process_name, size):
         """Allocate memory to a process."""
         if process_name in self.process_table:
             self.memory[process_name] = size
-            print(f"Kernel: Allocated {size}MB to '{process_name}'.")
+            log.info("Allocated %sMB to '%s'.", size, process_name, extra={"process_name": process_name, "size_mb": size})
         else:
-            print(f"Kernel: Cannot allocate memory. Process '{process_name}' does not exist.")
+            log.warning("Cannot allocate memory. Process '%s' does not exist.", process_name)
 
     def deallocate_memory(self, process_name):
         """Deallocate memory from a process."""
         if process_name in self.memory:
-            print(f"Kernel: Deallocated memory from '{process_name}'.")
+            log.info("Deallocated memory from '%s'.", process_name, extra={"process_name": process_name})
             del self.memory[process_name]
         else:
-            print(f"Kernel: No memory to deallocate for '{process_name}'.")
+            log.warning("No memory to deallocate for '%s'.", process_name)
 
     def display_process_table(self):
         """Display all active processes."""
         print("Kernel: Active Processes:")
-        for process in self.process_table:
-            print(f"- {process}")
+        for pcb in self.process_table:
+            print(f"- {pcb.name} (pid {pcb.pid}, {pcb.state}, priority {pcb.priority}, burst {pcb.burst_time})")
+
+    def simulate_scheduling(self, policy="rr", trace=None, cpus=None, stealing=True, placement="least_loaded",
+                            **options):
+        """Simulate CPU scheduling under a policy and report the results.
+
+        The trace is an iterable of (arrival, burst, priority, affinity); by
+        default it is built from the process table. It runs on the kernel's
+        CPUs unless ``cpus`` is given. Returns the metrics from ``simulate``.
+        """
+        cpus = cpus or self.cpus
+        if trace is None:
+            trace = sorted(((pcb.arrival_time, pcb.burst_time, pcb.priority, pcb.affinity)
+                            for pcb in self.process_table if pcb.burst_time > 0), key=lambda entry: entry[0])
+            if len(trace) < len(self.process_table):
+                log.warning("Skipped %d processes with no CPU time to simulate.", len(self.process_table) - len(trace))
+        make_policy(policy, **options)  # Reject unknown policies and options before starting
+        result = simulate(policy, trace, cpus=cpus, stealing=stealing, placement=placement, **options)
+        print(f"Kernel: Simulated {result['processes']} processes with {result['policy']} scheduling "
+              f"on {cpus} CPU{'s' if cpus > 1 else ''}.")
+        print(f"- Throughput: {result['throughput']:.4f} processes per time unit "
+              f"(CPU utilization {result['utilization']:.1%})")
+        print(f"- Turnaround: avg {result['avg_turnaround']:.2f}, p50 {result['p50_turnaround']:.2f}, "
+              f"p99 {result['p99_turnaround']:.2f}")
+        print(f"- Wait: avg {result['avg_wait']:.2f}, p50 {result['p50_wait']:.2f}, p99 {result['p99_wait']:.2f}")
+        print(f"- Response: avg {result['avg_response']:.2f}; context switches: {result['context_switches']}; "
+              f"migrations: {result['migrations']}")
+        if cpus > 1:
+            for core in result["per_cpu"]:
+                print(f"  CPU {core['cpu']}: {core['utilization']:.1%} busy, {core['completed']} completed, "
+                      f"{core['migrations']} migrated in")
+        return result
 
     def display_memory_usage(self):
         """Display current memory allocations."""
@@ -0,0 +1,83 @@
+NEW = "new"
+READY = "ready"
+RUNNING = "running"
+WAITING = "waiting"
+TERMINATED = "terminated"
+
+DEFAULT_PRIORITY = 0  # Nice value: MIN_PRIORITY (highest) to MAX_PRIORITY (lowest)
+MIN_PRIORITY = -20
+MAX_PRIORITY = 19
+DEFAULT_BURST = 1.0   # CPU time of a process created without one, so it still takes part in a simulation
+
+
+class PCB:
+    """Process control block. ``__slots__`` keeps a million of them affordable."""
+
+    __slots__ = ("pid", "name", "state", "priority", "arrival_time", "burst_time", "remaining",
+                 "start_time", "finish_time", "ready_since", "wait_time", "vruntime", "level", "seq",
+                 "affinity")
+
+    def __init__(self, pid, name, priority=DEFAULT_PRIORITY, arrival_time=0.0, burst_time=DEFAULT_BURST, affinity=None):
+        self.pid = pid
+        self.name = name
+        self.state = NEW
+        self.priority = priority
+        self.arrival_time = arrival_time
+        self.burst_time = burst_time      # Total CPU time the process needs
+        self.remaining = burst_time       # CPU time still needed
+        self.start_time = None            # When it first got the CPU
+        self.finish_time = None
+        self.ready_since = arrival_time   # When it last joined a ready queue
+        self.wait_time = 0.0              # Total time spent ready but not running
+        self.vruntime = 0.0               # Weighted CPU time, for CFS
+        self.level = 0                    # Queue level, for MLFQ
+        self.seq = pid                    # Tie-breaker for heap-based policies
+        self.affinity = affinity          # Bitmask of CPUs it may run on, or None for any
+
+    def __repr__(self):
+        return f"PCB(pid={self.pid}, name={self.name!r}, state={self.state}, remaining={self.remaining})"
+
+
+class ProcessTable:
+    def __init__(self):
+        """Initialize a process table indexed by PID and by name."""
+        self.processes = {}  # PID -> PCB
+        self.pids = {}       # Name -> PID
+        self.next_pid = 1
+
+    def create(self, name, priority=DEFAULT_PRIORITY, arrival_time=0.0, burst_time=DEFAULT_BURST):
+        """Create a process. Returns its PCB, or None if the name is taken."""
+        if not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+            raise ValueError(f"Priority {priority} is not a nice value from {MIN_PRIORITY} to {MAX_PRIORITY}.")
+        if name in self.pids:
+            return None
+        pcb = PCB(self.next_pid, name, priority, arrival_time, burst_time)
+        self.next_pid += 1
+        self.processes[pcb.pid] = pcb
+        self.pids[name] = pcb.pid
+        return pcb
+
+    def terminate(self, name):
+        """Remove a process by name. Returns its PCB, or None if there is no such process."""
+        pid = self.pids.pop(name, None)
+        if pid is None:
+            return None
+        pcb = self.processes.pop(pid)
+        pcb.state = TERMINATED
+        return pcb
+
+    def get(self, name):
+        pid = self.pids.get(name)
+        return self.processes[pid] if pid is not None else None
+
+    def by_pid(self, pid):
+        return self.processes.get(pid)
+
+    def __contains__(self, name):
+        return name in self.pids
+
+    def __iter__(self):
+        return iter(list(self.processes.values()))
+
+    def __len__(self):
+        return len(self.processes)
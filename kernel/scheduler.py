@@ -0,0 +1,524 @@
+import heapq
+import random
+import time
+from array import array
+from collections import deque
+
+from kernel.pcb import MAX_PRIORITY, MIN_PRIORITY, PCB, READY, RUNNING, TERMINATED
+
+
+NICE_0_WEIGHT = 1024
+# CFS load weights: each nice level is worth about 25% more or less CPU than the next
+WEIGHTS = {nice: NICE_0_WEIGHT / 1.25 ** nice for nice in range(MIN_PRIORITY, MAX_PRIORITY + 1)}
+STEAL_SCAN = 8  # Queued processes an idle CPU inspects for one it is allowed to run
+
+
+def _allowed(pcb, cpu_bit):
+    return pcb.affinity is None or pcb.affinity & cpu_bit
+
+
+def _take_from_deque(queue, cpu_bit):
+    """Remove and return a process the CPU may run from the tail of a queue, or None."""
+    for index in range(len(queue) - 1, max(-1, len(queue) - 1 - STEAL_SCAN), -1):
+        pcb = queue[index]
+        if _allowed(pcb, cpu_bit):
+            del queue[index]
+            return pcb
+    return None
+
+
+def _take_from_heap(heap, cpu_bit):
+    """Remove and return a process the CPU may run from the leaves of a heap of (key, seq, pcb), or None."""
+    for index in range(len(heap) - 1, max(len(heap) // 2 - 1, len(heap) - 1 - STEAL_SCAN), -1):
+        pcb = heap[index][2]
+        if _allowed(pcb, cpu_bit):
+            last = heap.pop()
+            if index < len(heap):
+                # The slot is a leaf, so the entry moved into it can only need to move up
+                heap[index] = last
+                while index:
+                    parent = (index - 1) // 2
+                    if heap[parent] <= heap[index]:
+                        break
+                    heap[parent], heap[index] = heap[index], heap[parent]
+                    index = parent
+            return pcb
+    return None
+
+
+class FCFSPolicy:
+    """First come, first served: run each process to completion in arrival order."""
+
+    name = "fcfs"
+    preemptive = False
+
+    def __init__(self):
+        self.queue = deque()
+
+    def add(self, pcb, now):
+        self.queue.append(pcb)
+
+    def pick(self, now):
+        return self.queue.popleft() if self.queue else None
+
+    def quantum(self, pcb):
+        return None  # Run to completion
+
+    def ran(self, pcb, elapsed):
+        pass
+
+    def requeue(self, pcb, now, expired):
+        self.queue.append(pcb)
+
+    def preempt(self, running):
+        return False
+
+    def finished(self, pcb):
+        pass
+
+    def steal(self, cpu_bit):
+        """Give up a queued process that the CPU with this bit may run, for work stealing."""
+        return _take_from_deque(self.queue, cpu_bit)
+
+    def adopt(self, pcb, now):
+        """Queue a process stolen from another CPU."""
+        self.queue.append(pcb)
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class SJFPolicy(FCFSPolicy):
+    """Shortest job first by remaining burst time; with ``preemptive``, shortest remaining time first."""
+
+    name = "sjf"
+
+    def __init__(self, preemptive=False):
+        self.heap = []  # (remaining, seq, pcb)
+        self.preemptive = preemptive
+        if preemptive:
+            self.name = "srtf"
+
+    def add(self, pcb, now):
+        heapq.heappush(self.heap, (pcb.remaining, pcb.seq, pcb))
+
+    def requeue(self, pcb, now, expired):
+        self.add(pcb, now)
+
+    def pick(self, now):
+        return heapq.heappop(self.heap)[2] if self.heap else None
+
+    def preempt(self, running):
+        return bool(self.heap) and self.heap[0][0] < running.remaining
+
+    def steal(self, cpu_bit):
+        return _take_from_heap(self.heap, cpu_bit)
+
+    def adopt(self, pcb, now):
+        self.add(pcb, now)
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class RoundRobinPolicy(FCFSPolicy):
+    """Round robin: a FIFO queue where each process runs for at most ``quantum``."""
+
+    name = "rr"
+
+    def __init__(self, quantum=4.0):
+        super().__init__()
+        self.time_slice = quantum
+
+    def quantum(self, pcb):
+        return self.time_slice
+
+
+class MLFQPolicy:
+    """Multi-level feedback queue.
+
+    New processes start in the top queue. Using up a whole quantum moves a
+    process down one level, where quanta are longer, and a process waiting in
+    a higher queue preempts lower ones. Every ``boost_interval`` all processes
+    return to the top so long jobs cannot starve.
+    """
+
+    name = "mlfq"
+    preemptive = True
+
+    def __init__(self, quanta=(2.0, 4.0, 8.0, 16.0), boost_interval=500.0):
+        self.quanta = quanta
+        self.boost_interval = boost_interval
+        self.queues = [deque() for _ in quanta]
+        self.count = 0
+        self.last_boost = 0.0
+
+    def add(self, pcb, now):
+        pcb.level = 0
+        self.queues[0].append(pcb)
+        self.count += 1
+
+    def pick(self, now):
+        if now - self.last_boost >= self.boost_interval:
+            self.last_boost = now
+            top = self.queues[0]
+            for queue in self.queues[1:]:
+                for pcb in queue:
+                    pcb.level = 0
+                top.extend(queue)
+                queue.clear()
+        for queue in self.queues:
+            if queue:
+                self.count -= 1
+                return queue.popleft()
+        return None
+
+    def quantum(self, pcb):
+        return self.quanta[pcb.level]
+
+    def ran(self, pcb, elapsed):
+        pass
+
+    def requeue(self, pcb, now, expired):
+        if expired and pcb.level < len(self.quanta) - 1:
+            pcb.level += 1
+        self.queues[pcb.level].append(pcb)
+        self.count += 1
+
+    def preempt(self, running):
+        return any(self.queues[level] for level in range(running.level))
+
+    def finished(self, pcb):
+        pass
+
+    def steal(self, cpu_bit):
+        # Take from the lowest levels first, where processes wait longest
+        for queue in reversed(self.queues):
+            pcb = _take_from_deque(queue, cpu_bit)
+            if pcb is not None:
+                self.count -= 1
+                return pcb
+        return None
+
+    def adopt(self, pcb, now):
+        self.queues[pcb.level].append(pcb)  # A migrated process keeps its level
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+class CFSPolicy:
+    """Completely-fair-scheduler style: always run the process with the least weighted CPU time.
+
+    A process's vruntime grows by its CPU time scaled by its nice weight, and
+    its slice is its weighted share of ``target_latency``, but never less than
+    ``min_granularity``. New processes start at the current minimum vruntime so
+    they cannot monopolise the CPU.
+    """
+
+    name = "cfs"
+    preemptive = False
+
+    def __init__(self, target_latency=24.0, min_granularity=3.0):
+        self.target_latency = target_latency
+        self.min_granularity = min_granularity
+        self.heap = []  # (vruntime, seq, pcb)
+        self.min_vruntime = 0.0
+        self.load = 0.0  # Total weight of runnable processes, including the running one
+
+    def add(self, pcb, now):
+        pcb.vruntime = max(pcb.vruntime, self.min_vruntime)
+        self.load += WEIGHTS[pcb.priority]
+        heapq.heappush(self.heap, (pcb.vruntime, pcb.seq, pcb))
+
+    def pick(self, now):
+        if not self.heap:
+            return None
+        pcb = heapq.heappop(self.heap)[2]
+        self.min_vruntime = max(self.min_vruntime, pcb.vruntime)
+        return pcb
+
+    def quantum(self, pcb):
+        return max(self.min_granularity, self.target_latency * WEIGHTS[pcb.priority] / self.load)
+
+    def ran(self, pcb, elapsed):
+        pcb.vruntime += elapsed * NICE_0_WEIGHT / WEIGHTS[pcb.priority]
+
+    def requeue(self, pcb, now, expired):
+        heapq.heappush(self.heap, (pcb.vruntime, pcb.seq, pcb))
+
+    def preempt(self, running):
+        return False
+
+    def finished(self, pcb):
+        self.load -= WEIGHTS[pcb.priority]
+
+    def steal(self, cpu_bit):
+        pcb = _take_from_heap(self.heap, cpu_bit)
+        if pcb is not None:
+            self.load -= WEIGHTS[pcb.priority]
+            pcb.vruntime -= self.min_vruntime  # Carried to the new queue relative to its minimum
+        return pcb
+
+    def adopt(self, pcb, now):
+        pcb.vruntime += self.min_vruntime
+        self.load += WEIGHTS[pcb.priority]
+        heapq.heappush(self.heap, (pcb.vruntime, pcb.seq, pcb))
+
+    def __len__(self):
+        return len(self.heap)
+
+
+POLICIES = {
+    "fcfs": FCFSPolicy,
+    "sjf": SJFPolicy,
+    "srtf": lambda **options: SJFPolicy(preemptive=True, **options),
+    "rr": RoundRobinPolicy,
+    "mlfq": MLFQPolicy,
+    "cfs": CFSPolicy,
+}
+
+
+def make_policy(name, **options):
+    if name not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy '{name}'.")
+    return POLICIES[name](**options)
+
+
+def workload(count, load=0.9, mean_burst=10.0, short_fraction=0.8, long_factor=20.0, cpus=1,
+             pinned_fraction=0.0, seed=0):
+    """Yield ``count`` (arrival, burst, priority, affinity) tuples.
+
+    Arrivals are Poisson at a rate that keeps ``cpus`` CPUs ``load`` busy.
+    Bursts are exponential, mixing short interactive jobs with ``long_factor``
+    times longer batch jobs, averaging ``mean_burst``. Priorities are nice
+    values between -5 and 5. A ``pinned_fraction`` of processes get an
+    affinity mask for one random CPU; the rest may run anywhere.
+    """
+    rng = random.Random(seed)
+    short_mean = mean_burst / (short_fraction + (1 - short_fraction) * long_factor)
+    rate = load * cpus / mean_burst
+    now = 0.0
+    for _ in range(count):
+        now += rng.expovariate(rate)
+        mean = short_mean if rng.random() < short_fraction else short_mean * long_factor
+        affinity = 1 << rng.randrange(cpus) if pinned_fraction and rng.random() < pinned_fraction else None
+        yield now, max(rng.expovariate(1 / mean), 0.01), rng.randint(-5, 5), affinity
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+class CPU:
+    """One simulated core with its own run queue (a policy instance) and counters."""
+
+    __slots__ = ("id", "bit", "policy", "running", "dispatched_at", "run_until", "token", "previous",
+                 "busy", "context_switches", "completed", "migrations")
+
+    def __init__(self, cpu_id, policy):
+        self.id = cpu_id
+        self.bit = 1 << cpu_id
+        self.policy = policy
+        self.running = None
+        self.dispatched_at = 0.0  # When the running process's CPU time was last accounted
+        self.run_until = 0.0      # When its slice ends
+        self.token = 0            # Bumped on every dispatch, so stale slice-end events are skipped
+        self.previous = None
+        self.busy = 0.0
+        self.context_switches = 0
+        self.completed = 0
+        self.migrations = 0       # Processes stolen from other CPUs
+
+
+def simulate(policy, trace, cpus=1, stealing=True, placement="least_loaded", **options):
+    """Run a trace of (arrival, burst, priority[, affinity]) through a policy and return its metrics.
+
+    ``policy`` is a policy name or, for a single CPU, a policy instance. Each
+    of the ``cpus`` CPUs has its own run queue. Arrivals go to the least
+    loaded CPU their affinity allows (``placement="least_loaded"``) or to
+    allowed CPUs in turn (``"round_robin"``). With ``stealing``, a CPU that
+    runs out of work takes a queued process from the busiest other CPU,
+    which counts as a migration.
+
+    This is a discrete-event simulation: time jumps straight to the next
+    arrival, slice expiry or completion, and only processes still in the
+    system are kept in memory, so traces of millions of processes stream
+    through. SJF and SRTF use each burst as an oracle estimate.
+    """
+    if isinstance(policy, str):
+        cores = [CPU(cpu_id, make_policy(policy, **options)) for cpu_id in range(cpus)]
+    elif cpus == 1:
+        cores = [CPU(0, policy)]
+    else:
+        raise ValueError("Pass a policy name to simulate more than one CPU.")
+    if placement not in ("least_loaded", "round_robin"):
+        raise ValueError(f"Unknown placement '{placement}'.")
+    preemptive = cores[0].policy.preemptive
+    started = time.perf_counter()
+    arrivals = iter(trace)
+    next_arrival = next(arrivals, None)
+    first_arrival = next_arrival[0] if next_arrival is not None else 0.0
+    now = first_arrival
+    events = []  # (slice end, CPU id, token) for every running CPU
+    idle = set(range(cpus))
+    woken = set()  # CPUs given new processes at the current instant
+    queued = 0     # Processes waiting in any run queue
+    next_cpu = 0
+    pid = 0
+    turnaround = array("d")
+    waits = array("d")
+    responses = array("d")
+
+    def account(cpu):
+        """Charge the running process for its CPU time up to now."""
+        elapsed = now - cpu.dispatched_at
+        cpu.running.remaining -= elapsed
+        cpu.busy += elapsed
+        cpu.dispatched_at = now
+        cpu.policy.ran(cpu.running, elapsed)
+
+    def steal(thief):
+        """Move a queued process this CPU may run from the busiest other CPU to its queue."""
+        if not queued:
+            return False
+        victims = sorted((cpu for cpu in cores if cpu is not thief and len(cpu.policy)),
+                         key=lambda cpu: len(cpu.policy), reverse=True)
+        for victim in victims:
+            pcb = victim.policy.steal(thief.bit)
+            if pcb is not None:
+                thief.migrations += 1
+                thief.policy.adopt(pcb, now)
+                return True
+        return False
+
+    def dispatch(cpu):
+        """Give the CPU its next process, stealing one if its own queue is empty."""
+        nonlocal queued
+        pcb = cpu.policy.pick(now)
+        if pcb is None and stealing and cpus > 1 and steal(cpu):
+            pcb = cpu.policy.pick(now)
+        cpu.running = pcb
+        if pcb is None:
+            idle.add(cpu.id)
+            return
+        queued -= 1
+        idle.discard(cpu.id)
+        if pcb is not cpu.previous:
+            cpu.context_switches += 1
+            cpu.previous = pcb
+        pcb.state = RUNNING
+        pcb.wait_time += now - pcb.ready_since
+        if pcb.start_time is None:
+            pcb.start_time = now
+        quantum = cpu.policy.quantum(pcb)
+        cpu.dispatched_at = now
+        cpu.run_until = now + (pcb.remaining if quantum is None else min(quantum, pcb.remaining))
+        cpu.token += 1
+        heapq.heappush(events, (cpu.run_until, cpu.id, cpu.token))
+
+    def place(pcb):
+        nonlocal next_cpu
+        allowed = [cpu for cpu in cores if _allowed(pcb, cpu.bit)] if pcb.affinity is not None else cores
+        if not allowed:
+            raise ValueError(f"Process {pcb.pid} has no CPU in its affinity mask {pcb.affinity:#x}.")
+        if placement == "round_robin":
+            next_cpu += 1
+            return allowed[next_cpu % len(allowed)]
+        for cpu_id in idle:
+            if _allowed(pcb, cores[cpu_id].bit):
+                return cores[cpu_id]
+        return min(allowed, key=lambda cpu: len(cpu.policy) + (cpu.running is not None))
+
+    while True:
+        if next_arrival is not None and (not events or next_arrival[0] <= events[0][0]):
+            # Admit the next arrival to a CPU
+            now = next_arrival[0]
+            pid += 1
+            pcb = PCB(pid, None, next_arrival[2], now, next_arrival[1],
+                      next_arrival[3] if len(next_arrival) > 3 else None)
+            pcb.state = READY
+            next_arrival = next(arrivals, None)
+            cpu = place(pcb) if cpus > 1 else cores[0]
+            cpu.policy.add(pcb, now)
+            queued += 1
+            woken.add(cpu)
+            if next_arrival is not None and next_arrival[0] <= now:
+                continue  # Admit everything arriving at this instant before deciding
+            # Each CPU that received work dispatches it, or preempts what it is running
+            for cpu in sorted(woken, key=lambda cpu: cpu.id):
+                running = cpu.running
+                if running is None:
+                    dispatch(cpu)
+                elif preemptive:
+                    account(cpu)
+                    if running.remaining > 1e-9 and cpu.policy.preempt(running):
+                        running.state = READY
+                        running.ready_since = now
+                        cpu.policy.requeue(running, now, expired=False)
+                        queued += 1
+                        dispatch(cpu)
+            if stealing and idle and any(len(cpu.policy) for cpu in woken):
+                # Idle CPUs take work that had to queue behind busy ones
+                for cpu_id in sorted(idle):
+                    dispatch(cores[cpu_id])
+            woken.clear()
+            continue
+        if not events:
+            break
+
+        # A slice ends: the running process has finished or used up its quantum
+        now, cpu_id, token = heapq.heappop(events)
+        cpu = cores[cpu_id]
+        if token != cpu.token or cpu.running is None:
+            continue  # Superseded by a preemption
+        running = cpu.running
+        account(cpu)
+        if running.remaining <= 1e-9:
+            running.state = TERMINATED
+            running.finish_time = now
+            turnaround.append(now - running.arrival_time)
+            waits.append(running.wait_time)
+            responses.append(running.start_time - running.arrival_time)
+            cpu.completed += 1
+            cpu.policy.finished(running)
+        else:
+            running.state = READY
+            running.ready_since = now
+            cpu.policy.requeue(running, now, expired=True)
+            queued += 1
+        dispatch(cpu)
+
+    elapsed_wall = time.perf_counter() - started
+    completed = len(turnaround)
+    makespan = now - first_arrival
+    busy = sum(cpu.busy for cpu in cores)
+    turnaround = sorted(turnaround)
+    waits = sorted(waits)
+    return {
+        "policy": cores[0].policy.name,
+        "cpus": cpus,
+        "processes": completed,
+        "makespan": makespan,
+        "throughput": completed / makespan if makespan else 0.0,
+        "utilization": busy / (makespan * cpus) if makespan else 0.0,
+        "avg_turnaround": sum(turnaround) / completed if completed else 0.0,
+        "p50_turnaround": _percentile(turnaround, 0.5),
+        "p99_turnaround": _percentile(turnaround, 0.99),
+        "avg_wait": sum(waits) / completed if completed else 0.0,
+        "p50_wait": _percentile(waits, 0.5),
+        "p99_wait": _percentile(waits, 0.99),
+        "avg_response": sum(responses) / completed if completed else 0.0,
+        "context_switches": sum(cpu.context_switches for cpu in cores),
+        "migrations": sum(cpu.migrations for cpu in cores),
+        "per_cpu": [{
+            "cpu": cpu.id,
+            "utilization": cpu.busy / makespan if makespan else 0.0,
+            "completed": cpu.completed,
+            "context_switches": cpu.context_switches,
+            "migrations": cpu.migrations,
+        } for cpu in cores],
+        "seconds": elapsed_wall,
+        "processes_per_second": completed / elapsed_wall if elapsed_wall else 0.0,
+    }
@@ -0,0 +1,136 @@
+import os
+import queue
+import time
+from threading import Thread, Lock
+from system_log import get_logger
+
+
+log = get_logger("TaskLogWriter")
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class TaskLogWriter:
+    def __init__(self, path, max_queue=10000, batch_size=256, flush_interval=0.5,
+                 fsync_policy="never", fsync_interval=1.0, max_bytes=10 * 1024 * 1024, backup_count=5):
+        """Initialize the background log writer.
+
+        Entries are queued in memory and written by a single thread, which
+        commits a batch once ``batch_size`` entries are waiting or
+        ``flush_interval`` seconds have passed. ``fsync_policy`` controls
+        durability: "never" leaves syncing to the OS, "batch" syncs after every
+        write and "interval" syncs at most every ``fsync_interval`` seconds.
+        Once the file would grow past ``max_bytes`` it is rotated to
+        ``path.1`` .. ``path.<backup_count>`` (``max_bytes=0`` disables rotation).
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'.")
+        self.path = os.path.abspath(path)  # Resolve now so a later chdir does not move the log
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue = queue.Queue(maxsize=max_queue)  # Bounded: producers wait if the disk falls behind
+        self.lock = Lock()  # Serializes open/close against the writer thread
+        self.file = None
+        self.last_fsync = time.monotonic()
+        self.closed = False
+        self.thread = Thread(target=self._writer_loop, daemon=True, name="task-log-writer")
+        self.thread.start()
+
+    def write(self, line):
+        """Queue a line for writing. Blocks only if the queue is full."""
+        if self.closed:
+            raise ValueError("Log writer is closed.")
+        self.queue.put(line)
+
+    def flush(self):
+        """Block until every queued line has been written."""
+        self.queue.join()
+
+    def close(self):
+        """Write out remaining entries and stop the writer thread."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)  # Sentinel wakes the writer and ends the loop
+        self.thread.join()
+
+    def _writer_loop(self):
+        """Collect queued lines into batches and commit them."""
+        while True:
+            batch = []
+            try:
+                item = self.queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._commit(batch)
+            except Exception:
+                # Never let the thread die with lines queued, or flush() would hang
+                log.exception("Dropped %d log entries.", len(batch))
+            finally:
+                # Mark the batch (and the sentinel, if seen) done so flush() can return
+                for _ in range(len(batch) + (1 if item is None else 0)):
+                    self.queue.task_done()
+            if item is None:
+                with self.lock:
+                    if self.file is not None:
+                        self._sync(force=True)
+                        self.file.close()
+                        self.file = None
+                return
+
+    def _commit(self, batch):
+        """Write one batch with a single write call."""
+        data = "".join(batch).encode("utf-8")
+        with self.lock:
+            try:
+                if self.file is None:
+                    self.file = open(self.path, "ab")
+                if self.max_bytes and self.file.tell() > 0 and self.file.tell() + len(data) > self.max_bytes:
+                    self._rotate()
+                self.file.write(data)
+                self.file.flush()
+                self._sync()
+            except (OSError, ValueError) as e:
+                log.error("Error writing to '%s': %s", self.path, e)
+                if self.file is not None and self.file.closed:
+                    self.file = None  # Reopen on the next batch
+
+    def _sync(self, force=False):
+        """Apply the fsync policy. Caller must hold the lock."""
+        if self.fsync_policy == "never" and not force:
+            return
+        now = time.monotonic()
+        if self.fsync_policy == "interval" and not force and now - self.last_fsync < self.fsync_interval:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_fsync = now
+
+    def _rotate(self):
+        """Shift path -> path.1 -> path.2 ... and reopen a fresh file. Caller must hold the lock."""
+        self._sync(force=True)
+        self.file.close()
+        self.file = None  # If a rename below fails, the next batch reopens the file
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "ab")
@@ -3,81 +3,162 @@ from kernel.kernel import Kernel
 from shell import Shell
 from file_system import FileSystem
 from process_manager import ProcessManager
-from memory_manager import MemoryManager
 from interrupt_handler import InterruptHandler  # Import InterruptHandler
-import threading
-import time
+from fs_watcher import FileSystemWatcher
+from fs_index import FileIndex
+from vfs import MemoryBackend
+from metrics import REGISTRY
+from system_log import configure, get_logger, shutdown as shutdown_logging
+from control_server import ControlServer, DEFAULT_SOCKET
+import os
+import sys
+
+
+def option(flag, default=None):
+    """Return the value after ``flag`` on the command line, ``default`` if it has none, or None if it is absent."""
+    if flag not in sys.argv:
+        return None
+    index = sys.argv.index(flag)
+    if index + 1 < len(sys.argv) and not sys.argv[index + 1].startswith("--"):
+        return sys.argv[index + 1]
+    return default
 
 
 if __name__ == "__main__":
+    # Log through a background writer thread so no subsystem waits on the terminal.
+    # "--quiet" keeps only warnings and errors, "--log-level debug" adds every task run and interrupt,
+    # "--log-json" prints JSON lines, and "--log-file FILE" also appends them to FILE.
+    try:
+        configure(level=option("--log-level") or "info", quiet="--quiet" in sys.argv,
+                  json_format="--log-json" in sys.argv, path=option("--log-file"))
+    except ValueError as e:
+        print(f"OS: {e}")
+        sys.exit(2)
+    log = get_logger("OS")
+
     # Bootloader
     bootloader = Bootloader()
 
     # Boot the OS
     if bootloader.start():
+        # Set up below; whatever was not created when something fails is skipped on shutdown
+        file_system = process_manager = interrupt_handler = fs_watcher = file_index = None
+        control_server = metrics_path = None
+        state_loaded = False
         try:
-            # Initialize Kernel
-            kernel = Kernel()
+            # Initialize Kernel, simulating as many CPUs as the host has
+            kernel = Kernel(cpus=os.cpu_count() or 1)
 
             # Initialize File System
-            file_system = FileSystem()
+            # "python main.py --vfs [image]" runs the shell's file commands on an in-memory filesystem
+            if "--vfs" in sys.argv:
+                file_system = FileSystem(MemoryBackend(option("--vfs")))
+            else:
+                file_system = FileSystem(cache_listings=True)
 
-            # Initialize Memory Manager
+            # Initialize Process Manager with its Memory Manager
             total_memory = 512  # Example: 512 MB
-            memory_manager = MemoryManager(total_memory)
-            print("MemoryManager: Initialized with 512MB total memory.")
-
-            # Initialize Process Manager with memory management
             process_manager = ProcessManager(total_memory)
+            log.info("MemoryManager initialized with %dMB total memory.", total_memory)
 
             # Load saved state
             process_manager.load_state()
+            state_loaded = True  # Only now is saving safe; an empty manager would overwrite the saved tasks
 
             # Initialize Interrupt Handler
             interrupt_handler = InterruptHandler()
 
             # Register Timer Interrupt
             def timer_handler():
-                print("Timer Interrupt: A periodic task executed.")
+                log.info("Timer interrupt: a periodic task executed.")
 
-            interrupt_handler.register_interrupt("timer", timer_handler)
+            interrupt_handler.register_interrupt("timer", timer_handler, priority=0)  # Highest IRQ priority
 
-            # Register I/O Interrupt
-            def io_handler(filepath):
-                print(f"I/O Interrupt: File '{filepath}' was created!")
+            # Register I/O Interrupts, batching bursts of file events and capping their rate
+            def make_io_handler(action):
+                def io_handler(events):
+                    for (filepath,) in events:
+                        log.info("I/O interrupt: file '%s' was %s.", filepath, action, extra={"path": filepath})
+                return io_handler
 
-            interrupt_handler.register_interrupt("file_created", io_handler)
+            for interrupt_type, action in (("file_created", "created"), ("file_modified", "modified"),
+                                           ("file_deleted", "deleted")):
+                interrupt_handler.register_interrupt(interrupt_type, make_io_handler(action))
+                interrupt_handler.set_coalescing(interrupt_type, 0.5)
+                interrupt_handler.set_rate_limit(interrupt_type, 100)
 
             # Start Interrupt Handler
             interrupt_handler.start()
 
-            # Simulate File Creation (I/O Interrupt)
-            def simulate_file_creation():
-                """Simulate a file being created after a delay."""
-                time.sleep(10)  # Wait 10 seconds
-                filepath = "test_interrupt_file.txt"
-                with open(filepath, "w") as file:
-                    file.write("This is a test file for interrupts.")
-                interrupt_handler.trigger_interrupt("file_created", filepath)
+            # Raise I/O Interrupts for real changes under the current directory
+            if file_system.backend.name == "os":
+                fs_watcher = FileSystemWatcher(file_system, interrupt_handler)
+                fs_watcher.listeners.append(lambda kind, path: file_system.invalidate(path))
+                fs_watcher.start()
+            file_index = FileIndex(file_system, watcher=fs_watcher)
 
-            threading.Thread(target=simulate_file_creation, daemon=True).start()
+            # "python main.py --metrics [file]" exports metrics in Prometheus text format every 15 seconds
+            if "--metrics" in sys.argv:
+                metrics_path = option("--metrics", "metrics.prom")
+                interrupt_handler.register_interrupt(
+                    "metrics_export", lambda: REGISTRY.write_prometheus(metrics_path), priority=9)
+                interrupt_handler.add_timer("metrics_export", 15)
 
             # Optionally Change Timer Interval
             interrupt_handler.set_timer_interval(5)  # Timer interrupt every 5 seconds
 
+            # "python main.py --control [socket]" lets other processes run shell commands over a Unix socket
+            # ("os.sock" by default); "--control-port N" listens on localhost TCP port N instead, for clients
+            # holding the token it writes to "os.token"
+            control_port = option("--control-port")
+            if "--control" in sys.argv or control_port is not None:
+                control_server = ControlServer(kernel, file_system, process_manager, file_index,
+                                               path=option("--control", DEFAULT_SOCKET),
+                                               port=int(control_port) if control_port is not None else None)
+                control_server.start()
+
             # Start Shell
-            shell = Shell(kernel, file_system, process_manager)
-            shell.start()
+            # "python main.py --script FILE" runs the commands in FILE ("-" for stdin) instead of prompting
+            shell = Shell(kernel, file_system, process_manager, file_index)
+            script = option("--script", "-")
+            if script is None:
+                shell.start()
+            elif script == "-":
+                shell.run_script(sys.stdin)
+            else:
+                try:
+                    with open(script) as file:
+                        shell.run_script(file)
+                except OSError as e:
+                    log.error("Could not read script '%s': %s", script, e)
 
         except KeyboardInterrupt:
-            print("\nOS: Received shutdown signal. Shutting down gracefully...")
+            print()
+            log.info("Received shutdown signal. Shutting down gracefully...")
 
         finally:
-            # Save state on shutdown
-            process_manager.save_state()
-
-            # Stop Interrupt Handler
-            interrupt_handler.stop()
-            print("OS: Shut down complete.")
+            # Stop taking remote commands before shutting down what they drive
+            if control_server is not None:
+                control_server.stop()
+
+            # Save state and let running tasks finish on shutdown
+            if process_manager is not None:
+                if state_loaded:
+                    process_manager.save_state()
+                process_manager.shutdown()
+
+            # Stop watching files, then the Interrupt Handler
+            if fs_watcher is not None:
+                fs_watcher.stop()
+            if interrupt_handler is not None:
+                interrupt_handler.stop()
+            if metrics_path is not None:
+                REGISTRY.write_prometheus(metrics_path)
+            if file_index is not None:
+                file_index.close()
+            if file_system is not None:
+                file_system.close()
+            log.info("Shut down complete.")
     else:
-        print("System halted due to bootloader failure.")
+        log.critical("System halted due to bootloader failure.")
+    shutdown_logging()
@@ -1,32 +1,432 @@
+import bisect
+import math
+import random
+import weakref
+from metrics import REGISTRY
+from virtual_memory import VirtualMemory
+from system_log import get_logger
+
+
+STRATEGIES = ("first_fit", "best_fit", "buddy")
+
+
+class _TreapNode:
+    __slots__ = ("key", "size", "priority", "left", "right", "largest")
+
+    def __init__(self, key, size):
+        self.key = key
+        self.size = size
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.largest = size  # Largest block size in this subtree
+
+
+def _update(node):
+    largest = node.size
+    if node.left is not None and node.left.largest > largest:
+        largest = node.left.largest
+    if node.right is not None and node.right.largest > largest:
+        largest = node.right.largest
+    node.largest = largest
+
+
+def _split(node, key):
+    """Split a treap into blocks below ``key`` and blocks at or above it."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _update(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Merge two treaps where every block in ``left`` precedes ``right``."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _remove(node, key):
+    if node is None:
+        return None
+    if key < node.key:
+        node.left = _remove(node.left, key)
+    elif node.key < key:
+        node.right = _remove(node.right, key)
+    else:
+        return _merge(node.left, node.right)
+    _update(node)
+    return node
+
+
+class BlockTreap:
+    def __init__(self):
+        """Initialize a treap of free blocks ordered by key, e.g. address or (size, address).
+
+        Each node also tracks the largest block in its subtree, so the
+        lowest-keyed block of at least a given size is found in O(log n), as
+        are inserts, deletes and neighbour lookups.
+        """
+        self.root = None
+
+    def insert(self, key, size):
+        left, right = _split(self.root, key)
+        self.root = _merge(_merge(left, _TreapNode(key, size)), right)
+
+    def delete(self, key):
+        self.root = _remove(self.root, key)
+
+    def first_fit(self, size):
+        """Return the key of the lowest-keyed block of at least ``size``, or None."""
+        node = self.root
+        if node is None or node.largest < size:
+            return None
+        while True:
+            if node.left is not None and node.left.largest >= size:
+                node = node.left
+            elif node.size >= size:
+                return node.key
+            else:
+                node = node.right
+
+    def ceiling(self, key):
+        """Return the smallest key at or above ``key``, or None."""
+        node, found = self.root, None
+        while node is not None:
+            if node.key < key:
+                node = node.right
+            else:
+                found, node = node.key, node.left
+        return found
+
+    def floor_below(self, key):
+        """Return the largest key below ``key``, or None."""
+        node, found = self.root, None
+        while node is not None:
+            if node.key < key:
+                found, node = node.key, node.right
+            else:
+                node = node.left
+        return found
+
+
+class FreeListAllocator:
+    def __init__(self, total_units, strategy="first_fit"):
+        """Initialize a free-list allocator over ``total_units`` of address space.
+
+        Free blocks are kept in a dict by address and in an address-ordered
+        treap, which finds the block before a freed one for coalescing and
+        answers first-fit searches. Best-fit adds a treap ordered by (size,
+        address). Allocating and freeing are O(log n) in the free blocks.
+        """
+        self.strategy = strategy
+        self.free_blocks = {}   # Start address -> size
+        self.addresses = BlockTreap()  # Keyed by start address
+        self.by_size = BlockTreap() if strategy == "best_fit" else None  # Keyed by (size, start)
+        self.free_units = 0
+        if total_units > 0:
+            self._insert(0, total_units)
+
+    def _insert(self, start, size):
+        self.addresses.insert(start, size)
+        if self.by_size is not None:
+            self.by_size.insert((size, start), size)
+        self.free_blocks[start] = size
+        self.free_units += size
+
+    def _delete(self, start):
+        size = self.free_blocks.pop(start)
+        self.addresses.delete(start)
+        if self.by_size is not None:
+            self.by_size.delete((size, start))
+        self.free_units -= size
+        return size
+
+    def allocate(self, size):
+        """Reserve ``size`` units and return ``(address, block_size)``, or None."""
+        if self.by_size is not None:
+            key = self.by_size.ceiling((size, -1))
+            start = key[1] if key is not None else None
+        else:
+            start = self.addresses.first_fit(size)
+        if start is None:
+            return None
+        block_size = self._delete(start)
+        if block_size > size:
+            self._insert(start + size, block_size - size)
+        return start, size
+
+    def free(self, start, size):
+        """Return a block to the free lists, merging it with free neighbours."""
+        if start + size in self.free_blocks:
+            size += self._delete(start + size)
+        previous = self.addresses.floor_below(start)
+        if previous is not None and previous + self.free_blocks[previous] == start:
+            start = previous
+            size += self._delete(previous)
+        self._insert(start, size)
+
+    def largest_free_block(self):
+        return self.addresses.root.largest if self.addresses.root is not None else 0
+
+    def free_block_count(self):
+        return len(self.free_blocks)
+
+
+class BuddyAllocator:
+    def __init__(self, total_units):
+        """Initialize a binary buddy allocator over ``total_units`` of address space.
+
+        A size that is not a power of two is split into descending power-of-two
+        regions, each aligned to its own size, so buddies never cross regions.
+        """
+        self.free_lists = {}   # Order -> set of free block addresses
+        self.region_bases = []  # Sorted region start addresses
+        self.region_orders = []  # Largest order of each region
+        self.free_units = 0
+        base = 0
+        for order in range(max(total_units, 1).bit_length() - 1, -1, -1):
+            if total_units & (1 << order):
+                self.region_bases.append(base)
+                self.region_orders.append(order)
+                self.free_lists.setdefault(order, set()).add(base)
+                self.free_units += 1 << order
+                base += 1 << order
+
+    def _region_order(self, address):
+        return self.region_orders[bisect.bisect_right(self.region_bases, address) - 1]
+
+    def allocate(self, size):
+        """Reserve a power-of-two block of at least ``size`` units."""
+        order = max(size - 1, 0).bit_length()
+        current = order
+        max_order = max(self.region_orders, default=-1)
+        while current <= max_order and not self.free_lists.get(current):
+            current += 1
+        if current > max_order:
+            return None
+        address = self.free_lists[current].pop()
+        while current > order:
+            # Split, keeping the lower half and freeing the upper buddy
+            current -= 1
+            self.free_lists.setdefault(current, set()).add(address + (1 << current))
+        self.free_units -= 1 << order
+        return address, 1 << order
+
+    def free(self, address, block_size):
+        """Release a block and merge it with its buddy for as long as possible."""
+        order = block_size.bit_length() - 1
+        self.free_units += block_size
+        region_base = self.region_bases[bisect.bisect_right(self.region_bases, address) - 1]
+        top_order = self._region_order(address)
+        while order < top_order:
+            buddy = region_base + ((address - region_base) ^ (1 << order))
+            free_list = self.free_lists.get(order)
+            if not free_list or buddy not in free_list:
+                break
+            free_list.remove(buddy)
+            address = min(address, buddy)
+            order += 1
+        self.free_lists.setdefault(order, set()).add(address)
+
+    def largest_free_block(self):
+        orders = [order for order, blocks in self.free_lists.items() if blocks]
+        return 1 << max(orders) if orders else 0
+
+    def free_block_count(self):
+        return sum(len(blocks) for blocks in self.free_lists.values())
+
+
+log = get_logger("MemoryManager")
+ALLOCATIONS = REGISTRY.counter("memory_allocations_total", "Successful memory allocations.")
+DEALLOCATIONS = REGISTRY.counter("memory_deallocations_total", "Memory deallocations.")
+ALLOCATION_FAILURES = {reason: REGISTRY.counter("memory_allocation_failures_total", "Refused memory allocations.",
+                                                reason=reason)
+                       for reason in ("exists", "invalid", "no_memory")}
+MEMORY_USED = REGISTRY.gauge("memory_used_mb", "Memory allocated to tasks, in MB.")
+MEMORY_UTILIZATION = REGISTRY.gauge("memory_utilization_ratio", "Share of total memory allocated to tasks.")
+
+
 class MemoryManager:
-    def __init__(self, total_memory):
+    def __init__(self, total_memory, strategy="first_fit", swap_memory=0, page_policy="lru", page_size=1):
+        """Initialize the memory manager.
+
+        Memory is handed out as contiguous blocks (in MB) from a simulated
+        address space using the chosen ``strategy``: "first_fit", "best_fit"
+        or "buddy". With ``swap_memory`` > 0, tasks instead get paged virtual
+        address spaces backed by ``total_memory`` of frames plus swap, so memory
+        can be overcommitted; ``page_policy`` picks the replacement policy.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown allocation strategy '{strategy}'.")
         self.total_memory = total_memory  # Total available memory (in MB)
-        self.allocated_memory = {}       # Tracks memory allocation by task
+        self.strategy = strategy
+        self.allocated_memory = {}       # Tracks requested memory by task
+        self.blocks = {}                 # Task -> (address, block size) in the address space
+        self.used_memory = 0             # Running total of requested memory
+        self.reserved_memory = 0         # Running total of block sizes, including buddy rounding
+        if strategy == "buddy":
+            self.allocator = BuddyAllocator(int(total_memory))
+        else:
+            self.allocator = FreeListAllocator(int(total_memory), strategy)
+        self.virtual_memory = None
+        if swap_memory > 0:
+            self.virtual_memory = VirtualMemory(int(total_memory // page_size), int(swap_memory // page_size),
+                                                page_policy, page_size)
+        self.allocations = 0
+        self.deallocations = 0
+        self.failures = {reason: 0 for reason in ALLOCATION_FAILURES}
 
     def allocate_memory(self, task_name, memory_size):
         """Allocate memory for a task."""
-        current_usage = sum(self.allocated_memory.values())
-        if current_usage + memory_size > self.total_memory:
-            print(f"MemoryManager: Not enough memory to allocate for '{task_name}'.")
-            return False
+        reason = self._reserve(task_name, memory_size)
+        if reason == "exists":
+            log.warning("'%s' already has %sMB allocated.", task_name, self.allocated_memory[task_name],
+                        extra={"task": task_name})
+        elif reason == "invalid":
+            log.error("Invalid memory size %sMB for '%s'.", memory_size, task_name, extra={"task": task_name})
+        elif reason == "no_memory":
+            log.warning("Not enough memory%s to allocate for '%s'.",
+                        " or swap" if self.virtual_memory is not None else "", task_name,
+                        extra={"task": task_name, "size_mb": memory_size})
+        else:
+            log.info("Allocated %sMB for '%s'.", memory_size, task_name,
+                     extra={"task": task_name, "size_mb": memory_size})
+        return reason is None
+
+    def allocate_batch(self, requests):
+        """Allocate memory for many (task_name, memory_size) requests in one pass.
+
+        Returns the set of names that got their memory. Refusals are counted
+        as usual but logged once for the whole batch instead of per task.
+        """
+        allocated = set()
+        refused = {}
+        for task_name, memory_size in requests:
+            reason = self._reserve(task_name, memory_size)
+            if reason is None:
+                allocated.add(task_name)
+            else:
+                refused[reason] = refused.get(reason, 0) + 1
+        if refused:
+            log.warning("Refused %d of %d allocations (%s).", sum(refused.values()), len(requests),
+                        ", ".join(f"{count} {reason}" for reason, count in sorted(refused.items())))
+        log.debug("Allocated memory for %d tasks.", len(allocated))
+        return allocated
+
+    def _reserve(self, task_name, memory_size):
+        """Reserve memory for a task. Returns None on success, or why it was refused."""
+        if task_name in self.allocated_memory:
+            reason = "exists"
+        elif memory_size < 0:
+            reason = "invalid"
+        elif self.virtual_memory is not None:
+            pages = math.ceil(memory_size / self.virtual_memory.page_size)
+            reason = None if self.virtual_memory.create_address_space(task_name, pages) else "no_memory"
+        else:
+            reason = None
+            units = math.ceil(memory_size)
+            if units > 0:
+                block = self.allocator.allocate(units)
+                if block is None:
+                    reason = "no_memory"
+                else:
+                    self.blocks[task_name] = block
+                    self.reserved_memory += block[1]
+        if reason is not None:
+            self.failures[reason] += 1
+            return reason
         self.allocated_memory[task_name] = memory_size
-        print(f"MemoryManager: Allocated {memory_size}MB for '{task_name}'.")
-        return True
+        self.used_memory += memory_size
+        self.allocations += 1
+        return None
 
     def deallocate_memory(self, task_name):
         """Deallocate memory for a task."""
         if task_name in self.allocated_memory:
-            print(f"MemoryManager: Deallocated {self.allocated_memory[task_name]}MB from '{task_name}'.")
-            del self.allocated_memory[task_name]
+            log.info("Deallocated %sMB from '%s'.", self.allocated_memory[task_name], task_name,
+                     extra={"task": task_name, "size_mb": self.allocated_memory[task_name]})
+            self.used_memory -= self.allocated_memory.pop(task_name)
+            block = self.blocks.pop(task_name, None)
+            if block is not None:
+                self.allocator.free(*block)
+                self.reserved_memory -= block[1]
+            if self.virtual_memory is not None:
+                self.virtual_memory.release(task_name)
+            self.deallocations += 1
         else:
-            print(f"MemoryManager: Task '{task_name}' not found in allocated memory.")
+            log.info("Task '%s' not found in allocated memory.", task_name)
+
+    def register_metrics(self):
+        """Point the memory metrics at this manager's own counts, which are read only when collected.
+
+        Only the manager the OS runs on should call this, as the metrics
+        follow the last one registered; a weak reference lets it be freed.
+        """
+        manager = weakref.ref(self)
+
+        def read(function):
+            return lambda: function(manager()) if manager() is not None else 0
+
+        ALLOCATIONS.set_function(read(lambda self: self.allocations))
+        DEALLOCATIONS.set_function(read(lambda self: self.deallocations))
+        for reason, counter in ALLOCATION_FAILURES.items():
+            counter.set_function(read(lambda self, reason=reason: self.failures[reason]))
+        MEMORY_USED.set_function(read(lambda self: self.used_memory))
+        MEMORY_UTILIZATION.set_function(
+            read(lambda self: self.used_memory / self.total_memory if self.total_memory else 0.0))
+
+    def touch(self, task_name):
+        """Reference a task's pages, as when it runs. A no-op without virtual memory."""
+        if self.virtual_memory is not None and task_name in self.allocated_memory:
+            self.virtual_memory.touch_all(task_name, write=True)
+
+    def fragmentation(self):
+        """Return (external, internal) fragmentation as fractions between 0 and 1.
+
+        External fragmentation is the share of free memory outside the largest
+        free block; internal fragmentation is the share of reserved blocks that
+        was rounded up beyond what tasks asked for.
+        """
+        free_units = self.allocator.free_units
+        external = 1 - self.allocator.largest_free_block() / free_units if free_units else 0.0
+        internal = 1 - self.used_memory / self.reserved_memory if self.reserved_memory else 0.0
+        return external, internal
 
     def show_memory_usage(self):
         """Show memory usage."""
-        current_usage = sum(self.allocated_memory.values())
+        current_usage = self.used_memory
+        external, internal = self.fragmentation()
         print(f"MemoryManager: Total Memory: {self.total_memory}MB")
         print(f"MemoryManager: Allocated Memory: {current_usage}MB")
-        print(f"MemoryManager: Free Memory: {self.total_memory - current_usage}MB")
+        if self.virtual_memory is not None:
+            stats = self.virtual_memory.stats()
+            page_size = self.virtual_memory.page_size
+            print(f"MemoryManager: Resident Memory: {stats['resident'] * page_size}MB "
+                  f"(swap: {self.virtual_memory.swap_pages * page_size}MB)")
+            print(f"MemoryManager: Paging: {stats['policy']} policy, {stats['faults']} faults in "
+                  f"{stats['accesses']} accesses, hit ratio {stats['hit_ratio']:.1%}, "
+                  f"{stats['swap_ins']} swap-ins, {stats['swap_outs']} swap-outs")
+        else:
+            print(f"MemoryManager: Free Memory: {self.allocator.free_units}MB")
+            print(f"MemoryManager: Strategy: {self.strategy} ({self.allocator.free_block_count()} free blocks, "
+                  f"largest {self.allocator.largest_free_block()}MB)")
+            print(f"MemoryManager: Fragmentation: {external:.1%} external, {internal:.1%} internal")
         print("MemoryManager: Task Memory Allocation:")
         for task, size in self.allocated_memory.items():
-            print(f"  - {task}: {size}MB")
+            block = self.blocks.get(task)
+            location = f" at {block[0]}-{block[0] + block[1] - 1}" if block else ""
+            print(f"  - {task}: {size}MB{location}")
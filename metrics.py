@@ -0,0 +1,262 @@
+import bisect
+import functools
+import os
+import threading
+import time
+
+
+# Latency buckets in seconds: powers of two from about 1 microsecond to about 2 minutes
+LATENCY_BUCKETS = tuple(2.0 ** exponent for exponent in range(-20, 8))
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{label}="{value}"' for label, value in sorted(labels.items())) + "}"
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def set_function(self, function):
+        """Read the value from ``function`` whenever the metric is collected.
+
+        This suits hot paths that already keep a count of their own: they pay
+        nothing per event, only the collector pays to call ``function``.
+        """
+        self.function = function
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def snapshot(self):
+        if self.function is not None:
+            self.value = self.function()
+        return self.value
+
+
+class Counter(_Value):
+    """A value that only goes up, such as a number of events."""
+
+    kind = "counter"
+
+
+class Gauge(_Value):
+    """A value that goes up and down, such as memory in use."""
+
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram:
+    """Counts of observed values in fixed buckets, plus their sum, so percentiles can be estimated."""
+
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last bucket holds values above every bound
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager that observes how long its block takes, in seconds."""
+        return _Timer(self)
+
+    def snapshot(self):
+        with self.lock:
+            return {"count": self.count, "sum": self.sum, "counts": list(self.counts)}
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+def quantile(buckets, counts, fraction):
+    """Estimate a quantile from histogram bucket counts, interpolating within the bucket it falls in."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(buckets):
+                return buckets[-1]  # Above the highest bound; report the bound
+            lower = buckets[index - 1] if index else 0.0
+            return lower + (buckets[index] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def timed(histogram):
+    """Decorator that observes each call's duration in a histogram."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Initialize an empty registry of named, optionally labelled metrics."""
+        self.metrics = {}  # Key (name plus labels) -> (name, labels, metric)
+        self.help = {}     # Name -> (kind, help text)
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, *args):
+        key = _key(name, labels)
+        with self.lock:
+            entry = self.metrics.get(key)
+            if entry is None:
+                kind, _ = self.help.setdefault(name, (cls.kind, help_text))
+                if kind != cls.kind:
+                    raise ValueError(f"Metric '{name}' is already registered as a {kind}.")
+                entry = self.metrics[key] = (name, labels, cls(*args))
+            elif not isinstance(entry[2], cls):
+                raise ValueError(f"Metric '{name}' is already registered as a {entry[2].kind}.")
+            return entry[2]
+
+    def counter(self, name, help_text="", **labels):
+        """Return the counter with this name and labels, creating it on first use."""
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        """Return the gauge with this name and labels, creating it on first use."""
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS, **labels):
+        """Return the histogram with this name and labels, creating it on first use."""
+        return self._get(Histogram, name, help_text, labels, buckets)
+
+    def snapshot(self):
+        """Return {key: value} for counters and gauges and {key: {"count", "sum", "counts"}} for histograms."""
+        with self.lock:
+            entries = list(self.metrics.items())
+        return {key: metric.snapshot() for key, (_, _, metric) in sorted(entries)}
+
+    def delta(self, before, after):
+        """Return what changed between two snapshots.
+
+        Counters and histograms give their increase and are left out if they
+        did not move; gauges give their latest value.
+        """
+        changes = {}
+        for key, value in after.items():
+            previous = before.get(key)
+            kind = self.kind(key)
+            if kind == "gauge":
+                changes[key] = value
+            elif kind == "counter":
+                if value != (previous or 0):
+                    changes[key] = value - (previous or 0)
+            elif previous is None or value["count"] != previous["count"]:
+                previous = previous or {"count": 0, "sum": 0.0, "counts": [0] * len(value["counts"])}
+                changes[key] = {
+                    "count": value["count"] - previous["count"],
+                    "sum": value["sum"] - previous["sum"],
+                    "counts": [now - then for now, then in zip(value["counts"], previous["counts"])],
+                }
+        return changes
+
+    def kind(self, key):
+        return self.metrics[key][2].kind
+
+    def buckets(self, key):
+        return self.metrics[key][2].buckets
+
+    def render(self, snapshot=None, seconds=None):
+        """Return readable lines for a snapshot (or delta over ``seconds``), histograms as count/avg/p50/p99."""
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        lines = []
+        for key, value in snapshot.items():
+            kind = self.kind(key)
+            if kind == "histogram":
+                if not value["count"]:
+                    continue
+                buckets = self.buckets(key)
+                rate = f" ({value['count'] / seconds:.1f}/s)" if seconds else ""
+                lines.append(f"- {key}: count {value['count']}{rate}, avg {_format(value['sum'] / value['count'], key)}, "
+                             f"p50 {_format(quantile(buckets, value['counts'], 0.5), key)}, "
+                             f"p99 {_format(quantile(buckets, value['counts'], 0.99), key)}")
+            elif kind == "counter" and seconds:
+                lines.append(f"- {key}: {value} ({value / seconds:.1f}/s)")
+            else:
+                lines.append(f"- {key}: {value:g}" if isinstance(value, float) else f"- {key}: {value}")
+        return lines
+
+    def prometheus(self):
+        """Return every metric in the Prometheus text exposition format."""
+        with self.lock:
+            entries = sorted(self.metrics.values(), key=lambda entry: (entry[0], _key(entry[0], entry[1])))
+        lines = []
+        described = set()
+        for name, labels, metric in entries:
+            if name not in described:
+                described.add(name)
+                kind, help_text = self.help[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            if metric.kind != "histogram":
+                lines.append(f"{_key(name, labels)} {metric.snapshot()}")
+                continue
+            value = metric.snapshot()
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float("inf"),), value["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{_key(name + '_bucket', dict(labels, le=le))} {cumulative}")
+            lines.append(f"{_key(name + '_sum', labels)} {value['sum']}")
+            lines.append(f"{_key(name + '_count', labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text export to a file atomically, for a textfile collector to pick up."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.prometheus())
+        os.replace(temporary, path)
+
+
+def _format(value, key):
+    """Format a histogram value: durations (metrics named *_seconds) in milliseconds."""
+    if key.split("{")[0].endswith("_seconds"):
+        return f"{value * 1000:.3f}ms"
+    return f"{value:g}"
+
+
+REGISTRY = MetricsRegistry()  # The registry every subsystem reports to
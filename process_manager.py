@@ -1,136 +1,632 @@
+import os
+import csv
 import time
 import json
-from threading import Thread, Lock
+import math
+import heapq
+import itertools
+from threading import Thread, Lock, Condition, current_thread
 from datetime import datetime
 from memory_manager import MemoryManager
+from metrics import REGISTRY
+from task_executor import TaskExecutor, OVERLAP_POLICIES, BACKENDS
+from log_writer import TaskLogWriter
+from task_journal import TaskJournal, OP_ADD, OP_REMOVE, OP_RUN, OP_PAUSE, OP_RESUME
+from task_registry import Task, TaskRegistry
+from system_log import get_logger
+
+
+log = get_logger("ProcessManager")
+TASKS_RUN = {kind: REGISTRY.counter("process_tasks_run_total", "Task runs dispatched by the scheduler.", kind=kind)
+             for kind in ("periodic", "scheduled")}
+TASKS_SKIPPED = REGISTRY.counter("process_task_runs_skipped_total", "Task runs skipped because one was still running.")
+TASK_LATENESS = REGISTRY.histogram("process_task_lateness_seconds", "How long after its deadline a task was dispatched.")
+LOCK_WAIT = REGISTRY.histogram("process_lock_wait_seconds", "Time spent waiting to acquire the ProcessManager lock.")
+TASKS = REGISTRY.gauge("process_tasks", "Periodic and scheduled tasks.")
+
+# Columns of a task export; actions are Python callables and are not exported
+EXPORT_FIELDS = ("name", "interval", "scheduled_time", "memory", "command", "backend", "max_concurrency", "overlap",
+                 "paused")
+IMPORT_BATCH = 10000  # Tasks inserted per lock acquisition during an import
 
 
 class ProcessManager:
-    STATE_FILE = "task_state.json"
+    STATE_FILE = "task_state.json"  # Legacy JSON state, migrated on first load
+    SNAPSHOT_FILE = "task_state.snap"
+    JOURNAL_FILE = "task_state.journal"
+    LOG_FILE = "task_log.txt"
 
-    def __init__(self, total_memory=512):
+    def __init__(self, total_memory=512, executor_backend="thread", max_workers=4, memory_strategy="first_fit",
+                 swap_memory=0, page_policy="lru"):
         """Initialize the process manager."""
-        self.task_queue = []  # List to store periodic tasks
-        self.scheduled_tasks = []  # List to store scheduled tasks (cron-like)
+        self.tasks = TaskRegistry()  # Periodic and scheduled (cron-like) tasks, indexed by ID and name
         self.lock = Lock()    # Lock for thread safety
+        self.wakeup = Condition(self.lock)  # Signalled when the earliest deadline changes
+        self.run_queue = []   # Min-heap of [deadline, sequence, task] entries; a task holds its live entry
+        self.stale_entries = 0  # Number of cancelled entries still in the heap
+        self.sequence = itertools.count()  # Tie-breaker for equal deadlines
         self.running = False  # Flag for automatic mode
-        self.memory_manager = MemoryManager(total_memory)  # Initialize Memory Manager
-        print("ProcessManager: Initialized.")
+        self.scheduler_thread = None
+        self.memory_manager = MemoryManager(total_memory, memory_strategy, swap_memory, page_policy)  # Initialize Memory Manager
+        self.memory_manager.register_metrics()
+        self.executor = TaskExecutor(executor_backend, max_workers)  # Runs task bodies off the lock
+        self.task_actions = {}  # Callables attached to tasks by name (not persisted)
+        self.log_writer = TaskLogWriter(self.LOG_FILE)  # Batches execution log writes in the background
+        self.journal = TaskJournal(self.SNAPSHOT_FILE, self.JOURNAL_FILE)  # Records changes once state is loaded or saved
+        log.info("Initialized.")
+
+    def _execution_options(self, task_name, command, action, backend, max_concurrency, overlap):
+        """Validate how a task runs and return the keyword arguments for its Task, or None."""
+        if overlap not in OVERLAP_POLICIES:
+            log.error("Invalid overlap policy '%s'. Use one of: %s.", overlap, ", ".join(OVERLAP_POLICIES))
+            return None
+        if backend is not None and backend not in BACKENDS:
+            log.error("Invalid executor backend '%s'. Use one of: %s.", backend, ", ".join(BACKENDS))
+            return None
+        if command is not None and action is not None:
+            log.error("Task '%s' can have a command or an action, not both.", task_name)
+            return None
+        return {"command": command or None, "backend": backend, "max_concurrency": max_concurrency, "overlap": overlap}
 
-    def add_task(self, task_name, interval, memory_size):
-        """Add a periodic task to the queue."""
+    def add_task(self, task_name, interval, memory_size, command=None, action=None,
+                 backend=None, max_concurrency=None, overlap="skip"):
+        """Add a periodic task to the queue.
+
+        A task may carry a shell ``command`` or a Python callable ``action``;
+        without either, running it only records the execution in the log.
+        """
+        if not interval > 0:
+            log.error("Invalid interval %s for task '%s'. It must be greater than 0.", interval, task_name,
+                      extra={"task": task_name})
+            return
+        options = self._execution_options(task_name, command, action, backend, max_concurrency, overlap)
+        if options is None:
+            return
+        waited = time.perf_counter()
         with self.lock:
+            LOCK_WAIT.observe(time.perf_counter() - waited)
+            if task_name in self.tasks:
+                log.warning("Task '%s' already exists.", task_name, extra={"task": task_name})
+                return
             if not self.memory_manager.allocate_memory(task_name, memory_size):
-                print(f"ProcessManager: Failed to add task '{task_name}' due to insufficient memory.")
+                log.warning("Failed to add task '%s' due to insufficient memory.", task_name, extra={"task": task_name})
                 return
-            task = {"name": task_name, "interval": interval, "next_run": time.time() + interval}
-            self.task_queue.append(task)
-            print(f"ProcessManager: Added periodic task '{task_name}' with interval {interval} seconds.")
+            task = self.tasks.add(Task(task_name, interval, time.time() + interval, memory=memory_size, **options))
+            if action is not None:
+                self.task_actions[task_name] = action
+            TASKS.set(len(self.tasks))
+            self._push_task(task)
+            self._journal_event(OP_ADD, task.to_fields())
+            log.info("Added periodic task '%s' with interval %s seconds.", task_name, interval,
+                     extra={"task": task_name, "interval": interval})
 
-    def schedule_task(self, task_name, time_str):
+    def schedule_task(self, task_name, time_str, command=None, action=None,
+                      backend=None, max_concurrency=None, overlap="skip"):
         """Schedule a task to run at a specific time."""
+        options = self._execution_options(task_name, command, action, backend, max_concurrency, overlap)
+        if options is None:
+            return
         try:
             scheduled_time = datetime.strptime(time_str, "%H:%M").time()
             with self.lock:
-                task = {"name": task_name, "scheduled_time": scheduled_time}
-                self.scheduled_tasks.append(task)
-            print(f"ProcessManager: Scheduled task '{task_name}' to run at {time_str}.")
+                task = self.tasks.add(Task(task_name, scheduled_time=scheduled_time, **options))
+                if task is None:
+                    log.warning("Task '%s' already exists.", task_name, extra={"task": task_name})
+                    return
+                if action is not None:
+                    self.task_actions[task_name] = action
+                TASKS.set(len(self.tasks))
+                self._push_task(task)
+                self._journal_event(OP_ADD, task.to_fields())
+            log.info("Scheduled task '%s' to run at %s.", task_name, time_str, extra={"task": task_name})
         except ValueError:
-            print("ProcessManager: Invalid time format. Use HH:MM.")
+            log.error("Invalid time format. Use HH:MM.")
 
     def remove_task(self, task_name):
         """Remove a task from the queue."""
+        waited = time.perf_counter()
         with self.lock:
-            self.task_queue = [task for task in self.task_queue if task["name"] != task_name]
-            self.scheduled_tasks = [task for task in self.scheduled_tasks if task["name"] != task_name]
+            LOCK_WAIT.observe(time.perf_counter() - waited)
+            task = self.tasks.remove(task_name)
+            if task is None:
+                log.warning("Task '%s' not found.", task_name)
+                return False
+            self._cancel_task(task)
+            TASKS.set(len(self.tasks))
+            self.task_actions.pop(task_name, None)
             self.memory_manager.deallocate_memory(task_name)
-            print(f"ProcessManager: Removed task '{task_name}'.")
+            self._journal_event(OP_REMOVE, {"name": task_name})
+            log.info("Removed task '%s'.", task_name, extra={"task": task_name})
+        return True
 
     def list_tasks(self):
         """List all tasks in the queue."""
         with self.lock:
-            if not self.task_queue and not self.scheduled_tasks:
+            if not self.tasks:
                 print("ProcessManager: No tasks are currently scheduled.")
                 return
 
             print("ProcessManager: Scheduled Tasks:")
-            for task in self.task_queue:
-                next_run_time = datetime.fromtimestamp(task["next_run"]).strftime("%Y-%m-%d %H:%M:%S")
-                print(f"- Periodic Task: {task['name']} (runs every {task['interval']} seconds, next run at {next_run_time})")
-            for task in self.scheduled_tasks:
-                print(f"- Scheduled Task: {task['name']} (runs at {task['scheduled_time']})")
+            tasks = list(self.tasks)
+            for task in tasks:
+                if not task.periodic:
+                    continue
+                if task.paused:
+                    schedule = "paused"
+                else:
+                    schedule = "next run at " + datetime.fromtimestamp(task.next_run).strftime("%Y-%m-%d %H:%M:%S")
+                print(f"- Periodic Task: {task.name} (runs every {task.interval} seconds, {schedule}){self._describe_target(task)}")
+            for task in tasks:
+                if not task.periodic:
+                    paused = ", paused" if task.paused else ""
+                    print(f"- Scheduled Task: {task.name} (runs at {task.scheduled_time}{paused}){self._describe_target(task)}")
+
+    def pause_task(self, task_name):
+        """Stop running a task until it is resumed. It keeps its memory and its place in the task list."""
+        with self.lock:
+            task = self.tasks.get(task_name)
+            if task is None:
+                log.warning("Task '%s' not found.", task_name)
+                return False
+            task.paused = True
+            self._cancel_task(task)
+            self._journal_event(OP_PAUSE, {"name": task_name})
+        log.info("Paused task '%s'.", task_name, extra={"task": task_name})
+        return True
+
+    def resume_task(self, task_name):
+        """Resume a paused task. A periodic task skips the runs it missed and keeps its phase."""
+        with self.lock:
+            task = self.tasks.get(task_name)
+            if task is None:
+                log.warning("Task '%s' not found.", task_name)
+                return False
+            if not task.paused:
+                log.info("Task '%s' is not paused.", task_name)
+                return False
+            task.paused = False
+            fields = {"name": task_name}
+            if task.periodic:
+                now = time.time()
+                if task.next_run < now and task.interval > 0:
+                    task.next_run += math.ceil((now - task.next_run) / task.interval) * task.interval
+                elif task.next_run < now:
+                    task.next_run = now  # No phase to keep, e.g. a task from an old state file
+                fields["next_run"] = task.next_run
+            self._push_task(task)
+            self._journal_event(OP_RESUME, fields)
+        log.info("Resumed task '%s'.", task_name, extra={"task": task_name})
+        return True
+
+    def export_tasks(self, filename):
+        """Write every task to a file, streaming it row by row.
+
+        The format follows the extension: ".csv", ".json" (an array, like
+        tasks.json) or JSON lines otherwise. Returns the number of tasks written.
+        """
+        with self.lock:
+            tasks = list(self.tasks)  # Only references; rows are built outside the lock
+        try:
+            with open(filename, "w", newline="") as file:
+                if filename.endswith(".csv"):
+                    writer = csv.DictWriter(file, EXPORT_FIELDS)
+                    writer.writeheader()
+                    for task in tasks:
+                        writer.writerow(_export_record(task))
+                elif filename.endswith(".json"):
+                    file.write("[")
+                    for index, task in enumerate(tasks):
+                        file.write(("," if index else "") + "\n    " + json.dumps(_export_record(task)))
+                    file.write("\n]\n")
+                else:
+                    for task in tasks:
+                        file.write(json.dumps(_export_record(task)) + "\n")
+        except OSError as e:
+            log.error("Error exporting tasks: %s", e)
+            return 0
+        log.info("Exported %d tasks to '%s'.", len(tasks), filename)
+        return len(tasks)
+
+    def import_tasks(self, filename, batch_size=IMPORT_BATCH):
+        """Add the tasks in a CSV, JSON or JSON lines file written by ``export_tasks``.
+
+        JSON lines and CSV files are streamed, so their size is not limited by
+        memory. Tasks are inserted ``batch_size`` at a time: each batch takes
+        the lock, reserves memory, updates the run queue and appends to the
+        journal once. Rows that are invalid, or whose name already holds
+        memory, are skipped, as are names that are already taken. Returns the
+        number of tasks added.
+        """
+        added = skipped = 0
+        batch = []
+        try:
+            for number, record in _read_records(filename):
+                try:
+                    batch.append(self._task_from_record(record))
+                except (KeyError, TypeError, ValueError) as e:
+                    skipped += 1
+                    if skipped <= 5:
+                        log.warning("Skipped row %d of '%s': %s", number, filename, e)
+                    continue
+                if len(batch) >= batch_size:
+                    added += self._insert_batch(batch)
+                    batch = []
+        except (OSError, ValueError) as e:
+            log.error("Error importing tasks: %s", e)
+        if batch:
+            added += self._insert_batch(batch)
+        with self.lock:
+            if self.journal.is_open() and self.journal.needs_compaction(len(self.tasks)):
+                self._write_snapshot()
+        log.info("Imported %d tasks from '%s' (%d invalid rows skipped).", added, filename, skipped)
+        return added
+
+    def _task_from_record(self, record):
+        """Build a task from an imported row, raising ValueError if it is not a valid task."""
+        if not isinstance(record, dict):
+            raise ValueError("not a JSON object")
+        name = record.get("name")
+        if not name or not isinstance(name, str):
+            raise ValueError("missing task name")
+        interval, scheduled_time = record.get("interval"), record.get("scheduled_time")
+        if (interval in (None, "")) == (scheduled_time in (None, "")):
+            raise ValueError(f"task '{name}' needs either an interval or a scheduled time")
+        task = Task(name)
+        if interval not in (None, ""):
+            task.interval = _number(interval)
+            if task.interval <= 0:
+                raise ValueError(f"task '{name}' has a non-positive interval")
+            task.next_run = time.time() + task.interval
+            memory = record.get("memory")
+            task.memory = 0 if memory in (None, "") else _number(memory)
+        else:
+            task.scheduled_time = datetime.strptime(str(scheduled_time)[:5], "%H:%M").time()
+        command, backend = record.get("command") or None, record.get("backend") or None
+        overlap = record.get("overlap") or "skip"
+        max_concurrency = record.get("max_concurrency")
+        max_concurrency = None if max_concurrency in (None, "") else int(max_concurrency)
+        if overlap not in OVERLAP_POLICIES or (backend is not None and backend not in BACKENDS):
+            raise ValueError(f"task '{name}' has an unknown overlap policy or backend")
+        task.command, task.backend, task.max_concurrency, task.overlap = command, backend, max_concurrency, overlap
+        task.paused = record.get("paused") in (True, "true", "True", "1", 1)
+        return task
+
+    def _insert_batch(self, tasks):
+        """Add many tasks under one lock acquisition. Returns how many were added."""
+        waited = time.perf_counter()
+        with self.lock:
+            LOCK_WAIT.observe(time.perf_counter() - waited)
+            names = set()
+            unique = []
+            for task in tasks:
+                if task.name not in names and task.name not in self.tasks:
+                    names.add(task.name)
+                    unique.append(task)
+            allocated = self.memory_manager.allocate_batch(
+                [(task.name, task.memory) for task in unique if task.periodic])
+            added = []
+            entries = []
+            for task in unique:
+                if task.periodic and task.name not in allocated:
+                    continue
+                added.append(self.tasks.add(task))
+                if not task.paused:
+                    task.entry = [self._deadline(task), next(self.sequence), task]
+                    entries.append(task.entry)
+            if len(entries) * 4 > len(self.run_queue):
+                self.run_queue.extend(entries)  # Cheaper to re-heapify than to push one by one
+                heapq.heapify(self.run_queue)
+            else:
+                for entry in entries:
+                    heapq.heappush(self.run_queue, entry)
+            if entries:
+                self.wakeup.notify()
+            TASKS.set(len(self.tasks))
+            if self.journal.is_open() and added:
+                try:
+                    self.journal.append_many(OP_ADD, [task.to_fields() for task in added])  # Compaction waits until the import is done
+                except OSError as e:
+                    log.error("Error writing task journal: %s", e)
+        return len(added)
+
+    def _describe_target(self, task):
+        """Return a short suffix describing what a task executes."""
+        if task.command is not None:
+            return f" [command: {task.command}]"
+        if task.name in self.task_actions:
+            return " [action]"
+        return ""
 
     def log_task_execution(self, task_name, status="success"):
         """Log task execution results with status."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"[{timestamp}] Task '{task_name}' executed with status: {status}\n"
-        with open("task_log.txt", "a") as log_file:
-            log_file.write(log_message)
-        print(f"ProcessManager: Logged execution of task '{task_name}' with status: {status}.")
+        self.log_writer.write(log_message)
+        log.debug("Logged execution of task '%s' with status: %s.", task_name, status,
+                  extra={"task": task_name, "status": status})
+
+    def _deadline(self, task):
+        """Return the epoch timestamp at which a task is next due."""
+        if task.periodic:
+            return task.next_run
+        # Times already passed today are due immediately, as before.
+        return datetime.combine(datetime.now().date(), task.scheduled_time).timestamp()
+
+    def _push_task(self, task):
+        """Insert a task into the run queue. Caller must hold the lock."""
+        entry = task.entry = [self._deadline(task), next(self.sequence), task]
+        heapq.heappush(self.run_queue, entry)
+        if self.run_queue[0] is entry:
+            self.wakeup.notify()
+
+    def _cancel_task(self, task):
+        """Mark a task's heap entry as removed. Caller must hold the lock."""
+        entry = task.entry
+        if entry is None:
+            return
+        task.entry = None
+        was_head = self.run_queue[0] is entry
+        entry[2] = None
+        self.stale_entries += 1
+        if self.stale_entries > len(self.run_queue) // 2:
+            # Too many tombstones: rebuild the heap from live entries only.
+            self.run_queue = [e for e in self.run_queue if e[2] is not None]
+            heapq.heapify(self.run_queue)
+            self.stale_entries = 0
+        if was_head:
+            self.wakeup.notify()
+
+    def _pop_due_tasks(self, now):
+        """Pop every task whose deadline has passed. Caller must hold the lock."""
+        due = []
+        while self.run_queue and self.run_queue[0][0] <= now:
+            entry = heapq.heappop(self.run_queue)
+            task = entry[2]
+            if task is None:
+                self.stale_entries -= 1
+                continue
+            task.entry = None
+            due.append(task)
+        return due
+
+    def _next_timeout(self):
+        """Seconds until the earliest live deadline, or None if the queue is empty."""
+        while self.run_queue and self.run_queue[0][2] is None:
+            heapq.heappop(self.run_queue)
+            self.stale_entries -= 1
+        if not self.run_queue:
+            return None
+        return max(0.0, self.run_queue[0][0] - time.time())
+
+    def _rebuild_run_queue(self):
+        """Rebuild the run queue from the task registry. Caller must hold the lock."""
+        self.run_queue = []
+        self.stale_entries = 0
+        for task in self.tasks:
+            if task.paused:
+                task.entry = None
+                continue
+            task.entry = [self._deadline(task), next(self.sequence), task]
+            self.run_queue.append(task.entry)
+        heapq.heapify(self.run_queue)
+        self.wakeup.notify()
 
     def scheduler(self):
-        """Run all periodic and scheduled tasks."""
-        current_time = datetime.now().time()
+        """Run all periodic and scheduled tasks that are due."""
+        due = []
+        runs = []  # Journal records, appended in one write
+        waited = time.perf_counter()
         with self.lock:
-            # Run periodic tasks
-            for task in self.task_queue[:]:
-                if time.time() >= task["next_run"]:
-                    print(f"ProcessManager: Running periodic task '{task['name']}'...")
-                    self.log_task_execution(task["name"])
-                    task["next_run"] = time.time() + task["interval"]
-
-            # Run scheduled tasks
-            for task in self.scheduled_tasks[:]:
-                if task["scheduled_time"] <= current_time:
-                    print(f"ProcessManager: Running scheduled task '{task['name']}'...")
-                    self.log_task_execution(task["name"])
-                    self.scheduled_tasks.remove(task)
+            LOCK_WAIT.observe(time.perf_counter() - waited)
+            now = time.time()
+            for task in self._pop_due_tasks(now):
+                TASK_LATENESS.observe(max(0.0, now - self._deadline(task)))
+                if task.periodic:
+                    # Re-arm periodic task
+                    task.next_run = time.time() + task.interval
+                    self._push_task(task)
+                    runs.append({"name": task.name, "next_run": task.next_run})
+                    due.append(("periodic", task, self.task_actions.get(task.name)))
+                else:
+                    # Scheduled tasks run once
+                    self.tasks.remove(task.name)
+                    TASKS.set(len(self.tasks))
+                    runs.append({"name": task.name})
+                    due.append(("scheduled", task, self.task_actions.pop(task.name, None)))
+            if runs:
+                self._journal_events(OP_RUN, runs)
+
+        # Dispatch outside the lock so task bodies never hold up the scheduler
+        for kind, task, action in due:
+            self._dispatch(kind, task, action)
+
+    def _dispatch(self, kind, task, action=None):
+        """Hand a due task to the executor, or just log it if it has nothing to run."""
+        log.debug("Running %s task '%s'...", kind, task.name, extra={"task": task.name, "kind": kind})
+        TASKS_RUN[kind].inc()
+        if self.memory_manager.virtual_memory is not None:
+            with self.lock:
+                self.memory_manager.touch(task.name)  # Page the task's memory in before it runs
+        target = action if action is not None else task.command
+        if target is None:
+            self.log_task_execution(task.name)
+            return
+        outcome = self.executor.submit(task, target, self.log_task_execution)
+        if outcome == "skipped":
+            TASKS_SKIPPED.inc()
+            log.warning("Skipped task '%s' because a previous run is still in progress.", task.name,
+                        extra={"task": task.name})
+        elif outcome == "queued":
+            log.info("Queued task '%s' behind its running instance.", task.name, extra={"task": task.name})
+
+    def _journal_event(self, op, fields):
+        """Append a state change to the journal, compacting it when it grows large. Caller must hold the lock."""
+        self._journal_events(op, [fields])
+
+    def _journal_events(self, op, records):
+        """Append several state changes with one write, compacting the journal when it grows large.
+
+        Compaction waits until the journal is as long as the snapshot would be,
+        so its cost under the lock stays proportional to the records appended.
+        Caller must hold the lock.
+        """
+        if not self.journal.is_open():
+            return
+        try:
+            if len(records) == 1:
+                self.journal.append(op, records[0])
+            else:
+                self.journal.append_many(op, records)
+            if self.journal.needs_compaction(len(self.tasks)):
+                self._write_snapshot()
+        except OSError as e:
+            log.error("Error writing task journal: %s", e)
+
+    def _write_snapshot(self):
+        """Replace the snapshot with every task and start an empty journal. Caller must hold the lock."""
+        self.journal.write_snapshot([task.to_fields() for task in self.tasks])
 
     def save_state(self):
-        """Save tasks to a file."""
-        with self.lock:
-            state = {
-                "task_queue": self.task_queue,
-                "scheduled_tasks": self.scheduled_tasks
-            }
-        with open(self.STATE_FILE, "w") as file:
-            json.dump(state, file, indent=4)
-        print("ProcessManager: Task state saved.")
+        """Save tasks to a compacted snapshot."""
+        try:
+            with self.lock:
+                self._write_snapshot()
+            log.info("Task state saved.")
+        except OSError as e:
+            log.error("Error saving task state: %s", e)
 
     def load_state(self):
-        """Load tasks from a file."""
+        """Load tasks from the snapshot and replay the journal written since."""
         try:
-            with open(self.STATE_FILE, "r") as file:
+            if not self.journal.exists() and os.path.exists(self.STATE_FILE):
+                tasks = self._load_legacy_state()
+                self.journal.write_snapshot(tasks)
+            elif self.journal.exists():
+                tasks = self.journal.load()
+            else:
+                self.journal.load()  # Start an empty journal
+                log.info("No saved state found.")
+                return
+        except (OSError, ValueError) as e:
+            log.error("Error loading saved state: %s", e)
+            return
+        with self.lock:
+            for task in self.tasks:  # Release the registry being replaced, so a reload does not leak
+                if task.memory is not None:
+                    self.memory_manager.deallocate_memory(task.name)
+            self.task_actions.clear()
+            self.tasks = TaskRegistry()
+            duplicates = 0
+            for fields in tasks:
+                if self.tasks.add(Task.from_fields(fields)) is None:
+                    duplicates += 1  # Older state files allowed two tasks with one name; the first wins
+            if duplicates:
+                log.warning("Dropped %d tasks whose names were already taken.", duplicates)
+                self._write_snapshot()  # So the duplicates are gone for good
+            TASKS.set(len(self.tasks))
+            self.memory_manager.allocate_batch([(task.name, task.memory) for task in self.tasks if task.memory is not None])
+            self._rebuild_run_queue()
+        log.info("Task state loaded.")
+
+    def _load_legacy_state(self):
+        """Read tasks from the old JSON state file."""
+        with open(self.STATE_FILE, "r") as file:
+            try:
                 state = json.load(file)
-            with self.lock:
-                self.task_queue = state.get("task_queue", [])
-                self.scheduled_tasks = state.get("scheduled_tasks", [])
-            print("ProcessManager: Task state loaded.")
-        except FileNotFoundError:
-            print("ProcessManager: No saved state found.")
-        except json.JSONDecodeError:
-            print("ProcessManager: Error loading saved state.")
+            except json.JSONDecodeError as e:
+                raise ValueError(f"'{self.STATE_FILE}' is not valid JSON") from e
+        tasks = state.get("task_queue", []) + state.get("scheduled_tasks", [])
+        for task in tasks:
+            if "scheduled_time" in task:
+                task["scheduled_time"] = datetime.strptime(task["scheduled_time"][:5], "%H:%M").time()
+        log.info("Migrated %d tasks from '%s'.", len(tasks), self.STATE_FILE)
+        return tasks
 
     def start_auto(self):
         """Start automatic task scheduling."""
         if not self.running:
             self.running = True
             self.start_scheduler()
-            print("ProcessManager: Automatic scheduling started.")
+            log.info("Automatic scheduling started.")
 
     def stop_auto(self):
         """Stop automatic task scheduling."""
-        self.running = False
-        print("ProcessManager: Automatic scheduling stopped.")
+        with self.lock:
+            self.running = False
+            self.wakeup.notify()
+        thread = self.scheduler_thread
+        if thread is not None and thread is not current_thread():
+            thread.join()  # Make sure the loop has exited before a restart
+        self.scheduler_thread = None
+        log.info("Automatic scheduling stopped.")
+
+    def shutdown(self):
+        """Stop scheduling and wait for running tasks to finish."""
+        if self.running:
+            self.stop_auto()
+        self.executor.shutdown(wait=True)
+        self.log_writer.close()  # Flush pending log entries once the last task has reported
+        self.journal.close()
+        log.info("Shut down.")
 
     def start_scheduler(self):
         """Start the scheduler in a separate thread."""
-        scheduler_thread = Thread(target=self._automatic_scheduler, daemon=True)
-        scheduler_thread.start()
-        print("ProcessManager: Scheduler thread started.")
+        self.scheduler_thread = Thread(target=self._automatic_scheduler, daemon=True)
+        self.scheduler_thread.start()
+        log.debug("Scheduler thread started.")
 
     def _automatic_scheduler(self):
         """Internal method to run tasks automatically in the background."""
         while self.running:
             self.scheduler()
-            time.sleep(1)  # Sleep to allow other processes
+            with self.lock:
+                # Sleep until the earliest deadline, or until the head of the queue changes
+                if self.running:
+                    self.wakeup.wait(self._next_timeout())
+
+
+def _export_record(task):
+    """Return the portable fields of a task; the next run is recomputed on import."""
+    fields = task.to_fields()
+    record = {field: fields[field] for field in EXPORT_FIELDS if field in fields}
+    if "scheduled_time" in record:
+        record["scheduled_time"] = record["scheduled_time"].strftime("%H:%M")
+    return record
+
+
+def _number(value):
+    """Convert an imported int, float or numeric string, keeping whole numbers as ints."""
+    if isinstance(value, bool):
+        raise ValueError(f"'{value}' is not a number")
+    if isinstance(value, str):
+        value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if not isinstance(value, (int, float)):
+        raise ValueError(f"'{value}' is not a number")
+    return value
+
+
+def _read_records(filename):
+    """Yield (row number, record) from a CSV, JSON array or JSON lines file, one row at a time."""
+    with open(filename, newline="") as file:
+        if filename.endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(file), 2):  # Row 1 is the header
+                yield number, row
+            return
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+        if first == "[":
+            # A JSON array like tasks.json has to be parsed whole
+            file.seek(0)
+            yield from enumerate(json.load(file), 1)
+            return
+        file.seek(0)
+        for number, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None  # Reported as an invalid row by the importer
+                yield number, record
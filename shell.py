@@ -1,113 +1,729 @@
+import asyncio
+import collections
+import re
+import signal
+import threading
+import time
+from bulk_ops import BulkFileOperations, has_magic
+from fs_index import FileIndex
+from kernel.scheduler import workload
+from metrics import REGISTRY
+from system_log import flush as flush_log, get_level, get_logger, set_level
+from task_log import INTERVAL_BUCKETS, TaskLog, parse_time
+
+
+log = get_logger("Shell")
+
+
+def _words(line):
+    """Yield (word, bare_end) for the words of a line, where bare_end is False if the word ends inside quotes.
+
+    Text in matching '...' or "..." is part of the word as is, spaces
+    included; a quote without a match is an ordinary character.
+    """
+    word = None  # Characters of the word being read, or None between words
+    quote = None
+    bare_end = True
+    for index, char in enumerate(line):
+        if quote is not None:
+            if char == quote:
+                quote = None
+            else:
+                word.append(char)
+        elif char in "'\"" and line.find(char, index + 1) != -1:
+            quote = char
+            word = [] if word is None else word
+            bare_end = False
+        elif char.isspace():
+            if word is not None:
+                yield "".join(word), bare_end
+            word = None
+        else:
+            word = [] if word is None else word
+            word.append(char)
+            bare_end = True
+    if word is not None:
+        yield "".join(word), bare_end
+
+
+def split_commands(line):
+    """Split a command line into (words, background) commands.
+
+    Commands are separated by ";" at the end of a word, or by "&", which also
+    runs the command before it in the background: ``copy *.log logs & list; memory``.
+    Quote a word to keep spaces or a trailing ";" in it: ``write_file a.txt "one; two"``.
+    """
+    commands = []
+    words = []
+    for word, bare_end in _words(line):
+        if bare_end and word in ("&", ";"):
+            if words:
+                commands.append((words, word == "&"))
+            words = []
+        elif bare_end and word.endswith(";"):
+            words.append(word[:-1])
+            commands.append((words, False))
+            words = []
+        else:
+            words.append(word)
+    if words:
+        commands.append((words, False))
+    return commands
+
+
+def _in_thread(function, *args):
+    """Run ``function`` on a daemon thread and return a future for its result.
+
+    Unlike the event loop's default executor, a daemon thread never holds up
+    exit, e.g. one still blocked in ``input()`` when Ctrl-C arrives.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(method, value):
+        if not future.done():
+            method(value)
+
+    def run():
+        try:
+            result = function(*args)
+        except BaseException as e:
+            outcome = (future.set_exception, e)
+        else:
+            outcome = (future.set_result, result)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass  # The loop has already closed
+
+    threading.Thread(target=run, daemon=True, name="shell-wait").start()
+    return future
+
+
+class CommandJob:
+    """A shell command running in the background on its own thread."""
+
+    def __init__(self, line, handler, args):
+        self.line = line
+        self.error = None
+        self.finished = threading.Event()
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        threading.Thread(target=self._run, args=(handler, args), daemon=True, name="shell-job").start()
+
+    def _run(self, handler, args):
+        try:
+            handler(args)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.monotonic()
+            self.finished.set()
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def cancel(self):
+        """Commands cannot be stopped part-way; only bulk file operations can."""
+        return False
+
+    def report(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        if not self.finished.is_set():
+            state = "running"
+        elif self.error is not None:
+            state = f"failed: {self.error}"
+        else:
+            state = "done"
+        print(f"{self.line} ({state}, {end - self.started_at:.1f}s)")
+
+
 class Shell:
-    def __init__(self, kernel, file_system, process_manager):
+    def __init__(self, kernel, file_system, process_manager, file_index=None):
         self.kernel = kernel
         self.file_system = file_system
         self.process_manager = process_manager
+        self.file_index = file_index  # Created on first find/grep if not given
+        self.bulk = BulkFileOperations(file_system)
+        self.jobs = {}  # Job ID -> BulkOperation or CommandJob running in the background
+        self.next_job = 1
+        self.task_log = None  # Index over the task execution log, created on first query
+        self.commands = {}  # Command name -> (handler, min args, max args, bulk)
+        self.running = False
+        self.interrupted = threading.Event()  # Set by Ctrl-C for the command in the foreground
+        self.operation = None  # The BulkOperation in the foreground, cancelled by Ctrl-C
+        self.busy = False  # True while a foreground command runs
+        self._register_commands()
+
+    def register_command(self, name, handler, min_args=0, max_args=None, bulk=False):
+        """Add a command to the dispatch table.
+
+        ``handler(args)`` gets the words after the command name, and may be a
+        coroutine function. Bulk file commands get ``handler(args, background)``
+        and start their own background operation for a trailing "&"; any other
+        command given "&" runs on a thread of its own. A handler returns False
+        to report invalid arguments.
+        """
+        self.commands[name] = (handler, min_args, max_args, bulk)
+
+    def _register_commands(self):
+        pm = self.process_manager
+        fs = self.file_system
+        register = self.register_command
+
+        # Task-related commands
+        register("add", self.add_task, 3)
+        register("schedule", lambda args: pm.schedule_task(args[0], args[1], command=" ".join(args[2:]) or None), 2)
+        register("remove", lambda args: pm.remove_task(args[0]), 1, 1)
+        register("list", lambda args: pm.list_tasks())
+        register("run", lambda args: pm.scheduler())
+        register("memory", lambda args: pm.memory_manager.show_memory_usage())
+        register("stats", self.stats, 0, 2)
+        register("profile", self.profile_command, 1, 1)
+        register("cpu_sim", self.cpu_sim, 1)
+        register("log_level", lambda args: self.log_level(args[0] if args else None), 0, 1)
+        register("task_log", self.query_task_log, 1)
+        register("export_tasks", lambda args: pm.export_tasks(args[0]), 1, 1)
+        register("import_tasks", lambda args: pm.import_tasks(args[0]), 1, 1)
+        register("pause_task", lambda args: pm.pause_task(args[0]), 1, 1)
+        register("resume_task", lambda args: pm.resume_task(args[0]), 1, 1)
+        register("start_auto", lambda args: pm.start_auto())
+        register("stop_auto", lambda args: pm.stop_auto())
+
+        # File system commands
+        register("create_file", lambda args: fs.create_file(args[0]), 1, 1)
+        register("write_file", lambda args: self.write_file(args, append=False), 2)
+        register("append_file", lambda args: self.write_file(args, append=True), 2)
+        register("read_file", self.read_file, 1, 3)
+        register("head", lambda args: self.read_lines(args, head=True), 1, 2)
+        register("tail", lambda args: self.read_lines(args, head=False), 1, 2)
+        register("list_files", self.list_files)
+        register("rename", lambda args: fs.rename(args[0], args[1]), 2, 2)
+        register("make_directory", lambda args: fs.make_directory(args[0]), 1, 1)
+        register("change_directory", lambda args: fs.change_directory(args[0]), 1, 1)
+        register("move", self.move, 2, 2, bulk=True)
+        register("copy", lambda args, background: self.run_bulk(lambda: self.bulk.copy(*args), background),
+                 2, 2, bulk=True)
+        register("checksum", lambda args, background: self.run_bulk(lambda: self.bulk.checksum(*args), background),
+                 1, 2, bulk=True)
+        register("delete", self.delete, 1, 1, bulk=True)
+        register("find", lambda args: self.find(args[0]), 1, 1)
+        register("grep", self.grep_command, 1)
+        register("index", lambda args: self.show_index(rebuild=args == ["rebuild"]))
+
+        # Shell commands
+        register("jobs", lambda args: self.show_jobs())
+        register("cancel", self.cancel_job, 1, 1)
+        register("wait", self.wait_jobs)
+        register("help", lambda args: self.show_help())
+        register("exit", self.exit)
 
     def start(self):
-        """Start the shell interface."""
+        """Start the interactive shell."""
         print("Shell: Command-line interface started.")
         print("Type 'help' for a list of available commands.")
-        while True:
-            command = input("OS> ").strip().split()
-            if not command:
+        self._run(self._interactive())
+
+    def run_script(self, file):
+        """Run every command in a file (or ``sys.stdin``) without prompting, then wait for background jobs.
+
+        Blank lines and lines starting with "#" are skipped. Returns the number
+        of commands run.
+        """
+        return self._run(self._script(file))
+
+    def _run(self, session):
+        """Run a session on an event loop, handling Ctrl-C here rather than through asyncio.
+
+        asyncio.run would turn Ctrl-C into cancelling the session, which a
+        command running on the loop never sees. Instead Ctrl-C during a command
+        sets ``interrupted`` and cancels the bulk operation in the foreground,
+        so profile, copy, move and the like stop early and the shell carries
+        on. At the prompt, or pressed again, it raises KeyboardInterrupt.
+        """
+        try:
+            previous = signal.signal(signal.SIGINT, self._interrupt)
+        except ValueError:
+            return asyncio.run(session)  # Not the main thread, so Ctrl-C is not ours to handle
+        try:
+            return asyncio.run(session)
+        finally:
+            signal.signal(signal.SIGINT, previous)
+
+    def _interrupt(self, signum, frame):
+        if not self.busy or self.interrupted.is_set():
+            raise KeyboardInterrupt
+        self.interrupted.set()
+        operation = self.operation
+        if operation is not None:
+            operation.cancel()
+        print("\nShell: Interrupted.")
+
+    async def _interactive(self):
+        self.running = True
+        while self.running:
+            flush_log()  # Let queued log lines print before the prompt rather than after it
+            try:
+                # Read on a thread so background jobs keep running while the prompt waits
+                line = await _in_thread(input, "OS> ")
+            except EOFError:
+                print()
+                break
+            await self.execute(line)
+
+    async def _script(self, file):
+        self.running = True
+        count = 0
+        for line in file:
+            if not self.running:
+                break
+            if line.lstrip().startswith("#"):
                 continue
+            count += await self.execute(line)
+        await self.wait_jobs([])
+        return count
 
-            action = command[0].lower()
-
-            # Task-related commands
-            if action == "add" and len(command) == 4:
-                try:
-                    task_name = command[1]
-                    interval = int(command[2])
-                    memory_size = int(command[3])
-                    self.process_manager.add_task(task_name, interval, memory_size)
-                except ValueError:
-                    print("Shell: Invalid interval or memory size. Please enter valid numbers.")
-            elif action == "schedule" and len(command) == 3:
-                task_name = command[1]
-                time_str = command[2]
-                self.process_manager.schedule_task(task_name, time_str)
-            elif action == "remove" and len(command) == 2:
-                task_name = command[1]
-                self.process_manager.remove_task(task_name)
-            elif action == "list":
-                self.process_manager.list_tasks()
-            elif action == "move" and len(command) == 3:
-                source = command[1]
-                destination = command[2]
-                self.file_system.move(source, destination)
-            elif action == "rename" and len(command) == 3:
-                old_name = command[1]
-                new_name = command[2]
-                self.file_system.rename(old_name, new_name)
-
-            elif action == "run":
-                self.process_manager.scheduler()
-            elif action == "memory":
-                self.process_manager.memory_manager.show_memory_usage()
-            elif action == "export_tasks" and len(command) == 2:
-                filename = command[1]
-                self.process_manager.export_tasks(filename)
-            elif action == "import_tasks" and len(command) == 2:
-                filename = command[1]
-                self.process_manager.import_tasks(filename)
-            elif action == "pause_task" and len(command) == 2:
-                task_name = command[1]
-                self.process_manager.pause_task(task_name)
-            elif action == "resume_task" and len(command) == 2:
-                task_name = command[1]
-                self.process_manager.resume_task(task_name)
-            elif action == "start_auto":
-                self.process_manager.start_auto()
-            elif action == "stop_auto":
-                self.process_manager.stop_auto()
-
-            # File system commands
-            elif action == "create_file" and len(command) == 2:
-                filename = command[1]
-                self.file_system.create_file(filename)
-            elif action == "write_file" and len(command) >= 3:
-                filename = command[1]
-                content = " ".join(command[2:])  # Combine all content after the filename
-                self.file_system.write_file(filename, content)
-            elif action == "read_file" and len(command) == 2:
-                filename = command[1]
-                self.file_system.read_file(filename)
-            elif action == "list_files":
-                self.file_system.list_files()
-            elif action == "delete" and len(command) == 2:
-                path = command[1]
-                self.file_system.delete(path)
-            elif action == "make_directory" and len(command) == 2:
-                dir_name = command[1]
-                self.file_system.make_directory(dir_name)
-            elif action == "change_directory" and len(command) == 2:
-                dir_name = command[1]
-                self.file_system.change_directory(dir_name)
-
-            # Help command
-            elif action == "help":
-                self.show_help()
-
-            # Exit command
-            elif action == "exit":
-                print("Shell: Exiting...")
+    async def execute(self, line):
+        """Run every command on a line. Returns how many were run."""
+        count = 0
+        for words, background in split_commands(line):
+            if not self.running:
                 break
+            await self.dispatch(words, background)
+            count += 1
+        return count
+
+    async def dispatch(self, words, background=False):
+        """Run one command, in the background if asked. Returns False if the command or its arguments were invalid."""
+        entry = self.commands.get(words[0].lower())
+        args = words[1:]
+        if entry is None or len(args) < entry[1] or (entry[2] is not None and len(args) > entry[2]):
+            print("Shell: Invalid command or arguments. Type 'help' for assistance.")
+            return False
+        handler, _, _, bulk = entry
+        if background and not bulk:
+            self._start_job(" ".join(words), handler, args)
+            return True
+        try:
+            self.interrupted.clear()
+            self.busy = True
+            try:
+                result = handler(args, background) if bulk else handler(args)
+                if asyncio.iscoroutine(result):
+                    result = await result
+            finally:
+                self.busy = False
+        except Exception as e:
+            # One failing command must not end the session, least of all a script or a remote one
+            log.error("Command '%s' failed: %s", " ".join(words), e)
+            return False
+        if result is False:
+            print("Shell: Invalid command or arguments. Type 'help' for assistance.")
+            return False
+        return True
+
+    def _start_job(self, line, handler, args):
+        job_id = self._add_job(CommandJob(line, handler, args))
+        print(f"Shell: Started job {job_id} ({line}).")
+
+    def _add_job(self, job):
+        job_id = str(self.next_job)
+        self.next_job += 1
+        self.jobs[job_id] = job
+        return job_id
+
+    def exit(self, args):
+        print("Shell: Exiting...")
+        self.running = False
+
+    def add_task(self, args):
+        try:
+            interval = int(args[1])
+            memory_size = int(args[2])
+        except ValueError:
+            print("Shell: Invalid interval or memory size. Please enter valid numbers.")
+            return
+        task_command = " ".join(args[3:]) or None  # Optional command to execute
+        self.process_manager.add_task(args[0], interval, memory_size, command=task_command)
+
+    def stats(self, args):
+        if args and (len(args) != 2 or args[0] != "--export"):
+            return False
+        self.show_stats(args[1] if args else None)
+
+    def profile_command(self, args):
+        try:
+            seconds = float(args[0])
+        except ValueError:
+            print("Shell: Invalid duration. Please enter a number of seconds.")
+            return
+        self.profile(seconds)
+
+    def write_file(self, args, append):
+        binary = False
+        while args and args[0] in ("--append", "--binary"):
+            append = append or args[0] == "--append"
+            binary = binary or args[0] == "--binary"
+            args = args[1:]
+        if len(args) < 2:
+            print("Shell: Usage: write_file [--append] [--binary] <filename> <content>")
+            return
+        filename = args[0]
+        content = " ".join(args[1:])  # Combine all content after the filename
+        if binary:
+            try:
+                content = bytes.fromhex(content)
+            except ValueError:
+                print("Shell: Binary content must be hex digits, e.g. 'de ad be ef'.")
+                return
+        self.file_system.write_file(filename, content, append=append, binary=binary)
+
+    def read_file(self, args):
+        try:
+            offset = int(args[1]) if len(args) > 1 else 0
+            length = int(args[2]) if len(args) > 2 else None
+        except ValueError:
+            print("Shell: Invalid offset or length. Please enter valid numbers.")
+            return
+        self.file_system.read_file(args[0], offset, length)
+
+    def read_lines(self, args, head):
+        try:
+            lines = int(args[1]) if len(args) == 2 else 10
+        except ValueError:
+            print("Shell: Invalid line count. Please enter a valid number.")
+            return
+        if head:
+            self.file_system.read_file(args[0], head=lines)
+        else:
+            self.file_system.read_file(args[0], tail=lines)
+
+    def move(self, args, background):
+        source, destination = args
+        if has_magic(source):
+            self.run_bulk(lambda: self.bulk.move(source, destination), background)
+        elif background:
+            # A single path keeps move's rename semantics; a bulk move always moves into a directory
+            self._start_job(f"move {source} {destination}", lambda args: self.file_system.move(*args), args)
+        else:
+            self.file_system.move(source, destination)
+
+    def delete(self, args, background):
+        path = args[0]
+        if has_magic(path) or background:
+            self.run_bulk(lambda: self.bulk.delete(path), background)
+        else:
+            self.file_system.delete(path)
+
+    def grep_command(self, args):
+        pattern = None
+        if len(args) > 1 and has_magic(args[-1]):
+            pattern = args[-1]  # A trailing glob limits which files are searched
+            args = args[:-1]
+        self.grep(" ".join(args), pattern)
+
+    def cancel_job(self, args):
+        job_id = args[0].lstrip("%")
+        job = self.jobs.get(job_id)
+        if job is None:
+            print(f"Shell: No job '{args[0]}'.")
+        elif job.cancel() is False:
+            print(f"Shell: Job {job_id} is a shell command and cannot be cancelled; use 'wait {job_id}'.")
+        else:
+            print(f"Shell: Cancelling job {job_id}.")
+
+    async def wait_jobs(self, args):
+        """Wait for the given background jobs, or all of them, and show how they ended."""
+        job_ids = [arg.lstrip("%") for arg in args] or list(self.jobs)
+        for job_id in job_ids:
+            job = self.jobs.get(job_id)
+            if job is None:
+                print(f"Shell: No job '{job_id}'.")
+                continue
+            await _in_thread(self._wait_job, job)
+            if not job.finished.is_set():
+                print("Shell: Stopped waiting.")  # Interrupted; the jobs keep running
+                return
+            print(f"[{job_id}] ", end="")
+            self.show_job_result(job)
+            del self.jobs[job_id]
+
+    def _wait_job(self, job):
+        while not job.wait(0.1) and not self.interrupted.is_set():
+            pass
+
+    def list_files(self, args):
+        """Parse ``list_files [pattern] [--sort name|size|mtime|none] [--reverse] [--files|--dirs] [--page N] [--page-size N]``."""
+        options = {"pattern": None, "kind": None, "sort": "name", "reverse": False}
+        page, page_size = None, 50
+        try:
+            index = 0
+            while index < len(args):
+                arg = args[index]
+                if arg == "--sort":
+                    index += 1
+                    options["sort"] = None if args[index] == "none" else args[index]
+                elif arg == "--reverse":
+                    options["reverse"] = True
+                elif arg in ("--files", "--dirs"):
+                    options["kind"] = "file" if arg == "--files" else "dir"
+                elif arg == "--page":
+                    index += 1
+                    page = int(args[index])
+                elif arg == "--page-size":
+                    index += 1
+                    page_size = int(args[index])
+                else:
+                    options["pattern"] = arg
+                index += 1
+        except (IndexError, ValueError):
+            print("Shell: Usage: list_files [pattern] [--sort name|size|mtime|none] [--reverse] "
+                  "[--files|--dirs] [--page N] [--page-size N]")
+            return
+        if page is not None:
+            options["offset"] = (max(page, 1) - 1) * page_size
+            options["limit"] = page_size
+        self.file_system.list_files(**options)
+
+    def show_stats(self, export_path=None):
+        """Print every metric, or write them to a file in Prometheus text format."""
+        if export_path is not None:
+            try:
+                REGISTRY.write_prometheus(export_path)
+                print(f"Shell: Metrics written to '{export_path}' in Prometheus text format.")
+            except OSError as e:
+                print(f"Shell: Error writing metrics: {e}")
+            return
+        print("Shell: Metrics since startup:")
+        for line in REGISTRY.render():
+            print(line)
+
+    def log_level(self, level=None):
+        """Show the log level, or change it for every subsystem."""
+        if level is not None:
+            try:
+                set_level(level)
+            except ValueError as e:
+                print(f"Shell: {e}")
+                return
+        print(f"Shell: Log level is {get_level()}.")
+
+    def profile(self, seconds):
+        """Collect metrics for a number of seconds (Ctrl-C ends early) and print what changed, with rates."""
+        print(f"Shell: Profiling for {seconds:g} seconds...")
+        before = REGISTRY.snapshot()
+        start = time.monotonic()
+        self.interrupted.wait(seconds)
+        elapsed = time.monotonic() - start
+        changes = REGISTRY.delta(before, REGISTRY.snapshot())
+        print(f"Shell: Activity over {elapsed:.1f} seconds:")
+        for line in REGISTRY.render(changes, elapsed):
+            print(line)
+
+    def cpu_sim(self, args):
+        """Parse ``cpu_sim <policy> [processes] [--cpus N] [--quantum Q] [--pinned F] [--no-steal] [--round-robin]``."""
+        policy, processes, options = args[0], 0, {}
+        cpus, pinned, stealing, placement = None, 0.0, True, "least_loaded"
+        try:
+            index = 1
+            while index < len(args):
+                arg = args[index]
+                if arg == "--cpus":
+                    index += 1
+                    cpus = int(args[index])
+                elif arg == "--quantum":
+                    index += 1
+                    options["quantum"] = float(args[index])
+                elif arg == "--pinned":
+                    index += 1
+                    pinned = float(args[index])
+                elif arg == "--no-steal":
+                    stealing = False
+                elif arg == "--round-robin":
+                    placement = "round_robin"
+                else:
+                    processes = int(arg)
+                index += 1
+        except (IndexError, ValueError):
+            print("Shell: Usage: cpu_sim <policy> [processes] [--cpus N] [--quantum Q] [--pinned F] "
+                  "[--no-steal] [--round-robin]")
+            return
+        cpus = cpus or self.kernel.cpus
+        # Without a process count, the kernel's own process table is simulated
+        trace = workload(processes, cpus=cpus, pinned_fraction=pinned) if processes else None
+        try:
+            self.kernel.simulate_scheduling(policy, trace, cpus=cpus, stealing=stealing, placement=placement,
+                                            **options)
+        except (ValueError, TypeError) as e:
+            print(f"Shell: Invalid simulation arguments: {e}")
+
+    def index(self):
+        """Return the file index, re-rooting it if the current directory has left the indexed tree."""
+        index = self.file_index
+        if index is None or not index.covers(self.file_system.current_directory):
+            watcher = None
+            if index is not None:
+                index.close()
+                watcher = index.watcher
+            index = self.file_index = FileIndex(self.file_system, watcher=watcher)
+        return index
+
+    def find(self, pattern):
+        started = time.perf_counter()
+        matches = self.index().find(pattern)
+        for path in matches:
+            print(f"- {path}")
+        print(f"Shell: {len(matches)} match(es) in {(time.perf_counter() - started) * 1000:.1f}ms.")
+
+    def grep(self, query, pattern=None):
+        started = time.perf_counter()
+        try:
+            matches = 0
+            for path, number, line in self.index().grep(query, pattern):
+                matches += 1
+                print(f"{path}:{number}: {line}")
+        except re.error as e:
+            print(f"Shell: Invalid pattern '{query}': {e}")
+            return
+        print(f"Shell: {matches} matching line(s) in {(time.perf_counter() - started) * 1000:.1f}ms.")
+
+    def query_task_log(self, args):
+        """Parse ``task_log runs|stats|intervals [task] [--since T] [--until T] [--limit N]`` and answer it."""
+        usage = ("Shell: Usage: task_log runs|stats|intervals [task] [--since 1h|YYYY-MM-DDTHH:MM] [--until ...] "
+                 "[--limit N]")
+        query, task, since, until, limit = args[0], None, None, None, 20
+        try:
+            index = 1
+            while index < len(args):
+                arg = args[index]
+                if arg in ("--since", "--until"):
+                    index += 1
+                    value = parse_time(args[index])
+                    since, until = (value, until) if arg == "--since" else (since, value)
+                elif arg == "--limit":
+                    index += 1
+                    limit = int(args[index])
+                else:
+                    task = arg
+                index += 1
+        except IndexError:
+            print(usage)
+            return
+        except ValueError as e:
+            print(f"Shell: {e}")
+            return
+        if query not in ("runs", "stats", "intervals") or (query == "intervals" and task is None):
+            print(usage)
+            return
+        started = time.perf_counter()
+        self.process_manager.log_writer.flush()  # Make sure queued entries are on disk
+        if self.task_log is None:
+            self.task_log = TaskLog(self.process_manager.log_writer.path)
+        if self.task_log.refresh():
+            self.task_log.save()
+        subject = f"'{task}'" if task else "all tasks"
+        if query == "runs":
+            runs = collections.deque(self.task_log.runs(task, since, until), maxlen=limit)  # The latest ``limit``
+            for timestamp, name, status in runs:
+                moment = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+                print(f"- {moment} {name}: {status or 'executed'}")
+            summary = f"{len(runs)} most recent run(s) of {subject}"
+        elif query == "stats":
+            counts = self.task_log.counts(task, since, until)
+            if task is None:
+                for name, runs in sorted(self.task_log.tasks(since, until).items()):
+                    print(f"- {name}: {runs} run(s)")
+            summary = (f"{sum(counts.values())} run(s) of {subject}: {counts['success']} succeeded, "
+                       f"{counts['failure']} failed, {counts['unknown']} without a status")
+        else:
+            histogram = self.task_log.intervals(task, since, until)
+            labels = [f"<= {bound}s" for bound in INTERVAL_BUCKETS] + [f"> {INTERVAL_BUCKETS[-1]}s"]
+            for label, count in zip(labels, histogram["counts"]):
+                if count:
+                    print(f"- {label:>10}: {count}")
+            if histogram["count"]:
+                print(f"- min {histogram['min']:g}s, avg {histogram['sum'] / histogram['count']:.1f}s, "
+                      f"max {histogram['max']:g}s")
+            summary = f"{histogram['count']} interval(s) between runs of {subject}"
+        print(f"Shell: {summary} in {(time.perf_counter() - started) * 1000:.1f}ms.")
+
+    def show_index(self, rebuild=False):
+        index = self.index()
+        started = time.perf_counter()
+        if rebuild:
+            index.close()
+            index = self.file_index = FileIndex(self.file_system, watcher=index.watcher)
+            index.refresh()
+        else:
+            if index.refreshed_at is None:
+                index.load()
+            index.refresh()
+        index.save()
+        stats = index.stats()
+        print(f"Shell: Indexed {stats['files']} files ({stats['words']} distinct words, "
+              f"{stats['unindexed']} too large to index) under '{stats['root']}' "
+              f"in {(time.perf_counter() - started) * 1000:.1f}ms.")
+
+    def run_bulk(self, start, background):
+        """Start a bulk file operation; wait for it with progress reports unless it runs in the background."""
+        try:
+            operation = start()
+        except (OSError, ValueError) as e:
+            print(f"Shell: Bulk operation failed to start: {e}")
+            return
+        if background:
+            job_id = self._add_job(operation)
+            print(f"Shell: Started job {job_id} ({operation.kind} of {operation.total_files} files).")
+            return
+        self.operation = operation  # So Ctrl-C can cancel it
+        try:
+            while not operation.wait(1):
+                operation.report()
+        finally:
+            self.operation = None
+        self.show_bulk_result(operation)
+
+    def show_bulk_result(self, operation):
+        operation.report()
+        for path, digest in sorted(operation.results.items()):
+            print(f"{digest}  {path}")
+        for path, message in operation.errors[:10]:
+            print(f"- Failed: {path}: {message}")
+        if len(operation.errors) > 10:
+            print(f"- ... and {len(operation.errors) - 10} more failures")
+
+    def show_job_result(self, job):
+        if isinstance(job, CommandJob):
+            job.report()
+        else:
+            self.show_bulk_result(job)
 
-            # Invalid command handling
+    def show_jobs(self):
+        """Report background jobs, forgetting finished ones once shown."""
+        if not self.jobs:
+            print("Shell: No background jobs.")
+        for job_id, operation in list(self.jobs.items()):
+            print(f"[{job_id}] ", end="")
+            if operation.finished.is_set():
+                self.show_job_result(operation)
+                del self.jobs[job_id]
             else:
-                print("Shell: Invalid command or arguments. Type 'help' for assistance.")
+                operation.report()
 
     def show_help(self):
         """Display available commands and their usage."""
         print("Available Commands:")
-        print("- add <task_name> <interval> <memory>: Add a periodic task.")
-        print("- schedule <task_name> <HH:MM>: Schedule a task to run at a specific time.")
+        print("- add <task_name> <interval> <memory> [command]: Add a periodic task.")
+        print("- schedule <task_name> <HH:MM> [command]: Schedule a task to run at a specific time.")
         print("- remove <task_name>: Remove a task.")
         print("- list: List all tasks (periodic and scheduled).")
         print("- run: Run all periodic tasks immediately.")
         print("- memory: Display memory usage.")
+        print("- stats [--export <file>]: Show runtime metrics, or write them to a file in Prometheus text format.")
+        print("- profile <seconds>: Show the metrics that changed over the next few seconds, with rates.")
+        print("- log_level [debug|info|warning|error]: Show or change how much the subsystems log.")
+        print("- cpu_sim <fcfs|sjf|srtf|rr|mlfq|cfs> [processes] [--cpus N] [--quantum Q] [--pinned F] [--no-steal] "
+              "[--round-robin]: Simulate CPU scheduling of the kernel's processes, or of a generated trace.")
         print("- export_tasks <filename>: Export all tasks to a file.")
         print("- import_tasks <filename>: Import tasks from a file.")
         print("- pause_task <task_name>: Pause a specific task.")
@@ -115,10 +731,25 @@ class Shell:
         print("- start_auto: Start automatic scheduling.")
         print("- stop_auto: Stop automatic scheduling.")
         print("- create_file <filename>: Create an empty file.")
-        print("- write_file <filename> <content>: Write content to a file.")
-        print("- read_file <filename>: Read the content of a file.")
-        print("- list_files: List all files in the current directory.")
-        print("- delete <path>: Delete a file or directory.")
+        print("- write_file [--append] [--binary] <filename> <content>: Write content (hex with --binary) to a file.")
+        print("- append_file <filename> <content>: Append content to a file.")
+        print("- read_file <filename> [offset] [length]: Stream a file, or a byte range of it.")
+        print("- head <filename> [lines] / tail <filename> [lines]: Show the first or last lines of a file.")
+        print("- list_files [pattern] [--sort name|size|mtime|none] [--reverse] [--files|--dirs] [--page N] "
+              "[--page-size N]: List files in the current directory.")
+        print("- delete <path|pattern> [&]: Delete a file or directory, or everything matching a glob pattern.")
+        print("- move <source|pattern> <destination> [&]: Move a path, or everything matching a pattern, into place.")
+        print("- copy <pattern> <destination> [&]: Copy matching files and directories into a directory.")
+        print("- checksum <pattern> [algorithm] [&]: Hash matching files (sha256 by default).")
+        print("- find <pattern>: Find files by name glob, or by path glob when it contains '/' ('**' spans directories).")
+        print("- grep <regex> [glob]: Search file contents, optionally only in files matching a glob.")
+        print("- task_log runs|stats|intervals [task] [--since 1h|YYYY-MM-DDTHH:MM] [--until ...] [--limit N]: "
+              "Query the task execution log through its index.")
+        print("- index [rebuild]: Update (or rebuild) the search index and show its size.")
+        print("- <command> &: Run any command in the background as a job. Separate commands on one line with ';' or '&'.")
+        print("- \"...\" or '...': Quote a word to keep spaces or a ';' in it, e.g. write_file a.txt \"one; two\".")
+        print("- jobs / cancel <job_id>: Show background jobs, or cancel a file operation. Ctrl-C cancels one in the foreground.")
+        print("- wait [job_id ...]: Wait for background jobs (all of them by default) and show how they ended.")
         print("- make_directory <dir_name>: Create a new directory.")
         print("- change_directory <dir_name>: Change to a specific directory.")
         print("- help: Display this help message.")
@@ -0,0 +1,268 @@
+import atexit
+import contextlib
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+from metrics import REGISTRY
+
+
+ROOT = "os"  # Every subsystem logger lives under this name, e.g. "os.ProcessManager"
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "critical": logging.CRITICAL,
+}
+DEFAULT_LEVEL = logging.INFO
+QUIET_LEVEL = logging.WARNING  # Quiet mode keeps warnings and errors only
+QUEUE_SIZE = 10000  # Records waiting for the writer thread before new ones are dropped
+
+DROPPED = REGISTRY.counter("log_records_dropped_total", "Log records dropped because the log queue was full.")
+
+# Attributes every LogRecord has; anything else on a record came from ``extra=`` and is a structured field
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_registered_exit = False
+_capturing = threading.local()  # ``buffer`` is set on threads whose output is being captured
+
+
+def get_logger(subsystem):
+    """Return the logger for a subsystem, e.g. ``get_logger("ProcessManager")``.
+
+    Pass message arguments separately (``log.info("Added task '%s'.", name)``)
+    so the message is only formatted if the record is actually written.
+    """
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+def _subsystem(record):
+    return record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+
+
+def fields(record):
+    """Return the structured fields attached to a record with ``extra=``."""
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD_ATTRIBUTES}
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Formats records as ``Subsystem: message``, the way the subsystems have always printed."""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.levelno >= logging.WARNING:
+            message = f"{record.levelname.title()}: {message}"
+        line = f"{_subsystem(record)}: {message}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including any structured fields."""
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname.lower(),
+            "subsystem": _subsystem(record),
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update(fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever ``sys.stdout`` is at the time, so redirected output still captures it."""
+
+    @property
+    def stream(self):
+        return getattr(sys.stdout, "console", sys.stdout)  # Captured threads get records from _CaptureHandler
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _ThreadStdout:
+    """Stands in for ``sys.stdout`` once output is captured: a capturing thread's writes go to its buffer."""
+
+    def __init__(self, console):
+        self.console = console
+
+    def write(self, text):
+        buffer = getattr(_capturing, "buffer", None)
+        return (self.console if buffer is None else buffer).write(text)
+
+    def flush(self):
+        if getattr(_capturing, "buffer", None) is None:
+            self.console.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.console, name)
+
+
+class _CaptureHandler(logging.Handler):
+    """Copies records logged on a capturing thread into its buffer, formatted as on the console.
+
+    It runs on the thread that logged, so it works however the console
+    handlers are set up, including through the queue.
+    """
+
+    def emit(self, record):
+        buffer = getattr(_capturing, "buffer", None)
+        if buffer is not None:
+            buffer.write(self.format(record) + "\n")
+
+
+_capture_handler = _CaptureHandler()
+_capture_handler.setFormatter(ConsoleFormatter())
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread without formatting them on the caller's thread.
+
+    The stock QueueHandler formats each record before queueing it so it can
+    cross process boundaries; our queue stays in-process, so the writer
+    thread can do that work instead.
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()  # Never block the caller on a backed-up terminal
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def handle(self, record):
+        if isinstance(record, threading.Event):
+            record.set()  # A flush marker: everything queued before it has been written
+        else:
+            super().handle(record)
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # Wait for room rather than lose the stop signal
+
+
+def _install(handlers):
+    logger = logging.getLogger(ROOT)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if handler is not _capture_handler:
+            handler.close()
+    for handler in handlers + [_capture_handler]:
+        logger.addHandler(handler)
+    logger.propagate = False
+
+
+def _console(json_format=False):
+    handler = _StdoutHandler()
+    handler.setFormatter(JSONFormatter() if json_format else ConsoleFormatter())
+    return handler
+
+
+def _level(level):
+    if isinstance(level, str):
+        if level.lower() not in LEVELS:
+            raise ValueError(f"Unknown log level '{level}'. Use one of: {', '.join(LEVELS)}.")
+        return LEVELS[level.lower()]
+    return level
+
+
+def set_level(level):
+    """Set the level of every subsystem logger, by name ("debug", "info", ...) or number. Returns the number."""
+    level = _level(level)
+    logging.getLogger(ROOT).setLevel(level)
+    return level
+
+
+def get_level():
+    """Return the name of the current level."""
+    return logging.getLevelName(logging.getLogger(ROOT).level).lower()
+
+
+def configure(level=DEFAULT_LEVEL, quiet=False, json_format=False, path=None, asynchronous=True):
+    """Send every subsystem's log records to the console, and optionally to a JSON lines file.
+
+    With ``asynchronous`` the records go through a queue to a writer thread,
+    so logging never blocks on terminal or disk I/O. ``quiet`` drops
+    everything below warnings before a record is even created.
+    """
+    global _listener, _registered_exit
+    level = _level(QUIET_LEVEL if quiet else level)
+    shutdown()
+    handlers = [_console(json_format)]
+    if path:
+        file_handler = logging.FileHandler(path)
+        file_handler.setFormatter(JSONFormatter())
+        handlers.append(file_handler)
+    if asynchronous:
+        log_queue = queue.Queue(QUEUE_SIZE)
+        _listener = _QueueListener(log_queue, *handlers)
+        _listener.start()
+        handlers = [_QueueHandler(log_queue)]
+        if not _registered_exit:
+            atexit.register(shutdown)  # Flush whatever is still queued when the program exits
+            _registered_exit = True
+    _install(handlers)
+    set_level(level)
+
+
+@contextlib.contextmanager
+def capture():
+    """Collect everything the current thread prints or logs into a StringIO, e.g. to answer a remote command.
+
+    Other threads keep writing to the console. Nested captures each get
+    their own buffer.
+    """
+    if not isinstance(sys.stdout, _ThreadStdout):
+        sys.stdout = _ThreadStdout(sys.stdout)
+    previous = getattr(_capturing, "buffer", None)
+    buffer = _capturing.buffer = io.StringIO()
+    try:
+        yield buffer
+    finally:
+        _capturing.buffer = previous
+
+
+def flush(timeout=1.0):
+    """Wait until every record logged so far has been written, e.g. before showing a prompt."""
+    listener = _listener
+    if listener is None:
+        return
+    done = threading.Event()
+    try:
+        listener.queue.put(done, timeout=timeout)
+    except queue.Full:
+        return
+    done.wait(timeout)
+
+
+def shutdown():
+    """Stop the writer thread once it has written every queued record, and log synchronously again."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    _install([_console()])  # Later records go straight to the console rather than a stopped queue
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+# Until configure() is called, log synchronously to stdout at the default level
+_install([_console()])
+set_level(DEFAULT_LEVEL)
@@ -0,0 +1,154 @@
+import shlex
+import subprocess
+import sys
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from threading import Lock
+
+
+OVERLAP_POLICIES = ("skip", "queue", "parallel")
+BACKENDS = ("thread", "process")
+
+
+def run_command(command):
+    """Run a task command and return its status string.
+
+    Python scripts run under the current interpreter and shell scripts under
+    ``sh``; anything else is split and executed directly. This is a module-level
+    function so it can be shipped to a process pool.
+    """
+    if command.endswith(".py"):
+        args = [sys.executable] + shlex.split(command)
+    elif command.endswith(".sh"):
+        args = ["sh"] + shlex.split(command)
+    else:
+        args = shlex.split(command)
+    try:
+        result = subprocess.run(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        return f"error ({e.strerror})"
+    if result.returncode == 0:
+        return "success"
+    return f"failed (exit code {result.returncode})"
+
+
+def run_action(action):
+    """Run a task callable and return its status string."""
+    result = action()
+    return "success" if result is None or result is True else str(result)
+
+
+class TaskExecutor:
+    def __init__(self, backend="thread", max_workers=4, max_queued=100):
+        """Initialize the task executor."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend}'.")
+        self.backend = backend          # Default backend for tasks that do not pick one
+        self.max_workers = max_workers  # Worker count for each pool
+        self.max_queued = max_queued    # Cap on deferred runs per task
+        self.pools = {}                 # Lazily created executors by backend name
+        self.lock = Lock()              # Protects the bookkeeping below, never held while a task runs
+        self.active = defaultdict(int)  # Number of in-flight runs per task name
+        self.backlog = defaultdict(deque)  # Deferred runs per task name (overlap policy "queue")
+        self.shutting_down = False
+
+    def _pool(self, backend):
+        """Return the pool for a backend, creating it on first use."""
+        with self.lock:
+            if self.shutting_down:
+                raise RuntimeError("Task executor is shut down.")
+            pool = self.pools.get(backend)
+            if pool is None:
+                if backend == "process":
+                    pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task")
+                self.pools[backend] = pool
+            return pool
+
+    def _limit(self, task):
+        """Return the concurrency limit for a task, or None if unbounded."""
+        limit = task.max_concurrency
+        if limit is None and task.overlap != "parallel":
+            limit = 1
+        return limit
+
+    def submit(self, task, target, on_complete):
+        """Dispatch one run of a task according to its overlap policy.
+
+        ``target`` is either a command string or a callable. ``on_complete`` is
+        called with the task name and status once the run finishes. Returns
+        "started", "queued" or "skipped".
+
+        Overlap policies apply once a task reaches its concurrency limit:
+        "skip" drops the new run, "queue" defers it until a running copy
+        finishes, and "parallel" lifts the default limit of one so runs overlap
+        freely unless ``max_concurrency`` is set, after which it queues.
+        """
+        name = task.name
+        with self.lock:
+            if self.shutting_down:
+                return "skipped"
+            limit = self._limit(task)
+            if limit is not None and self.active[name] >= limit:
+                if task.overlap == "skip" or len(self.backlog[name]) >= self.max_queued:
+                    return "skipped"
+                self.backlog[name].append((task, target, on_complete))
+                return "queued"
+            self.active[name] += 1
+        self._start(task, target, on_complete)
+        return "started"
+
+    def _start(self, task, target, on_complete):
+        """Submit a run to its pool. Must be called without holding the lock."""
+        try:
+            pool = self._pool(task.backend or self.backend)
+            if callable(target):
+                future = pool.submit(run_action, target)
+            else:
+                future = pool.submit(run_command, target)
+        except RuntimeError:
+            # The pool was shut down underneath us; give the slot back.
+            with self.lock:
+                self.active[task.name] -= 1
+                if not self.active[task.name]:
+                    del self.active[task.name]
+            return
+        future.add_done_callback(lambda f: self._finished(task, f, on_complete))
+
+    def _finished(self, task, future, on_complete):
+        """Record a finished run and start the next deferred one, if any."""
+        name = task.name
+        try:
+            status = future.result()
+        except Exception as e:
+            status = f"error ({e})"
+        deferred = None
+        with self.lock:
+            backlog = self.backlog.get(name)
+            if backlog and not self.shutting_down:
+                deferred = backlog.popleft()  # Hand our slot straight to the next queued run
+            else:
+                self.active[name] -= 1
+                if not self.active[name]:
+                    del self.active[name]
+            if backlog is not None and not backlog:
+                del self.backlog[name]
+        on_complete(name, status)
+        if deferred is not None:
+            self._start(*deferred)
+
+    def running_count(self, task_name):
+        """Return how many runs of a task are in flight."""
+        with self.lock:
+            return self.active.get(task_name, 0)
+
+    def shutdown(self, wait=True):
+        """Drop deferred runs and shut down the worker pools."""
+        with self.lock:
+            self.shutting_down = True
+            self.backlog.clear()
+            pools = list(self.pools.values())
+            self.pools = {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
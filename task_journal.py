@@ -0,0 +1,295 @@
+import os
+import struct
+import zlib
+from datetime import time as dt_time
+from system_log import get_logger
+
+
+log = get_logger("TaskJournal")
+
+# Journal operations
+OP_ADD = 1     # Payload: full task record
+OP_REMOVE = 2  # Payload: {"name"}
+OP_RUN = 3     # Payload: {"name", "next_run"} for periodic tasks, {"name"} for one-shot tasks
+OP_PAUSE = 4   # Payload: {"name"}
+OP_RESUME = 5  # Payload: {"name"}, plus {"next_run"} if the task is periodic
+
+SNAPSHOT_MAGIC = b"TSNP"
+JOURNAL_MAGIC = b"TJRN"
+FILE_HEADER = struct.Struct("<4sQ")    # Magic, generation
+RECORD_HEADER = struct.Struct("<IIB")  # Payload length, CRC32 of op + payload, op
+
+
+def encode_fields(fields):
+    """Encode a flat dict of task fields into a compact tagged binary form.
+
+    Each field is ``<key length:u8><key><type:u8><value>`` where the type is one
+    of s(tr), d(ouble), q (int64), t(ime of day, seconds as u32), ? (bool) or
+    n(one). ``datetime.time`` round-trips, unlike with JSON.
+    """
+    parts = []
+    for key, value in fields.items():
+        key_bytes = key.encode("utf-8")
+        parts.append(struct.pack("<B", len(key_bytes)))
+        parts.append(key_bytes)
+        if value is None:
+            parts.append(b"n")
+        elif isinstance(value, bool):
+            parts.append(b"?" + struct.pack("<?", value))
+        elif isinstance(value, int):
+            parts.append(b"q" + struct.pack("<q", value))
+        elif isinstance(value, float):
+            parts.append(b"d" + struct.pack("<d", value))
+        elif isinstance(value, dt_time):
+            seconds = value.hour * 3600 + value.minute * 60 + value.second
+            parts.append(b"t" + struct.pack("<I", seconds))
+        else:
+            value_bytes = str(value).encode("utf-8")
+            parts.append(b"s" + struct.pack("<I", len(value_bytes)) + value_bytes)
+    return b"".join(parts)
+
+
+def decode_fields(data):
+    """Decode bytes produced by ``encode_fields`` back into a dict."""
+    fields = {}
+    offset = 0
+    while offset < len(data):
+        key_length = data[offset]
+        offset += 1
+        key = data[offset:offset + key_length].decode("utf-8")
+        offset += key_length
+        kind = data[offset:offset + 1]
+        offset += 1
+        if kind == b"n":
+            value = None
+        elif kind == b"?":
+            value = struct.unpack_from("<?", data, offset)[0]
+            offset += 1
+        elif kind == b"q":
+            value = struct.unpack_from("<q", data, offset)[0]
+            offset += 8
+        elif kind == b"d":
+            value = struct.unpack_from("<d", data, offset)[0]
+            offset += 8
+        elif kind == b"t":
+            seconds = struct.unpack_from("<I", data, offset)[0]
+            offset += 4
+            value = dt_time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+        elif kind == b"s":
+            length = struct.unpack_from("<I", data, offset)[0]
+            offset += 4
+            value = data[offset:offset + length].decode("utf-8")
+            offset += length
+        else:
+            raise ValueError(f"Unknown field type {kind!r}.")
+        fields[key] = value
+    return fields
+
+
+def encode_record(op, fields):
+    """Frame one journal or snapshot record."""
+    payload = encode_fields(fields)
+    crc = zlib.crc32(bytes([op]) + payload)
+    return RECORD_HEADER.pack(len(payload), crc, op) + payload
+
+
+def iter_records(data, offset):
+    """Yield ``(op, fields, end_offset)`` for each intact record in ``data``.
+
+    Stops quietly at the first truncated or corrupt record, which is what a
+    crash in the middle of an append leaves behind.
+    """
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc, op = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(bytes([op]) + payload) != crc:
+            return
+        try:
+            fields = decode_fields(payload)
+        except (ValueError, UnicodeDecodeError, struct.error):
+            return
+        offset = start + length
+        yield op, fields, offset
+
+
+def _fsync_directory(path):
+    """Persist a rename by syncing the containing directory, where supported."""
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class TaskJournal:
+    def __init__(self, snapshot_path, journal_path, compact_every=10000, sync=False):
+        """Initialize the journal.
+
+        State lives in a snapshot plus an append-only journal of events since
+        that snapshot. Both files carry a generation number: the journal is only
+        replayed if its generation is exactly one past the snapshot's, so a
+        crash between writing a new snapshot and starting a new journal can
+        never apply the same events twice. ``compact_every`` is the least
+        number of journal records after which ``needs_compaction`` turns true, and
+        ``sync`` fsyncs every append instead of only flushing it to the OS.
+        """
+        self.snapshot_path = os.path.abspath(snapshot_path)
+        self.journal_path = os.path.abspath(journal_path)
+        self.compact_every = compact_every
+        self.sync = sync
+        self.file = None          # Open journal file, once opened for appending
+        self.generation = 0       # Generation of the current snapshot
+        self.record_count = 0     # Records appended since the last snapshot
+
+    def exists(self):
+        """Return True if a snapshot or journal has been written before."""
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    def load(self):
+        """Load the snapshot, replay the journal tail and open it for appending.
+
+        Returns the list of task records in insertion order.
+        """
+        self.close()
+        tasks = {}  # name -> list of task records, in insertion order
+        self.generation = 0
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                data = file.read()
+            if len(data) < FILE_HEADER.size or data[:4] != SNAPSHOT_MAGIC:
+                raise ValueError(f"'{self.snapshot_path}' is not a task snapshot.")
+            magic, generation = FILE_HEADER.unpack_from(data, 0)
+            self.generation = generation
+            for op, fields, _ in iter_records(data, FILE_HEADER.size):
+                tasks.setdefault(fields["name"], []).append(fields)
+        except FileNotFoundError:
+            pass
+
+        self.record_count = 0
+        good_offset = None
+        try:
+            with open(self.journal_path, "rb") as file:
+                data = file.read()
+            if len(data) >= FILE_HEADER.size:
+                magic, generation = FILE_HEADER.unpack_from(data, 0)
+                if magic == JOURNAL_MAGIC and generation == self.generation + 1:
+                    good_offset = FILE_HEADER.size
+                    for op, fields, end in iter_records(data, FILE_HEADER.size):
+                        self._apply(tasks, op, fields)
+                        self.record_count += 1
+                        good_offset = end
+                    if good_offset < len(data):
+                        log.warning("Discarded %d bytes of incomplete journal tail.", len(data) - good_offset)
+        except FileNotFoundError:
+            pass
+
+        if good_offset is None:
+            self._start_journal()
+        else:
+            # Keep appending to the valid prefix, dropping any torn tail
+            self.file = open(self.journal_path, "r+b")
+            self.file.truncate(good_offset)
+            self.file.seek(good_offset)
+        return [task for records in tasks.values() for task in records]
+
+    def _apply(self, tasks, op, fields):
+        """Apply one journal event to the replay state."""
+        name = fields["name"]
+        if op == OP_ADD:
+            tasks.setdefault(name, []).append(fields)
+        elif op == OP_REMOVE:
+            tasks.pop(name, None)
+        elif op == OP_RUN:
+            records = tasks.get(name, [])
+            if "next_run" in fields:
+                for task in records:
+                    if "next_run" in task:
+                        task["next_run"] = fields["next_run"]
+            else:
+                # One-shot scheduled tasks are consumed by their run
+                remaining = [task for task in records if "next_run" in task]
+                if remaining:
+                    tasks[name] = remaining
+                else:
+                    tasks.pop(name, None)
+        elif op == OP_PAUSE:
+            for task in tasks.get(name, []):
+                task["paused"] = True
+        elif op == OP_RESUME:
+            for task in tasks.get(name, []):
+                task.pop("paused", None)
+                if "next_run" in fields and "next_run" in task:
+                    task["next_run"] = fields["next_run"]
+
+    def is_open(self):
+        """Return True once the journal has been loaded or started."""
+        return self.file is not None
+
+    def append(self, op, fields):
+        """Append one event to the journal."""
+        if self.file is None:
+            raise ValueError("Journal is not open; call load() first.")
+        self.file.write(encode_record(op, fields))
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.record_count += 1
+
+    def append_many(self, op, records):
+        """Append one event per record with a single write, as for a bulk import."""
+        if self.file is None:
+            raise ValueError("Journal is not open; call load() first.")
+        self.file.write(b"".join(encode_record(op, fields) for fields in records))
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+        self.record_count += len(records)
+
+    def needs_compaction(self, snapshot_records=0):
+        """Return True once the journal has grown past ``compact_every`` records, and past the snapshot's size.
+
+        Waiting until the journal is as long as the snapshot it would replace
+        keeps the cost of compaction O(1) per appended record, however many
+        tasks there are.
+        """
+        return self.record_count >= max(self.compact_every, snapshot_records)
+
+    def write_snapshot(self, tasks):
+        """Atomically replace the snapshot with ``tasks`` and start an empty journal."""
+        generation = self.generation + 1
+        chunks = [FILE_HEADER.pack(SNAPSHOT_MAGIC, generation)]
+        chunks.extend(encode_record(OP_ADD, task) for task in tasks)
+        self._atomic_write(self.snapshot_path, b"".join(chunks))
+        self.generation = generation
+        self._start_journal()
+
+    def _start_journal(self):
+        """Atomically replace the journal with an empty one for the next generation."""
+        if self.file is not None:
+            self.file.close()
+        self._atomic_write(self.journal_path, FILE_HEADER.pack(JOURNAL_MAGIC, self.generation + 1))
+        self.file = open(self.journal_path, "r+b")
+        self.file.seek(0, os.SEEK_END)
+        self.record_count = 0
+
+    def _atomic_write(self, path, data):
+        """Write ``data`` to a temporary file, fsync it and rename it over ``path``."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        _fsync_directory(path)
+
+    def close(self):
+        """Close the journal file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
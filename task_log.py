@@ -0,0 +1,303 @@
+import bisect
+import json
+import os
+import re
+import time
+
+
+INDEX_VERSION = 2
+BUCKET_SECONDS = 60  # Time resolution of the offset index
+HEAD_BYTES = 64      # Leading bytes kept to tell a rotated segment from a new file that reused its inode
+INTERVAL_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600, 86400)
+
+# "[2024-12-10 16:11:31] Task 'backup' executed." (old) or "... executed with status: success" (current)
+LINE = re.compile(rb"\[(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)\] Task '(.*)' executed(?:\.| with status: (.*))\r?\n?$")
+
+OUTCOMES = ("success", "failure", "unknown")
+
+
+def parse_time(value, now=None):
+    """Parse a point in time: a duration ago ("90s", "15m", "2h", "7d") or a local "YYYY-MM-DD[THH:MM[:SS]]"."""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return (time.time() if now is None else now) - float(value[:-1]) * units[value[-1]]
+    for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid time '{value}'. Use a duration such as 1h or a date such as 2024-12-10T16:00.")
+
+
+def outcome(status):
+    """Classify a status: "success", "failure", or "unknown" for old lines that recorded none."""
+    if status is None:
+        return "unknown"
+    return "success" if status == "success" else "failure"
+
+
+class _Segment:
+    """Index of one log file: minute buckets to byte offsets, plus each task's line offsets."""
+
+    __slots__ = ("inode", "head", "size", "bucket_times", "bucket_offsets", "lag", "tasks", "totals")
+
+    def __init__(self, inode, head):
+        self.inode = inode
+        self.head = head
+        self.size = 0             # Bytes indexed so far; always the end of a complete line
+        self.bucket_times = []    # Start of each minute that begins a run of lines, ascending
+        self.bucket_offsets = []  # Offset of the first line in that minute
+        self.lag = 0              # Most seconds a line's minute trails the latest minute before it
+        self.tasks = {}           # Task name -> offsets of its lines, ascending
+        self.totals = {}          # Task name -> [successes, failures, unknown]
+
+    def to_json(self):
+        return {"inode": self.inode, "head": self.head.hex(), "size": self.size,
+                "buckets": [self.bucket_times, self.bucket_offsets], "lag": self.lag, "tasks": self.tasks, "totals": self.totals}
+
+    @classmethod
+    def from_json(cls, data):
+        segment = cls(data["inode"], bytes.fromhex(data["head"]))
+        segment.size = data["size"]
+        segment.bucket_times, segment.bucket_offsets = data["buckets"]
+        segment.lag = data["lag"]
+        segment.tasks = data["tasks"]
+        segment.totals = data["totals"]
+        return segment
+
+    def range(self, since, until):
+        """Return the byte range that holds every line from ``since`` to ``until`` (either may be None).
+
+        Writers can log a line after a later one, so the end is widened by
+        ``lag``; the lines past ``until`` are then filtered out by timestamp.
+        """
+        start, end = 0, self.size
+        if since is not None:
+            index = bisect.bisect_right(self.bucket_times, since) - 1
+            start = self.bucket_offsets[index] if index >= 0 else 0
+        if until is not None:
+            index = bisect.bisect_right(self.bucket_times, until + self.lag)
+            end = self.bucket_offsets[index] if index < len(self.bucket_offsets) else self.size
+        return start, end
+
+
+class TaskLog:
+    def __init__(self, path, index_path=None):
+        """Initialize queries over a task execution log and the files it was rotated to.
+
+        A sidecar index (``path.idx`` by default) maps each minute to the
+        byte offset of its first line and each task to the offsets of its
+        lines, so a query reads only the lines it needs. ``refresh`` indexes
+        only what was appended since the last one, and follows
+        TaskLogWriter's rotation to ``path.1`` .. ``path.N`` by inode.
+        Both the old "executed." and the current "executed with status:"
+        line formats are understood.
+        """
+        self.path = os.path.abspath(path)
+        self.index_path = index_path or self.path + ".idx"
+        self.segments = {}  # Inode -> _Segment
+        self.files = []     # (path, segment), oldest first, as of the last refresh
+        self.loaded = False
+        self.hours = {}     # "YYYY-MM-DD HH" -> epoch seconds, so timestamps skip strptime
+
+    # Parsing
+
+    def _timestamp(self, match):
+        hour = match.group(1, 2, 3, 4)
+        base = self.hours.get(hour)
+        if base is None:
+            year, month, day, hours = map(int, hour)
+            base = self.hours[hour] = time.mktime((year, month, day, hours, 0, 0, 0, 0, -1))
+        return base + int(match.group(5)) * 60 + int(match.group(6))
+
+    def parse(self, line):
+        """Return (timestamp, task, status) for a log line, or None if it is not a task line."""
+        match = LINE.match(line)
+        if match is None:
+            return None
+        status = match.group(8)
+        return (self._timestamp(match), match.group(7).decode("utf-8", "replace"),
+                None if status is None else status.decode("utf-8", "replace").rstrip())
+
+    # Index maintenance
+
+    def _paths(self):
+        """Return the log file and its rotated copies that exist, oldest first."""
+        paths = []
+        index = 1
+        while os.path.exists(f"{self.path}.{index}"):
+            paths.append(f"{self.path}.{index}")
+            index += 1
+        paths.reverse()
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        return paths
+
+    def refresh(self):
+        """Index whatever was appended or rotated since the last refresh. Returns the bytes read."""
+        if not self.loaded:
+            self.load()
+        read = 0
+        files = []
+        for path in self._paths():
+            try:
+                with open(path, "rb") as file:
+                    inode = os.fstat(file.fileno()).st_ino
+                    head = file.read(HEAD_BYTES)
+                    segment = self.segments.get(inode)
+                    size = os.fstat(file.fileno()).st_size
+                    if segment is None or not head.startswith(segment.head) or size < segment.size:
+                        segment = self.segments[inode] = _Segment(inode, head)  # New, or replaced under the same inode
+                    elif len(segment.head) < HEAD_BYTES:
+                        segment.head = head
+                    read += self._index(file, segment)
+            except OSError:
+                continue
+            files.append((path, segment))
+        live = {segment.inode for _, segment in files}
+        for inode in list(self.segments):
+            if inode not in live:
+                del self.segments[inode]  # Rotated out of existence
+        self.files = files
+        return read
+
+    def _index(self, file, segment):
+        """Index the complete lines after ``segment.size``."""
+        file.seek(segment.size)
+        offset = segment.size
+        last_bucket = segment.bucket_times[-1] if segment.bucket_times else None
+        for line in file:
+            if not line.endswith(b"\n"):
+                break  # A line still being written; pick it up next time
+            entry = self.parse(line)
+            if entry is not None:
+                timestamp, task, status = entry
+                bucket = int(timestamp // BUCKET_SECONDS * BUCKET_SECONDS)
+                if last_bucket is None or bucket > last_bucket:
+                    segment.bucket_times.append(bucket)
+                    segment.bucket_offsets.append(offset)
+                    last_bucket = bucket
+                elif bucket < last_bucket:
+                    segment.lag = max(segment.lag, last_bucket - bucket)  # Out of order, kept in the earlier run
+                segment.tasks.setdefault(task, []).append(offset)
+                totals = segment.totals.get(task)
+                if totals is None:
+                    totals = segment.totals[task] = [0, 0, 0]
+                totals[OUTCOMES.index(outcome(status))] += 1
+            offset += len(line)
+        read = offset - segment.size
+        segment.size = offset
+        return read
+
+    def save(self):
+        """Write the index next to the log, atomically."""
+        data = {"version": INDEX_VERSION, "bucket_seconds": BUCKET_SECONDS,
+                "segments": [segment.to_json() for segment in self.segments.values()]}
+        temporary = self.index_path + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temporary, self.index_path)
+
+    def load(self):
+        """Load a saved index. Returns False if there is none or it was built with other settings."""
+        self.loaded = True
+        try:
+            with open(self.index_path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != INDEX_VERSION or data.get("bucket_seconds") != BUCKET_SECONDS:
+            return False
+        self.segments = {}
+        for entry in data["segments"]:
+            segment = _Segment.from_json(entry)
+            self.segments[segment.inode] = segment
+        return True
+
+    # Queries
+
+    def _lines(self, path, segment, task, since, until):
+        """Yield the parsed lines of one segment in a time range, seeking rather than scanning where it can."""
+        start, end = segment.range(since, until)
+        with open(path, "rb") as file:
+            if task is not None:
+                offsets = segment.tasks.get(task, [])
+                offsets = offsets[bisect.bisect_left(offsets, start):bisect.bisect_left(offsets, end)]
+                lines = ((file.seek(offset), file.readline())[1] for offset in offsets)
+            else:
+                file.seek(start)
+                lines = _read_until(file, end - start)
+            for line in lines:
+                entry = self.parse(line)
+                if entry is None or (since is not None and entry[0] < since) or (until is not None and entry[0] > until):
+                    continue
+                yield entry
+
+    def runs(self, task=None, since=None, until=None):
+        """Yield (timestamp, task, status) for each run, oldest first; ``since``/``until`` are epoch seconds."""
+        for path, segment in list(self.files):
+            if task is not None and task not in segment.tasks:
+                continue
+            if since is not None and segment.bucket_times and segment.bucket_times[-1] + BUCKET_SECONDS <= since:
+                continue
+            if until is not None and segment.bucket_times and segment.bucket_times[0] - segment.lag > until:
+                continue
+            try:
+                yield from self._lines(path, segment, task, since, until)
+            except FileNotFoundError:
+                continue  # Rotated away since the last refresh
+
+    def counts(self, task=None, since=None, until=None):
+        """Return {"success", "failure", "unknown"} run counts, from the index alone when no range is given."""
+        counts = dict.fromkeys(OUTCOMES, 0)
+        if since is None and until is None:
+            for _, segment in self.files:
+                for name, totals in segment.totals.items():
+                    if task is None or name == task:
+                        for key, value in zip(OUTCOMES, totals):
+                            counts[key] += value
+            return counts
+        for _, _, status in self.runs(task, since, until):
+            counts[outcome(status)] += 1
+        return counts
+
+    def tasks(self, since=None, until=None):
+        """Return {task: runs}, from the index alone when no range is given."""
+        totals = {}
+        if since is not None or until is not None:
+            for _, task, _ in self.runs(since=since, until=until):
+                totals[task] = totals.get(task, 0) + 1
+            return totals
+        for _, segment in self.files:
+            for name, values in segment.totals.items():
+                totals[name] = totals.get(name, 0) + sum(values)
+        return totals
+
+    def intervals(self, task, since=None, until=None, buckets=INTERVAL_BUCKETS):
+        """Return a histogram of the seconds between consecutive runs of a task.
+
+        The result has "count", "sum", "min", "max" and "counts", where
+        ``counts[i]`` is the number of gaps up to ``buckets[i]`` seconds and
+        the last entry counts longer ones.
+        """
+        counts = [0] * (len(buckets) + 1)
+        total, smallest, largest, previous = 0.0, None, None, None
+        for timestamp, _, _ in self.runs(task, since, until):
+            if previous is not None:
+                gap = timestamp - previous
+                counts[bisect.bisect_left(buckets, gap)] += 1
+                total += gap
+                smallest = gap if smallest is None else min(smallest, gap)
+                largest = gap if largest is None else max(largest, gap)
+            previous = timestamp
+        return {"count": sum(counts), "sum": total, "min": smallest, "max": largest, "counts": counts}
+
+
+def _read_until(file, length):
+    """Yield lines from the current position until ``length`` bytes have been read."""
+    remaining = length
+    for line in file:
+        if remaining <= 0:
+            return
+        remaining -= len(line)
+        yield line
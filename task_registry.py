@@ -0,0 +1,96 @@
+from datetime import datetime
+
+
+# Fields of a task record in the order they are journaled; ``entry`` is runtime-only
+FIELDS = ("id", "name", "interval", "next_run", "scheduled_time", "command", "backend", "max_concurrency",
+          "overlap", "memory", "paused")
+
+
+class Task:
+    """A periodic or scheduled task. ``__slots__`` keeps a million of them affordable."""
+
+    __slots__ = FIELDS + ("entry",)
+
+    def __init__(self, name, interval=None, next_run=None, scheduled_time=None, command=None, backend=None,
+                 max_concurrency=None, overlap="skip", memory=None, paused=False, task_id=None):
+        self.id = task_id                     # Assigned by the registry
+        self.name = name
+        self.interval = interval              # Seconds between runs, for periodic tasks
+        self.next_run = next_run              # Epoch seconds of the next run, for periodic tasks
+        self.scheduled_time = scheduled_time  # Time of day, for one-shot scheduled tasks
+        self.command = command
+        self.backend = backend                # Executor backend, or None for the default
+        self.max_concurrency = max_concurrency
+        self.overlap = overlap
+        self.memory = memory                  # MB reserved, for periodic tasks
+        self.paused = paused
+        self.entry = None                     # Live run-queue entry, or None when not queued
+
+    @property
+    def periodic(self):
+        return self.interval is not None
+
+    @classmethod
+    def from_fields(cls, fields):
+        """Build a task from a journal, snapshot or legacy JSON record."""
+        scheduled_time = fields.get("scheduled_time")
+        if isinstance(scheduled_time, str):
+            scheduled_time = datetime.strptime(scheduled_time[:5], "%H:%M").time()
+        return cls(fields["name"], fields.get("interval"), fields.get("next_run"), scheduled_time,
+                   fields.get("command"), fields.get("backend"), fields.get("max_concurrency"),
+                   fields.get("overlap", "skip"), fields.get("memory"), bool(fields.get("paused")), fields.get("id"))
+
+    def to_fields(self):
+        """Return the task as a flat dict, leaving out unset fields and defaults to keep records small."""
+        fields = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not None and value is not False and not (field == "overlap" and value == "skip"):
+                fields[field] = value
+        return fields
+
+    def __repr__(self):
+        when = f"interval={self.interval}" if self.periodic else f"scheduled_time={self.scheduled_time}"
+        return f"Task(id={self.id}, name={self.name!r}, {when}{', paused' if self.paused else ''})"
+
+
+class TaskRegistry:
+    def __init__(self):
+        """Initialize a task registry indexed by ID and by unique name, in insertion order."""
+        self.tasks = {}  # ID -> Task
+        self.ids = {}    # Name -> ID
+        self.next_id = 1
+
+    def add(self, task):
+        """Register a task, assigning it an ID if it has none. Returns it, or None if the name is taken."""
+        if task.name in self.ids:
+            return None
+        if task.id is None or task.id in self.tasks:
+            task.id = self.next_id
+        self.next_id = max(self.next_id, task.id + 1)
+        self.tasks[task.id] = task
+        self.ids[task.name] = task.id
+        return task
+
+    def remove(self, name):
+        """Remove a task by name. Returns it, or None if there is no such task."""
+        task_id = self.ids.pop(name, None)
+        if task_id is None:
+            return None
+        return self.tasks.pop(task_id)
+
+    def get(self, name):
+        task_id = self.ids.get(name)
+        return self.tasks[task_id] if task_id is not None else None
+
+    def by_id(self, task_id):
+        return self.tasks.get(task_id)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(list(self.tasks.values()))
+
+    def __len__(self):
+        return len(self.tasks)
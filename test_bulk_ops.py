@@ -0,0 +1,77 @@
+import hashlib
+import os
+import tempfile
+import bulk_ops
+from bulk_ops import BulkFileOperations
+from file_system import FileSystem
+from vfs import MemoryBackend
+
+# Run in a scratch directory so bulk operations do not touch the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+for backend in (None, MemoryBackend()):
+    file_system = FileSystem(backend)
+    bulk = BulkFileOperations(file_system, max_workers=4)
+    file_system.make_directory("src")
+    file_system.make_directory("src/sub")
+    for index in range(20):
+        file_system.write_file(f"src/file{index}.txt", f"{index}" * 10000)
+    file_system.write_file("src/sub/deep.log", "deep")
+
+    # Test glob expansion, including "**" across directories
+    assert len(bulk.expand("src/*.txt")) == 20
+    assert [path for path, _, _ in bulk.expand("**/*.log")] == [file_system._path("src/sub/deep.log")]
+
+    # Test copying trees with progress, then checksums of the copies
+    operation = bulk.copy("src/*", "dst")
+    assert operation.wait(10) and not operation.errors
+    progress = operation.progress()
+    assert progress["files_done"] == progress["total_files"] == 21
+    assert progress["bytes_done"] == progress["total_bytes"]
+    operation = bulk.checksum("dst/**")
+    assert operation.wait(10)
+    expected = hashlib.sha256(b"7" * 10000).hexdigest()
+    assert operation.results[file_system._path("dst/file7.txt")] == expected
+    assert len(operation.results) == 21
+
+    # Test moving and deleting by pattern
+    operation = bulk.move("dst/file1*.txt", "moved")
+    assert operation.wait(10) and operation.files_done == 11
+    operation = bulk.delete("*")
+    assert operation.wait(10) and not operation.errors
+    assert file_system.list_files() == []
+
+    # Test a new destination that the pattern would match is not copied or moved into itself
+    file_system.write_file("a.txt", "a")
+    file_system.make_directory("sub")
+    file_system.write_file("sub/b.txt", "b")
+    operation = bulk.copy("*", "backup")
+    assert operation.wait(10) and not operation.errors and operation.files_done == 2
+    assert file_system.list_files("backup") == ["a.txt", "sub"]
+    assert file_system.list_files("backup/sub") == ["b.txt"]
+    operation = bulk.copy("*", "backup")  # Also when the destination already exists
+    assert operation.wait(10) and not operation.errors and file_system.list_files("backup") == ["a.txt", "sub"]
+    operation = bulk.move("*", "archive")
+    assert operation.wait(10) and not operation.errors and operation.files_done == 3
+    assert file_system.list_files() == ["archive"]
+    assert file_system.list_files("archive") == ["a.txt", "backup", "sub"]
+    operation = bulk.delete("*")
+    assert operation.wait(10) and not operation.errors
+
+# Test cancelling: small chunks make the copy slow enough to stop part-way
+bulk_ops.CHUNK_SIZE = 16
+file_system = FileSystem()
+bulk = BulkFileOperations(file_system, max_workers=2)
+file_system.write_file("big.bin", os.urandom(1_000_000), binary=True)
+for index in range(10):
+    file_system.write_file(f"big{index}.bin", os.urandom(100_000), binary=True)
+operation = bulk.copy("big*.bin", "copies")
+operation.cancel()
+assert operation.wait(10)
+assert operation.progress()["state"] == "cancelled"
+assert operation.files_done < 11 and not operation.errors
+assert len(file_system.list_files("copies")) == operation.files_done  # No partial copies left behind
+
+os.chdir(original_directory)
+print("BulkFileOperations test completed successfully!")
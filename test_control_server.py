@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+from control_client import ControlClient
+from control_server import ControlServer
+from file_system import FileSystem
+from kernel.kernel import Kernel
+from process_manager import ProcessManager
+
+# Run in a scratch directory so the socket and files stay out of the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+process_manager = ProcessManager()
+server = ControlServer(Kernel(cpus=1), FileSystem(), process_manager)
+assert server.start()
+assert os.stat("os.sock").st_mode & 0o077 == 0  # No access for other users
+
+# Test a command's printed and logged output comes back, and invalid commands are flagged
+with ControlClient() as client:
+    assert "Allocated 10MB for 'backup'" in client.call("add backup 60 10")
+    assert "Periodic Task: backup" in client.call("list")
+    assert client.request({"command": "bogus"})["ok"] is False
+    assert client.request({"nothing": 1})["error"]
+
+    # Test batches and pipelined requests are answered in order
+    outputs = client.batch(["create_file a.txt", "write_file a.txt hello", "read_file a.txt"])
+    assert "hello" in outputs[2]
+    outputs = client.pipeline([f"pause_task {name}" for name in ("backup", "missing")])
+    assert "Paused task 'backup'" in outputs[0] and "not found" in outputs[1]
+
+    # Test "exit" ends only this connection
+    client.call("exit")
+    try:
+        client.call("list")
+        raise AssertionError("The connection is closed after exit")
+    except (ConnectionError, OSError):
+        pass
+
+# Test plain text lines work, e.g. from nc
+raw = socket.socket(socket.AF_UNIX)
+raw.connect("os.sock")
+raw.sendall(b"resume_task backup\n{not json\n")
+reader = raw.makefile("rb")
+assert b"Resumed task 'backup'" in reader.readline()
+assert b"Invalid JSON" in reader.readline()
+raw.close()
+
+# Test concurrent clients each get only their own output, while the console gets none of it
+console = io.StringIO()
+results = {}
+
+
+def worker(index):
+    with ControlClient() as client:
+        results[index] = client.pipeline([f"write_file f{index}.txt client{index}", f"read_file f{index}.txt"] * 20)
+
+
+with contextlib.redirect_stdout(console):
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+for index, outputs in results.items():
+    assert all(f"client{index}" in output and "client" not in output.replace(f"client{index}", "")
+               for output in outputs[1::2])
+assert "Content of" not in console.getvalue()
+
+# Test each connection has its own current directory, apart from the console's
+server.file_system.make_directory("inner")
+with ControlClient() as first, ControlClient() as second:
+    first.call("change_directory inner")
+    first.call("create_file here.txt")
+    second.call("create_file here.txt")
+assert os.path.exists("inner/here.txt") and os.path.exists("here.txt")
+assert server.file_system.current_directory == os.getcwd()
+
+server.stop()
+assert not os.path.exists("os.sock")
+
+# Test the TCP listener only takes connections that present the token from its 0600 file
+tcp_server = ControlServer(Kernel(cpus=1), FileSystem(), process_manager, port=0)
+assert tcp_server.start()
+assert os.stat("os.token").st_mode & 0o777 == 0o600
+host, port = tcp_server.address
+with ControlClient(host=host, port=port) as client:
+    assert "backup" in client.call("list")
+for token in ("wrong", None):
+    try:
+        ControlClient(host=host, port=port, token=token, token_file="missing.token")
+        raise AssertionError("A connection without the token is refused")
+    except (PermissionError, FileNotFoundError):
+        pass
+raw = socket.create_connection((host, port))
+raw.sendall(b"list\n")
+reader = raw.makefile("rb")
+assert b"token is required" in reader.readline() and reader.readline() == b""
+raw.close()
+tcp_server.stop()
+assert not os.path.exists("os.token")
+
+process_manager.shutdown()
+os.chdir(original_directory)
+print("Control server test completed successfully!")
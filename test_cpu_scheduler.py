@@ -0,0 +1,60 @@
+from kernel.kernel import Kernel
+from kernel.pcb import ProcessTable
+from kernel.scheduler import POLICIES, make_policy, simulate, workload
+
+# Test the process table indexes by name and PID
+table = ProcessTable()
+first = table.create("init", burst_time=5)
+assert table.create("init") is None
+assert table.get("init") is first and table.by_pid(first.pid) is first
+assert table.terminate("init") is first and "init" not in table and len(table) == 0
+
+# Test each policy against textbook waiting times
+trace = [(0, 24, 0), (0, 3, 0), (0, 3, 0)]
+assert simulate(make_policy("fcfs"), trace)["avg_wait"] == 17
+assert simulate(make_policy("sjf"), trace)["avg_wait"] == 3
+assert abs(simulate(make_policy("rr", quantum=4), trace)["avg_wait"] - 17 / 3) < 1e-9
+assert simulate(make_policy("srtf"), [(0, 8, 0), (1, 4, 0), (2, 9, 0), (3, 5, 0)])["avg_wait"] == 6.5
+
+# Test MLFQ favours short jobs and CFS shares the CPU by nice weight
+result = simulate(make_policy("mlfq"), [(0, 100, 0), (10, 1, 0)])
+assert result["avg_response"] == 0 and result["avg_turnaround"] == (1 + 101) / 2
+result = simulate(make_policy("cfs"), [(0, 30, -5), (0, 30, 5)])
+assert result["avg_turnaround"] < 48 and result["context_switches"] == 4  # The nice -5 job finishes at 33
+
+# Test every policy completes a generated trace with the same amount of work
+for name in POLICIES:
+    result = simulate(make_policy(name), workload(2000, seed=1))
+    assert result["processes"] == 2000 and 0 < result["utilization"] <= 1
+
+# Test work stealing balances CPUs when arrivals all land on one of them
+trace = [(0, 10, 0, None)] * 8
+result = simulate("fcfs", trace, cpus=4, stealing=False, placement="round_robin")
+assert result["migrations"] == 0 and result["makespan"] == 20
+result = simulate("fcfs", [(0, 10, 0, 0b1)] + [(0, 10, 0, None)] * 7, cpus=4, placement="round_robin")
+assert result["makespan"] == 20 and all(core["completed"] == 2 for core in result["per_cpu"])
+
+# Test affinity: processes pinned to CPU 0 are never stolen by other CPUs
+result = simulate("rr", [(0, 10, 0, 0b1)] * 4, cpus=4)
+assert result["migrations"] == 0 and result["per_cpu"][0]["completed"] == 4 and result["makespan"] == 40
+result = simulate("cfs", workload(5000, cpus=4, pinned_fraction=0.2, seed=2), cpus=4)
+assert result["processes"] == 5000 and result["migrations"] > 0
+assert all(0 < core["utilization"] <= 1 for core in result["per_cpu"])
+
+# Test the kernel simulates its own process table
+kernel = Kernel()
+kernel.manage_processes("create", "editor", burst_time=3)
+kernel.manage_processes("create", "compiler", burst_time=24)
+kernel.manage_processes("create", "compiler", burst_time=1)
+assert kernel.simulate_scheduling("sjf")["avg_wait"] == 1.5
+kernel.set_affinity("editor", [0])
+assert kernel.simulate_scheduling("fcfs", cpus=2)["avg_wait"] == 0
+
+# Test a process created without a burst still runs, and an out-of-range priority is refused
+kernel = Kernel()
+kernel.manage_processes("create", "shell")
+kernel.manage_processes("create", "daemon", priority=25)
+assert "daemon" not in kernel.process_table
+assert kernel.simulate_scheduling("cfs")["processes"] == 1
+
+print("CPU scheduler test completed successfully!")
@@ -0,0 +1,66 @@
+import io
+import os
+import tempfile
+import time
+import file_system as file_system_module
+from file_system import FileSystem
+
+# Run in a scratch directory so listings do not touch the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Initialize the file system with listing caching
+file_system = FileSystem(cache_listings=True)
+for name, content in (("b.txt", "bb"), ("a.txt", "aaaa"), ("c.log", "c")):
+    file_system.write_file(name, content)
+file_system.make_directory("docs")
+
+# Test sorting, filtering and paging
+assert file_system.list_files() == ["a.txt", "b.txt", "c.log", "docs"]
+assert file_system.list_files(sort="size", reverse=True, kind="file") == ["a.txt", "b.txt", "c.log"]
+assert file_system.list_files(pattern="*.txt") == ["a.txt", "b.txt"]
+assert file_system.list_files(offset=1, limit=2) == ["b.txt", "c.log"]
+assert file_system.list_files(kind="dir") == ["docs"]
+assert sorted(entry[0] for entry in file_system.iter_files()) == ["a.txt", "b.txt", "c.log", "docs"]
+
+# Test the cache: reused while unchanged, refreshed by new entries or invalidation
+cached = file_system.listing_cache[file_system.current_directory][1]
+file_system.list_files()
+assert file_system.listing_cache[file_system.current_directory][1] is cached
+time.sleep(0.01)
+with open("d.txt", "w") as file:  # Written behind the FileSystem's back
+    file.write("d")
+assert "d.txt" in file_system.list_files()
+with open("a.txt", "w") as file:  # Size change only; the directory mtime stays the same
+    file.write("a")
+file_system.invalidate("a.txt")
+assert ("a.txt", "file", 1) == next(entry[:3] for entry in file_system.iter_files(pattern="a.txt"))
+
+# Test appending, binary writes and streaming writes from an iterable of chunks
+file_system.write_file("lines.txt", (f"line {index}\n" for index in range(1000)))
+file_system.write_file("lines.txt", "last\n", append=True)
+file_system.write_file("blob.bin", bytes(range(256)), binary=True)
+file_system.write_file("blob.bin", b"\xff", append=True, binary=True)
+assert os.path.getsize("blob.bin") == 257
+
+
+def read(**options):
+    out = io.StringIO()
+    file_system.read_file(out=out, **options)
+    return out.getvalue().split("\n", 1)[1][:-1]  # Drop the header line and trailing newline
+
+
+# Test ranged, head and tail reads, through read() and through the memory map
+assert read(filename="lines.txt", head=2) == "line 0\nline 1\n"
+assert read(filename="lines.txt", tail=2) == "line 999\nlast\n"
+assert read(filename="lines.txt", offset=7, length=6) == "line 1"
+assert read(filename="lines.txt", head=5000).count("\n") == 1001
+assert list(file_system.iter_chunks("blob.bin", 250, 100)) == [bytes(range(250, 256)) + b"\xff"]
+file_system_module.MMAP_THRESHOLD = 1
+assert b"".join(file_system.iter_chunks("lines.txt", chunk_size=100)) == open("lines.txt", "rb").read()
+assert read(filename="lines.txt", offset=7, length=6) == "line 1"
+file_system.write_file("empty.txt", "")
+assert file_system.line_range("empty.txt", tail=3) == (0, 0)
+
+os.chdir(original_directory)
+print("FileSystem test completed successfully!")
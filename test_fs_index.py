@@ -0,0 +1,64 @@
+import os
+import tempfile
+from file_system import FileSystem
+from fs_index import FileIndex
+
+# Run in a scratch directory so the index does not touch the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Build a small tree
+file_system = FileSystem()
+file_system.make_directory("src")
+file_system.make_directory("src/kernel")
+file_system.write_file("src/kernel/sched.py", "def schedule():\n    return 'round robin'\n")
+file_system.write_file("src/main.py", "import kernel\nprint('boot')\n")
+file_system.write_file("notes.md", "Scheduler notes\nround robin is fair\n")
+file_system.write_file("blob.bin", b"\0\1\2 robin", binary=True)
+
+# Test name and path globs
+index = FileIndex(file_system)
+assert index.find("*.py") == ["src/kernel/sched.py", "src/main.py"]
+assert index.find("src/*.py") == ["src/main.py"]
+assert index.find("**/sched.py") == ["src/kernel/sched.py"]
+assert index.find("notes.md") == ["notes.md"]
+
+# Test keyword and regex search; binary files are never matched
+assert index.candidates("round robin") == ["notes.md", "src/kernel/sched.py"]
+assert list(index.grep("robin", "*.md")) == [("notes.md", 2, "round robin is fair")]
+assert [match[0] for match in index.grep("sched(ule|uler)")] == ["notes.md", "src/kernel/sched.py"]
+
+# Test plain words also match inside longer words, as the regex does
+file_system.write_file("src/thread.py", "foobar = scheduler_thread()\n")
+index.update_path("src/thread.py")
+assert index.candidates("foo") == ["src/thread.py"]
+assert list(index.grep("schedul", "*.py")) == [("src/kernel/sched.py", 1, "def schedule():"),
+                                              ("src/thread.py", 1, "foobar = scheduler_thread()")]
+assert list(index.grep("foo")) == list(index.grep("fo.bar"))
+assert index.candidates("ob") == ["notes.md", "src/kernel/sched.py", "src/thread.py"]  # Shorter than a trigram
+assert index.candidates("bar scheduler_th") == ["src/thread.py"]
+assert index.candidates("oobs") == []  # No indexed word has the trigram "obs"
+file_system.delete("src/thread.py")
+index.update_path("src/thread.py")
+assert "foobar" not in index.grams.get("oob", ())  # Words no file uses leave the trigram index
+assert index.covers("src/kernel") and not index.covers(os.path.dirname(os.getcwd()))
+
+# Test incremental updates from single changes and from a refresh
+file_system.write_file("notes.md", "nothing here\n")
+index.update_path("notes.md")
+assert index.candidates("robin") == ["src/kernel/sched.py"]
+file_system.delete("src/kernel")
+file_system.write_file("extra.txt", "round robin again")
+assert index.refresh() == 2
+assert index.find("*.py") == ["src/main.py"]
+assert index.candidates("robin") == ["extra.txt"]
+
+# Test the saved index reloads and only re-reads what changed
+index.save()
+reloaded = FileIndex(file_system)
+assert reloaded.load() and reloaded.stats()["files"] == index.stats()["files"]
+assert reloaded.refresh() == 0
+assert reloaded.find("extra.txt") == ["extra.txt"]
+
+os.chdir(original_directory)
+print("FileIndex test completed successfully!")
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import time
+from fs_watcher import FileSystemWatcher
+from interrupt_handler import InterruptHandler
+
+
+class Directory:
+    """Stands in for FileSystem: the watcher only reads current_directory."""
+
+    def __init__(self, path):
+        self.current_directory = path
+
+
+def wait_for(events, expected, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(item in events for item in expected):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# Test both backends: raise real changes as interrupts, merging bursts per path
+for backend in ("inotify", "polling"):
+    root = tempfile.mkdtemp()
+    interrupt_handler = InterruptHandler(workers=1)
+    events = []
+    for interrupt_type in ("file_created", "file_modified", "file_deleted"):
+        interrupt_handler.register_interrupt(interrupt_type,
+                                             lambda path, kind=interrupt_type: events.append((kind, path)))
+    interrupt_handler.start()
+    watcher = FileSystemWatcher(Directory(root), interrupt_handler, debounce=0.2, backend=backend,
+                                poll_interval=0.1)
+    watcher.start()
+    time.sleep(0.3)
+
+    created = os.path.join(root, "created.txt")
+    for index in range(5):
+        with open(created, "a") as file:
+            file.write(f"line {index}\n")
+    # Files created in a new subdirectory are watched too
+    os.makedirs(os.path.join(root, "sub"))
+    nested = os.path.join(root, "sub", "nested.txt")
+    with open(nested, "w") as file:
+        file.write("nested")
+    # Ignored files never raise interrupts
+    with open(os.path.join(root, "task_log.txt"), "w") as file:
+        file.write("log")
+    assert wait_for(events, [("file_created", created), ("file_created", nested)]), events
+    assert events.count(("file_created", created)) == 1, events
+
+    with open(created, "a") as file:
+        file.write("more\n")
+    assert wait_for(events, [("file_modified", created)]), events
+    os.remove(created)
+    assert wait_for(events, [("file_deleted", created)]), events
+    assert not any(path.endswith("task_log.txt") for _, path in events)
+    print(f"{backend}: {len(events)} events")
+
+    watcher.stop()
+    interrupt_handler.stop()
+
+print("FileSystemWatcher test completed successfully!")
@@ -0,0 +1,56 @@
+import threading
+import time
+from interrupt_handler import InterruptHandler
+
+# Initialize the interrupt handler with a single dispatcher so ordering is deterministic
+interrupt_handler = InterruptHandler(workers=1)
+handled = []
+done = threading.Event()
+
+interrupt_handler.register_interrupt("low", lambda value: handled.append(("low", value)), priority=9)
+interrupt_handler.register_interrupt("high", lambda value: handled.append(("high", value)), priority=1)
+# A handler that raises another interrupt must not deadlock
+interrupt_handler.register_interrupt("chain", lambda: interrupt_handler.trigger_interrupt("done"))
+interrupt_handler.register_interrupt("done", done.set)
+
+# Test priority order: queued before the dispatcher starts, higher priority runs first
+interrupt_handler.trigger_interrupt("low", 1)
+interrupt_handler.trigger_interrupt("high", 2)
+
+# Test masking holds interrupts until unmasked
+interrupt_handler.mask_interrupt("low")
+interrupt_handler.trigger_interrupt("low", 3)
+interrupt_handler.start()
+interrupt_handler.trigger_interrupt("chain")
+assert done.wait(2)
+assert handled == [("high", 2), ("low", 1)]
+interrupt_handler.unmask_interrupt("low")
+time.sleep(0.1)
+assert handled[-1] == ("low", 3)
+
+interrupt_handler.show_stats()
+assert interrupt_handler.get_stats()["interrupts"]["low"]["count"] == 2
+# Test chained handlers, coalescing and rate limiting
+batches = []
+interrupt_handler.register_interrupt("file_created", lambda events: batches.append(events))
+interrupt_handler.register_interrupt("file_created", lambda events: batches.append(len(events)))
+interrupt_handler.set_coalescing("file_created", 0.1)
+interrupt_handler.set_rate_limit("file_created", 1, burst=3)
+for index in range(5):
+    interrupt_handler.trigger_interrupt("file_created", f"file{index}.txt")
+time.sleep(0.3)
+assert batches == [[("file0.txt",), ("file1.txt",), ("file2.txt",)], 3]
+assert interrupt_handler.get_stats()["interrupts"]["file_created"]["dropped"] == 2
+
+# Test a sub-second named timer, and that stop() does not wait for the 5 second timer
+ticks = []
+interrupt_handler.register_interrupt("heartbeat", lambda: ticks.append(time.monotonic()))
+interrupt_handler.add_timer("heartbeat", 0.05)
+time.sleep(0.32)
+assert 5 <= len(ticks) <= 7
+assert interrupt_handler.get_timer_stats()["heartbeat"]["max_jitter"] < 0.05
+
+stop_started = time.monotonic()
+interrupt_handler.stop()
+assert time.monotonic() - stop_started < 1
+print("InterruptHandler test completed successfully!")
@@ -0,0 +1,66 @@
+import random
+from memory_manager import FreeListAllocator, MemoryManager
+
+# Test first-fit allocation and coalescing
+memory_manager = MemoryManager(100)
+memory_manager.allocate_memory("Task1", 30)
+memory_manager.allocate_memory("Task2", 30)
+memory_manager.allocate_memory("Task3", 30)
+memory_manager.deallocate_memory("Task1")
+memory_manager.deallocate_memory("Task2")
+assert memory_manager.allocate_memory("Task4", 50)
+assert memory_manager.blocks["Task4"] == (0, 50)
+memory_manager.show_memory_usage()
+
+# Test that a duplicate task name does not leak the earlier allocation
+assert not memory_manager.allocate_memory("Task4", 10)
+assert memory_manager.used_memory == 80
+
+# Test best-fit picks the smallest hole that fits
+memory_manager = MemoryManager(100, "best_fit")
+for name, size in [("A", 40), ("B", 10), ("C", 20), ("D", 10)]:
+    memory_manager.allocate_memory(name, size)
+memory_manager.deallocate_memory("A")
+memory_manager.deallocate_memory("C")
+memory_manager.allocate_memory("E", 15)
+assert memory_manager.blocks["E"] == (50, 15)
+
+# Test random churn keeps free blocks accounted for and coalesced, for both free-list strategies
+for strategy in ("first_fit", "best_fit"):
+    allocator = FreeListAllocator(10000, strategy)
+    rng = random.Random(0)
+    live = []
+    for _ in range(2000):
+        if live and rng.random() < 0.45:
+            allocator.free(*live.pop(rng.randrange(len(live))))
+        else:
+            block = allocator.allocate(rng.randint(1, 50))
+            if block is not None:
+                live.append(block)
+    assert allocator.free_units == 10000 - sum(size for _, size in live)
+    assert all(start + size not in allocator.free_blocks for start, size in allocator.free_blocks.items())
+    for block in live:
+        allocator.free(*block)
+    assert allocator.free_blocks == {0: 10000} and allocator.largest_free_block() == 10000
+
+# Test buddy blocks round up and merge back together
+memory_manager = MemoryManager(128, "buddy")
+memory_manager.allocate_memory("Task1", 20)
+assert memory_manager.blocks["Task1"][1] == 32
+memory_manager.show_memory_usage()
+memory_manager.deallocate_memory("Task1")
+assert memory_manager.allocator.largest_free_block() == 128
+
+# Test overcommitting through virtual memory
+memory_manager = MemoryManager(4, swap_memory=4, page_policy="clock")
+assert memory_manager.allocate_memory("Task1", 3)
+assert memory_manager.allocate_memory("Task2", 3)  # More than physical memory
+assert not memory_manager.allocate_memory("Task3", 3)  # More than memory plus swap
+memory_manager.touch("Task1")
+memory_manager.touch("Task2")
+memory_manager.touch("Task1")
+stats = memory_manager.virtual_memory.stats()
+assert stats["faults"] > 6 and stats["swap_ins"] > 0 and stats["swap_outs"] > 0
+memory_manager.show_memory_usage()
+
+print("MemoryManager test completed successfully!")
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+from metrics import REGISTRY, MetricsRegistry, quantile
+from memory_manager import MemoryManager
+from file_system import FileSystem
+from interrupt_handler import InterruptHandler
+
+# Run in a scratch directory so the files created stay out of the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Test counters, gauges and labelled histograms
+registry = MetricsRegistry()
+registry.counter("jobs_total", "Jobs run.").inc(3)
+registry.gauge("queue_depth").set(7)
+latency = registry.histogram("op_seconds", "Op latency.", op="read")
+for value in (0.001, 0.002, 0.004, 0.1):
+    latency.observe(value)
+assert registry.counter("jobs_total") is registry.counter("jobs_total")
+assert registry.histogram("op_seconds", op="read") is latency
+try:
+    registry.gauge("jobs_total")
+    raise AssertionError("A name cannot be reused for another metric type")
+except ValueError:
+    pass
+snapshot = registry.snapshot()
+assert snapshot["jobs_total"] == 3 and snapshot["queue_depth"] == 7
+assert snapshot['op_seconds{op="read"}']["count"] == 4
+assert 0.001 <= quantile(latency.buckets, latency.counts, 0.5) <= 0.004
+
+# Test deltas only report what moved, and the Prometheus export
+before = registry.snapshot()
+registry.counter("jobs_total").inc()
+registry.counter("idle_total").inc(0)
+changes = registry.delta(before, registry.snapshot())
+assert changes["jobs_total"] == 1 and "idle_total" not in changes and 'op_seconds{op="read"}' not in changes
+text = registry.prometheus()
+assert "# TYPE jobs_total counter\njobs_total 4" in text
+assert 'op_seconds_bucket{le="+Inf",op="read"} 4' in text and 'op_seconds_count{op="read"} 4' in text
+registry.write_prometheus("metrics.prom")
+with open("metrics.prom") as file:
+    assert file.read() == text
+
+# Test the subsystems feed the shared registry
+memory = MemoryManager(100)
+memory.register_metrics()
+failures = REGISTRY.counter("memory_allocation_failures_total", reason="no_memory").snapshot()
+memory.allocate_memory("big", 60)
+memory.allocate_memory("bigger", 60)
+assert REGISTRY.gauge("memory_utilization_ratio").snapshot() == 0.6
+assert REGISTRY.counter("memory_allocation_failures_total", reason="no_memory").snapshot() == failures + 1
+MemoryManager(100).allocate_memory("scratch", 90)  # An unregistered manager does not take the metrics over
+assert REGISTRY.gauge("memory_utilization_ratio").snapshot() == 0.6
+
+file_system = FileSystem()
+reads = REGISTRY.histogram("fs_operation_seconds", op="read_file").count
+file_system.write_file("notes.txt", "hello")
+file_system.read_file("notes.txt")
+assert REGISTRY.histogram("fs_operation_seconds", op="read_file").count == reads + 1
+
+handler = InterruptHandler()
+handler.register_interrupt("ping", lambda: None)
+handler.start()
+handler.trigger_interrupt("ping")
+deadline = time.time() + 5
+while REGISTRY.histogram("interrupt_dispatch_latency_seconds", type="ping").count < 1 and time.time() < deadline:
+    time.sleep(0.01)
+handler.stop()
+assert REGISTRY.histogram("interrupt_dispatch_latency_seconds", type="ping").count == 1
+
+os.chdir(original_directory)
+print("Metrics test completed successfully!")
@@ -0,0 +1,167 @@
+import os
+import tempfile
+import threading
+import time
+from log_writer import TaskLogWriter
+from process_manager import ProcessManager
+
+# Run in a scratch directory so the task log does not touch the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Initialize the process manager
+process_manager = ProcessManager(total_memory=128)
+
+# Test that only due tasks come off the run queue
+process_manager.add_task("soon", 1, 10)
+process_manager.add_task("later", 3600, 10)
+process_manager.schedule_task("past", "00:00")
+assert [task.name for task in process_manager._pop_due_tasks(time.time() + 2)] == ["past", "soon"]
+assert process_manager._next_timeout() > 3000
+
+# Test that a task must have a positive interval, so it cannot run in a tight loop
+process_manager.add_task("spin", 0, 10)
+process_manager.add_task("backwards", -5, 10)
+assert "spin" not in process_manager.tasks and "backwards" not in process_manager.tasks
+assert "spin" not in process_manager.memory_manager.allocated_memory
+
+# Test that removing a task cancels its heap entry
+process_manager.remove_task("later")
+assert process_manager._next_timeout() is None
+process_manager.list_tasks()
+
+# Test that the automatic scheduler wakes for a newly added task
+process_manager.start_auto()
+process_manager.add_task("quick", 0.2, 10)
+time.sleep(0.5)
+process_manager.stop_auto()
+process_manager.log_writer.flush()
+with open("task_log.txt") as log_file:
+    assert "quick" in log_file.read()
+
+# Test that a slow task body neither blocks the scheduler nor overlaps itself
+release = threading.Event()
+process_manager.add_task("slow", 0.05, 10, action=release.wait)
+time.sleep(0.05)
+process_manager.scheduler()
+time.sleep(0.05)
+process_manager.scheduler()  # Due again while the first run is still blocked
+assert process_manager.executor.running_count("slow") == 1
+release.set()
+
+# Test that a one-shot task drops its action once it has been handed to the executor
+fired = threading.Event()
+process_manager.schedule_task("once", "00:00", action=fired.set)
+process_manager.scheduler()
+assert fired.wait(2) and "once" not in process_manager.task_actions
+process_manager.shutdown()
+
+# Test that state survives a restart through the snapshot and journal
+restored_manager = ProcessManager(total_memory=128)
+restored_manager.load_state()
+restored_manager.add_task("journaled", 60, 10)
+restored_manager.schedule_task("at_noon", "12:00")
+at_noon_id = restored_manager.tasks.get("at_noon").id
+restored_manager.save_state()
+restored_manager.remove_task("journaled")  # Only in the journal, not the snapshot
+records = restored_manager.journal.record_count
+assert restored_manager.remove_task("journaled") is False  # Unknown tasks are not journaled
+assert restored_manager.journal.record_count == records
+restored_manager.shutdown()
+reloaded_manager = ProcessManager(total_memory=128)
+reloaded_manager.load_state()
+assert [task.name for task in reloaded_manager.tasks] == ["at_noon"]
+assert str(reloaded_manager.tasks.get("at_noon").scheduled_time) == "12:00:00"
+assert reloaded_manager.tasks.by_id(at_noon_id).name == "at_noon"  # IDs survive a restart
+
+# Test that loading again releases the previous tasks' memory and actions
+reloaded_manager.add_task("again", 60, 10, action=lambda: None)
+reloaded_manager.load_state()
+assert reloaded_manager.memory_manager.used_memory == 10 and not reloaded_manager.task_actions
+assert reloaded_manager.remove_task("again")
+reloaded_manager.shutdown()
+
+# Test pause and resume take a task off the run queue and back without losing its phase
+paused_manager = ProcessManager(total_memory=128)
+paused_manager.load_state()
+paused_manager.add_task("nightly", 60, 10)
+nightly = paused_manager.tasks.get("nightly")
+assert paused_manager.pause_task("nightly") and nightly.entry is None
+nightly.next_run -= 150  # Missed two runs while paused
+assert paused_manager.resume_task("nightly") and not paused_manager.resume_task("nightly")
+assert nightly.entry is not None and nightly.next_run > time.time()
+assert not paused_manager.pause_task("missing")
+nightly.interval = 0  # As a hand-edited state file could have it; resuming must not divide by it
+assert paused_manager.pause_task("nightly")
+nightly.next_run -= 150
+assert paused_manager.resume_task("nightly") and nightly.next_run >= time.time() - 1
+nightly.interval = 60
+
+# Test task names are unique across periodic and scheduled tasks
+paused_manager.schedule_task("nightly", "03:00")
+paused_manager.add_task("at_noon", 60, 10)
+assert len(paused_manager.tasks) == 2 and "at_noon" not in paused_manager.memory_manager.allocated_memory
+paused_manager.pause_task("nightly")
+
+# Test tasks round-trip through each export format, and bulk import skips bad rows
+for filename in ("tasks.jsonl", "tasks.csv", "tasks.json"):
+    assert paused_manager.export_tasks(filename) == 2
+with open("tasks.jsonl", "a") as file:
+    file.write("not json\n")
+    file.write('{"name": "bad", "interval": -1}\n')
+for filename in ("tasks.jsonl", "tasks.csv", "tasks.json"):
+    imported_manager = ProcessManager(total_memory=128)
+    assert imported_manager.import_tasks(filename, batch_size=1) == 2
+    assert imported_manager.tasks.get("nightly").paused is True
+    assert imported_manager.memory_manager.allocated_memory["nightly"] == 10
+    assert str(imported_manager.tasks.get("at_noon").scheduled_time) == "12:00:00"
+    assert imported_manager.tasks.get("at_noon").entry is not None  # Only the scheduled task is queued
+    assert imported_manager.import_tasks(filename) == 0  # Both names are taken
+    imported_manager.shutdown()
+paused_manager.shutdown()
+
+with open("bulk.jsonl", "w") as file:
+    for index in range(2000):
+        file.write('{"name": "bulk%d", "interval": 5}\n' % index)
+bulk_manager = ProcessManager(total_memory=128)
+bulk_manager.load_state()
+assert bulk_manager.import_tasks("bulk.jsonl", batch_size=500) == 2000
+assert len(bulk_manager.run_queue) == 2000 + 1
+bulk_manager.shutdown()
+reloaded_manager = ProcessManager(total_memory=128)
+reloaded_manager.load_state()
+assert len(reloaded_manager.tasks) == 2002  # The bulk records were journaled
+
+# Test compaction waits until the journal is as long as the snapshot, however small compact_every is
+reloaded_manager.journal.compact_every = 10
+reloaded_manager.pause_task("bulk0")  # The replayed bulk records are due for compaction
+generation = reloaded_manager.journal.generation
+assert reloaded_manager.journal.record_count == 0
+for index in range(1, 100):
+    reloaded_manager.pause_task(f"bulk{index}")
+assert reloaded_manager.journal.generation == generation
+for index in range(1000):
+    reloaded_manager.resume_task(f"bulk{index % 100}")
+    reloaded_manager.pause_task(f"bulk{index % 100}")
+assert reloaded_manager.journal.generation == generation + 1 and reloaded_manager.journal.record_count == 97
+reloaded_manager.shutdown()
+
+# Test that a failed rotation does not kill the log writer, and the next batch reopens the file
+writer = TaskLogWriter("rotating.txt", flush_interval=0.01, max_bytes=10, backup_count=1)
+writer.write("first line\n")
+writer.flush()
+os.mkdir("rotating.txt.1")  # Renaming the log over a directory fails
+writer.write("second line\n")
+writer.flush()
+os.rmdir("rotating.txt.1")
+writer.write("third line\n")
+writer.flush()
+writer.close()
+assert writer.thread.is_alive() is False
+with open("rotating.txt") as log_file:
+    assert log_file.read() == "third line\n"
+with open("rotating.txt.1") as log_file:
+    assert log_file.read() == "first line\n"
+
+os.chdir(original_directory)
+print("ProcessManager test completed successfully!")
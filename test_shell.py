@@ -0,0 +1,110 @@
+import contextlib
+import io
+import os
+import signal
+import tempfile
+import threading
+import time
+import bulk_ops
+import system_log
+from file_system import FileSystem
+from kernel.kernel import Kernel
+from process_manager import ProcessManager
+from shell import Shell, split_commands
+
+# Run in a scratch directory so the files created stay out of the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Test command lines split on ";" and "&", and "&" marks background commands
+assert split_commands("list") == [(["list"], False)]
+assert split_commands("copy *.log logs & list; memory") == [(["copy", "*.log", "logs"], True), (["list"], False),
+                                                             (["memory"], False)]
+assert split_commands("write_file a.txt x;y ;") == [(["write_file", "a.txt", "x;y"], False)]
+assert split_commands('write_file a.txt "one; two" & list') == [(["write_file", "a.txt", "one; two"], True),
+                                                                 (["list"], False)]
+assert split_commands("write_file a.txt ';' don't") == [(["write_file", "a.txt", ";", "don't"], False)]
+
+process_manager = ProcessManager()
+shell = Shell(Kernel(cpus=1), FileSystem(), process_manager)
+
+# Test a script runs every command, reports invalid ones and stops at exit
+script = io.StringIO("# Comments are skipped\n"
+                     "create_file a.txt; write_file a.txt hello world\n"
+                     "add backup 60 10\n"
+                     "bogus\n"
+                     "exit\n"
+                     "create_file never.txt\n")
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    assert shell.run_script(script) == 5
+assert "Shell: Invalid command or arguments." in out.getvalue()
+assert os.path.exists("a.txt") and not os.path.exists("never.txt")
+assert process_manager.tasks.get("backup") is not None
+
+# Test a zero interval is refused rather than scheduling a task that runs nonstop
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    shell.run_script(io.StringIO("add spin 0 1\n"))
+    system_log.flush()
+assert "Invalid interval 0 for task 'spin'" in out.getvalue() and "spin" not in process_manager.tasks
+
+# Test a command that raises is reported and the session goes on
+shell.register_command("explode", lambda args: 1 / 0)
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    assert shell.run_script(io.StringIO("explode; create_file after.txt\n")) == 2
+assert "Command 'explode' failed: division by zero" in out.getvalue() and os.path.exists("after.txt")
+
+# Test Ctrl-C stops a foreground profile or bulk copy early and the script carries on
+def interrupt_after(seconds):
+    threading.Timer(seconds, os.kill, (os.getpid(), signal.SIGINT)).start()
+
+
+bulk_ops.CHUNK_SIZE = 16  # Slow enough to interrupt
+with open("big.bin", "wb") as file:
+    file.write(bytes(16_000_000))
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    started = time.monotonic()
+    interrupt_after(0.3)
+    assert shell.run_script(io.StringIO("profile 4\ncreate_file after_profile.txt\n")) == 2
+    assert time.monotonic() - started < 3
+    interrupt_after(0.2)
+    shell.run_script(io.StringIO("copy big.bin copies\ncreate_file after_copy.txt\n"))
+assert "Activity over 0." in out.getvalue() and "(cancelled)" in out.getvalue()
+assert os.path.exists("after_profile.txt") and os.path.exists("after_copy.txt")
+bulk_ops.CHUNK_SIZE = 1024 * 1024
+
+# Test a second Ctrl-C, for a command that does not stop, ends the session with KeyboardInterrupt
+shell.register_command("block", lambda args: time.sleep(2))
+with contextlib.redirect_stdout(io.StringIO()):
+    interrupt_after(0.2)
+    interrupt_after(0.4)
+    try:
+        shell.run_script(io.StringIO("block\n"))
+        raise AssertionError("A second Ctrl-C raises KeyboardInterrupt")
+    except KeyboardInterrupt:
+        pass
+
+# Test a slow command in the background does not hold up the commands after it
+release = threading.Event()
+shell.register_command("block", lambda args: release.wait(5))
+shell.register_command("release", lambda args: release.set())
+started = time.monotonic()
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    shell.run_script(io.StringIO("block &\nread_file a.txt\nrelease\nwait\njobs\n"))
+assert time.monotonic() - started < 2
+output = out.getvalue()
+assert output.index("hello world") < output.index("[1] block (done")
+assert "Shell: No background jobs." in output
+
+# Test moving one path in the background renames it, as in the foreground
+with contextlib.redirect_stdout(io.StringIO()):
+    shell.run_script(io.StringIO("create_file c.txt; move c.txt d.txt &\n"))
+assert os.path.isfile("d.txt") and not os.path.exists("c.txt")
+
+process_manager.shutdown()
+os.chdir(original_directory)
+print("Shell test completed successfully!")
@@ -0,0 +1,71 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import system_log
+from system_log import get_logger
+from memory_manager import MemoryManager
+
+# Run in a scratch directory so the files created stay out of the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+# Test the console format matches the old "Subsystem: message" output
+log = get_logger("Tester")
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    log.info("Added task '%s' with interval %s seconds.", "backup", 5)
+    log.warning("Low memory.")
+    log.debug("Not shown at the default level.")
+assert out.getvalue() == "Tester: Added task 'backup' with interval 5 seconds.\nTester: Warning: Low memory.\n"
+
+# Test messages are only formatted when their level is enabled
+class Expensive:
+    formatted = 0
+
+    def __str__(self):
+        Expensive.formatted += 1
+        return "expensive"
+
+system_log.set_level("warning")
+with contextlib.redirect_stdout(io.StringIO()):
+    log.info("Value: %s", Expensive())
+assert Expensive.formatted == 0
+system_log.set_level("info")
+try:
+    system_log.set_level("loud")
+    raise AssertionError("Unknown levels are rejected")
+except ValueError:
+    pass
+
+# Test queued logging writes structured JSON lines, including subsystem fields, once drained
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    system_log.configure(path="os.log")
+    memory_manager = MemoryManager(100)
+    memory_manager.allocate_memory("editor", 30)
+    memory_manager.allocate_memory("editor", 30)
+    system_log.flush()
+    assert "MemoryManager: Allocated 30MB for 'editor'." in out.getvalue()
+    system_log.shutdown()
+with open("os.log") as file:
+    entries = [json.loads(line) for line in file]
+allocated = [entry for entry in entries if entry["message"] == "Allocated 30MB for 'editor'."]
+assert allocated and allocated[0]["subsystem"] == "MemoryManager" and allocated[0]["level"] == "info"
+assert allocated[0]["task"] == "editor" and allocated[0]["size_mb"] == 30
+assert any(entry["level"] == "warning" and entry["task"] == "editor" for entry in entries)
+
+# Test quiet mode keeps warnings and errors only
+out = io.StringIO()
+with contextlib.redirect_stdout(out):
+    system_log.configure(quiet=True)
+    MemoryManager(100).allocate_memory("editor", 500)
+    log.info("Hidden.")
+    system_log.shutdown()
+assert out.getvalue() == "MemoryManager: Warning: Not enough memory to allocate for 'editor'.\n"
+assert system_log.get_level() == "warning"
+system_log.set_level("info")
+
+os.chdir(original_directory)
+print("System log test completed successfully!")
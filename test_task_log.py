@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+from task_log import TaskLog, parse_time
+
+# Run in a scratch directory so the files created stay out of the repo
+original_directory = os.getcwd()
+os.chdir(tempfile.mkdtemp())
+
+
+def line(moment, task, status=None):
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(moment))
+    if status is None:
+        return f"[{stamp}] Task '{task}' executed.\n"  # The old format
+    return f"[{stamp}] Task '{task}' executed with status: {status}\n"
+
+
+start = time.mktime((2024, 12, 10, 16, 0, 0, 0, 0, -1))
+with open("task_log.txt", "w") as file:
+    for minute in range(120):
+        file.write(line(start + minute * 60, "backup"))
+        file.write(line(start + minute * 60 + 30, "cleanup", "success" if minute % 4 else "failed (exit code 1)"))
+
+# Test both line formats are indexed, and counts come from the index
+log = TaskLog("task_log.txt")
+assert log.refresh() == os.path.getsize("task_log.txt")
+assert log.tasks() == {"backup": 120, "cleanup": 120}
+assert log.counts() == {"success": 90, "failure": 30, "unknown": 120}
+assert log.counts("cleanup") == {"success": 90, "failure": 30, "unknown": 0}
+
+# Test a time range seeks to its minute instead of reading from the start
+since, until = start + 100 * 60, start + 110 * 60
+runs = list(log.runs("backup", since, until))
+assert [moment for moment, _, _ in runs] == [start + minute * 60 for minute in range(100, 111)]
+assert log.files[0][1].range(since, until)[0] > 0
+assert log.counts("cleanup", since, until) == {"success": 7, "failure": 3, "unknown": 0}
+assert log.tasks(since, until) == {"backup": 11, "cleanup": 10}
+
+# Test the run-interval histogram
+histogram = log.intervals("backup")
+assert histogram["count"] == 119 and histogram["min"] == histogram["max"] == 60
+assert histogram["counts"][5] == 119  # The "<= 60s" bucket
+
+# Test refresh reads only appended complete lines, and a saved index is reused
+with open("task_log.txt", "a") as file:
+    file.write(line(start + 7200, "backup", "success"))
+    file.write("[2024-12-10 18:00:01] Task 'backup' exec")  # Still being written
+assert log.refresh() == len(line(start + 7200, "backup", "success"))
+assert log.counts("backup")["success"] == 1
+log.save()
+reloaded = TaskLog("task_log.txt")
+assert reloaded.refresh() == 0 and reloaded.counts() == log.counts()
+
+# Test rotated files are followed and queried oldest first
+os.replace("task_log.txt", "task_log.txt.1")
+with open("task_log.txt", "w") as file:
+    file.write(line(start + 7300, "backup", "success"))
+assert reloaded.refresh() == len(line(start + 7300, "backup", "success"))
+assert reloaded.tasks()["backup"] == 122
+assert [moment for moment, _, _ in reloaded.runs("backup", since=start + 7200)] == [start + 7200, start + 7300]
+
+# Test a line logged after a later one is still found by a range that ends before the later one
+with open("late_log.txt", "w") as file:
+    file.write(line(start, "backup", "success"))
+    file.write(line(start + 300, "cleanup", "success"))
+    file.write(line(start + 90, "report", "success"))  # Finished late, so written out of order
+    file.write(line(start + 400, "backup", "success"))
+late = TaskLog("late_log.txt")
+late.refresh()
+assert [task for _, task, _ in late.runs(until=start + 120)] == ["backup", "report"]
+assert list(late.runs("report", since=start + 60, until=start + 120)) == [(start + 90, "report", "success")]
+
+assert parse_time("2h", now=10000) == 10000 - 7200
+assert parse_time("2024-12-10T16:00") == start
+
+os.chdir(original_directory)
+print("Task log test completed successfully!")
@@ -0,0 +1,79 @@
+import io
+import os
+import tempfile
+import threading
+from file_system import FileSystem
+from vfs import MemoryBackend
+
+original_directory = os.getcwd()
+image_path = os.path.join(tempfile.mkdtemp(), "disk.img")
+
+# Initialize a file system on an in-memory backend with a tiny block cache, so blocks get written back
+file_system = FileSystem(MemoryBackend(image_path, block_size=64, cache_blocks=4))
+assert file_system.current_directory == "/"
+
+# Test directories, files and lookups without touching the host
+file_system.make_directory("docs")
+file_system.change_directory("docs")
+file_system.write_file("notes.txt", (f"note {index}\n" for index in range(100)))
+file_system.write_file("notes.txt", "end\n", append=True)
+file_system.write_file("blob.bin", bytes(range(200)), binary=True)
+file_system.make_directory("archive")
+assert file_system.list_files() == ["archive", "blob.bin", "notes.txt"]
+assert os.getcwd() == original_directory
+assert file_system.backend.stats()["write_backs"] > 0
+
+out = io.StringIO()
+file_system.read_file("notes.txt", tail=2, out=out)
+assert out.getvalue().endswith("note 99\nend\n\n")
+
+# Test rename, move into a directory and recursive delete
+file_system.rename("blob.bin", "data.bin")
+file_system.move("notes.txt", "archive")
+assert file_system.list_files("archive") == ["notes.txt"]
+file_system.change_directory("..")
+file_system.delete("missing")
+file_system.create_file("scratch.txt")
+file_system.delete("scratch.txt")
+assert file_system.list_files() == ["docs"]
+
+# Test concurrent writers sharing the backend
+def writer(index):
+    file_system.write_file(f"/docs/thread{index}.txt", "x" * 500)
+
+
+threads = [threading.Thread(target=writer, args=(index,)) for index in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert len(file_system.list_files("docs", pattern="thread*")) == 8
+
+# Test the image reopens with the same tree and contents
+file_system.close()
+reopened = FileSystem(MemoryBackend(image_path, cache_blocks=4))
+assert reopened.list_files("/docs") == ["archive", "data.bin"] + [f"thread{index}.txt" for index in range(8)]
+assert b"".join(reopened.iter_chunks("/docs/data.bin")) == bytes(range(200))
+assert b"".join(reopened.iter_chunks("/docs/archive/notes.txt")).startswith(b"note 0\nnote 1\n")
+
+# Test blocks allocated after a flush never overwrite the flushed inode table
+reopened.backend.flush()
+reopened.write_file("/grown.txt", "y" * 5000)
+reopened.backend.flush()
+reopened.write_file("/more.txt", "z" * 5000)  # Written back through the tiny cache before the next flush
+reopened.backend.image.flush()
+again = FileSystem(MemoryBackend(image_path, cache_blocks=4))
+assert again.list_files("/") == ["docs", "grown.txt"]
+assert b"".join(again.iter_chunks("/grown.txt")) == b"y" * 5000
+assert b"".join(again.iter_chunks("/docs/data.bin")) == bytes(range(200))
+again.close()
+reopened.close()
+reopened = FileSystem(MemoryBackend(image_path, cache_blocks=4))
+assert b"".join(reopened.iter_chunks("/more.txt")) == b"z" * 5000
+reopened.delete("/docs")
+reopened.delete("/grown.txt")
+reopened.delete("/more.txt")
+assert reopened.backend.stats()["blocks_used"] == 0
+reopened.close()
+
+print("VFS test completed successfully!")
@@ -0,0 +1,484 @@
+import contextlib
+import errno
+import json
+import mmap
+import os
+import posixpath
+import shutil
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+
+IMAGE_MAGIC = b"OVFS"
+IMAGE_HEADER = struct.Struct("<4sI")  # magic, block size; the inode table is in METADATA_SUFFIX
+METADATA_SUFFIX = ".meta"  # The inode table lives beside the image, so growing block data can never overwrite it
+ROOT_INODE = 1
+
+
+class OSBackend:
+    """The host filesystem. Paths are absolute host paths; the process cwd is never changed."""
+
+    name = "os"
+
+    def __init__(self):
+        self.root = os.getcwd()
+
+    def join(self, base, path):
+        return os.path.abspath(os.path.join(base, path))
+
+    basename = staticmethod(os.path.basename)
+
+    def scandir(self, path):
+        """Yield (name, kind, size, mtime) for every entry, using the stat data scandir already has."""
+        with os.scandir(path) as iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir():
+                        kind = "dir"
+                    elif entry.is_file():
+                        kind = "file"
+                    else:
+                        kind = "other"
+                    info = entry.stat()
+                except OSError:
+                    continue  # Removed while we were listing
+                yield entry.name, kind, info.st_size if kind == "file" else 0, info.st_mtime
+
+    def stat(self, path):
+        """Return (kind, size, mtime); raises FileNotFoundError."""
+        info = os.stat(path)
+        if os.path.isdir(path):
+            return "dir", 0, info.st_mtime
+        return "file", info.st_size, info.st_mtime
+
+    def mkdir(self, path):
+        os.mkdir(path)
+
+    def remove(self, path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    def rename(self, old_path, new_path):
+        os.rename(old_path, new_path)
+
+    def move(self, source_path, destination_path):
+        shutil.move(source_path, destination_path)
+
+    def open(self, path, mode):
+        return open(path, mode)
+
+    @contextlib.contextmanager
+    def map(self, path):
+        """Memory-map a file read-only. Empty files map to b""."""
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def close(self):
+        pass
+
+
+class _Inode:
+    __slots__ = ("number", "kind", "size", "mtime", "blocks", "entries")
+
+    def __init__(self, number, kind):
+        self.number = number
+        self.kind = kind
+        self.size = 0
+        self.mtime = time.time()
+        self.blocks = [] if kind == "file" else None   # Block numbers holding a file's data
+        self.entries = {} if kind == "dir" else None   # Name -> inode number for a directory
+
+
+class _MemoryFile:
+    """A binary file handle on a MemoryBackend inode."""
+
+    def __init__(self, backend, inode, append):
+        self.backend = backend
+        self.inode = inode
+        self.position = inode.size if append else 0
+        self.closed = False
+
+    def read(self, size=-1):
+        data = self.backend._read(self.inode, self.position, size)
+        self.position += len(data)
+        return data
+
+    def write(self, data):
+        self.backend._write(self.inode, self.position, data)
+        self.position += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            offset += self.inode.size
+        self.position = max(offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, image_path=None, block_size=4096, cache_blocks=1024, total_blocks=None):
+        """Initialize an in-memory filesystem.
+
+        Files and directories are inodes in an inode table; file data lives in
+        fixed-size blocks. Path lookups go through a dentry cache mapping whole
+        paths to inodes, so repeated lookups are O(1) whatever the depth. With
+        ``image_path``, blocks are cached in an LRU of ``cache_blocks`` blocks,
+        dirty blocks are written back to the image on eviction, and
+        ``flush``/``close`` persist the inode table to ``image_path + ".meta"``,
+        replacing it atomically, so the image can be reopened with the tree as
+        of the last flush. Blocks evicted since then may already hold newer
+        file data. Without one,
+        everything stays in memory. Every operation holds one lock, so the
+        backend is safe to share between threads.
+        """
+        self.root = "/"
+        self.block_size = block_size
+        self.total_blocks = total_blocks  # None for unlimited
+        self.cache_blocks = cache_blocks if image_path else None
+        self.lock = threading.RLock()
+        self.inodes = {}            # Inode number -> _Inode
+        self.next_inode = ROOT_INODE
+        self.dentries = {}          # Normalized path -> inode number
+        self.free_blocks = []       # Released block numbers, reused first
+        self.next_block = 0         # Blocks below this have been handed out at some point
+        self.cache = OrderedDict()  # Block number -> bytearray, least recently used first
+        self.dirty = set()          # Cached blocks that differ from the image
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.write_backs = 0
+        self.image_path = image_path
+        self.metadata_path = image_path + METADATA_SUFFIX if image_path else None
+        self.image = None
+        if image_path and os.path.exists(image_path) and os.path.getsize(image_path) > 0:
+            self.image = open(image_path, "r+b")
+            self._load_image()
+        else:
+            if image_path:
+                self.image = open(image_path, "w+b")
+            root = self._new_inode("dir")
+            self.dentries["/"] = root.number
+
+    # Paths and lookup
+
+    def join(self, base, path):
+        return posixpath.normpath(posixpath.join(base, path)).replace("//", "/")
+
+    basename = staticmethod(posixpath.basename)
+
+    def _lookup(self, path):
+        """Return the inode at a normalized path, filling the dentry cache along the way."""
+        number = self.dentries.get(path)
+        if number is not None:
+            return self.inodes[number]
+        inode = self.inodes[ROOT_INODE]
+        prefix = ""
+        for name in path.strip("/").split("/"):
+            prefix += "/" + name
+            number = self.dentries.get(prefix)
+            if number is None:
+                if inode.kind != "dir":
+                    raise NotADirectoryError(errno.ENOTDIR, "Not a directory", prefix)
+                number = inode.entries.get(name)
+                if number is None:
+                    raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+                self.dentries[prefix] = number
+            inode = self.inodes[number]
+        return inode
+
+    def _parent(self, path):
+        """Return (parent directory inode, name) for a path that is about to be created or removed."""
+        parent_path, name = posixpath.split(path)
+        if not name:
+            raise PermissionError(errno.EPERM, "Operation not permitted", path)
+        parent = self._lookup(parent_path)
+        if parent.kind != "dir":
+            raise NotADirectoryError(errno.ENOTDIR, "Not a directory", parent_path)
+        return parent, name
+
+    def _forget(self, path):
+        """Drop a path and everything below it from the dentry cache."""
+        self.dentries.pop(path, None)
+        prefix = path + "/"
+        for cached in [cached for cached in self.dentries if cached.startswith(prefix)]:
+            del self.dentries[cached]
+
+    # Inodes and blocks
+
+    def _new_inode(self, kind):
+        inode = _Inode(self.next_inode, kind)
+        self.inodes[inode.number] = inode
+        self.next_inode += 1
+        return inode
+
+    def _release(self, inode):
+        """Free an inode, its blocks and, for a directory, everything in it."""
+        if inode.kind == "dir":
+            for number in inode.entries.values():
+                self._release(self.inodes[number])
+        else:
+            self._free_blocks(inode)
+        del self.inodes[inode.number]
+
+    def _free_blocks(self, inode):
+        for block in inode.blocks:
+            self.cache.pop(block, None)
+            self.dirty.discard(block)
+            self.free_blocks.append(block)
+        inode.blocks = []
+        inode.size = 0
+
+    def _allocate_block(self):
+        if self.free_blocks:
+            block = self.free_blocks.pop()
+        elif self.total_blocks is not None and self.next_block >= self.total_blocks:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        else:
+            block = self.next_block
+            self.next_block += 1
+        self._cache_block(block, bytearray(self.block_size))
+        self.dirty.add(block)
+        return block
+
+    def _cache_block(self, block, data):
+        self.cache[block] = data
+        if self.cache_blocks is not None:
+            while len(self.cache) > self.cache_blocks:
+                victim, victim_data = self.cache.popitem(last=False)
+                if victim in self.dirty:
+                    self._write_back(victim, victim_data)
+
+    def _write_back(self, block, data):
+        self.image.seek(self.block_size * (block + 1))  # Block 0 of the image holds the header
+        self.image.write(data)
+        self.dirty.discard(block)
+        self.write_backs += 1
+
+    def _block(self, block):
+        """Return a block's data from the cache, reading it from the image on a miss."""
+        data = self.cache.get(block)
+        if data is not None:
+            self.cache_hits += 1
+            self.cache.move_to_end(block)
+            return data
+        self.cache_misses += 1
+        self.image.seek(self.block_size * (block + 1))
+        data = bytearray(self.image.read(self.block_size).ljust(self.block_size, b"\0"))
+        self._cache_block(block, data)
+        return data
+
+    def _read(self, inode, position, size):
+        with self.lock:
+            end = inode.size if size is None or size < 0 else min(inode.size, position + size)
+            pieces = []
+            while position < end:
+                index, offset = divmod(position, self.block_size)
+                count = min(self.block_size - offset, end - position)
+                pieces.append(bytes(self._block(inode.blocks[index])[offset:offset + count]))
+                position += count
+            return b"".join(pieces)
+
+    def _write(self, inode, position, data):
+        with self.lock:
+            data = memoryview(data).cast("B")
+            end = position + len(data)
+            while len(inode.blocks) * self.block_size < end:
+                inode.blocks.append(self._allocate_block())
+            written = 0
+            while written < len(data):
+                index, offset = divmod(position + written, self.block_size)
+                count = min(self.block_size - offset, len(data) - written)
+                block = inode.blocks[index]
+                self._block(block)[offset:offset + count] = data[written:written + count]
+                self.dirty.add(block)
+                written += count
+            inode.size = max(inode.size, end)
+            inode.mtime = time.time()
+
+    # Backend interface
+
+    def scandir(self, path):
+        with self.lock:
+            directory = self._lookup(path)
+            if directory.kind != "dir":
+                raise NotADirectoryError(errno.ENOTDIR, "Not a directory", path)
+            entries = []
+            for name, number in directory.entries.items():
+                inode = self.inodes[number]
+                entries.append((name, inode.kind, inode.size, inode.mtime))
+        return iter(entries)
+
+    def stat(self, path):
+        with self.lock:
+            inode = self._lookup(path)
+            return inode.kind, inode.size, inode.mtime
+
+    def mkdir(self, path):
+        with self.lock:
+            parent, name = self._parent(path)
+            if name in parent.entries:
+                raise FileExistsError(errno.EEXIST, "File exists", path)
+            parent.entries[name] = self._new_inode("dir").number
+            parent.mtime = time.time()
+
+    def remove(self, path):
+        with self.lock:
+            parent, name = self._parent(path)
+            number = parent.entries.pop(name, None)
+            if number is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+            self._release(self.inodes[number])
+            parent.mtime = time.time()
+            self._forget(path)
+
+    def rename(self, old_path, new_path):
+        with self.lock:
+            old_parent, old_name = self._parent(old_path)
+            new_parent, new_name = self._parent(new_path)
+            number = old_parent.entries.get(old_name)
+            if number is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", old_path)
+            if new_path == old_path:
+                return
+            if new_path.startswith(old_path + "/"):
+                raise OSError(errno.EINVAL, "Cannot move a directory into itself", new_path)
+            replaced = new_parent.entries.get(new_name)
+            if replaced is not None:
+                if self.inodes[replaced].kind == "dir":
+                    raise IsADirectoryError(errno.EISDIR, "Is a directory", new_path)
+                self._release(self.inodes[replaced])
+            del old_parent.entries[old_name]
+            new_parent.entries[new_name] = number
+            old_parent.mtime = new_parent.mtime = time.time()
+            self._forget(old_path)
+            self._forget(new_path)
+
+    move = rename
+
+    def open(self, path, mode):
+        """Open a file in "rb", "wb" or "ab" mode, creating it for writes."""
+        with self.lock:
+            if mode == "rb":
+                inode = self._lookup(path)
+            else:
+                parent, name = self._parent(path)
+                number = parent.entries.get(name)
+                if number is None:
+                    inode = self._new_inode("file")
+                    parent.entries[name] = inode.number
+                    parent.mtime = time.time()
+                else:
+                    inode = self.inodes[number]
+                    if inode.kind == "file" and mode == "wb":
+                        self._free_blocks(inode)
+            if inode.kind != "file":
+                raise IsADirectoryError(errno.EISDIR, "Is a directory", path)
+            return _MemoryFile(self, inode, append=mode == "ab")
+
+    @contextlib.contextmanager
+    def map(self, path):
+        """Yield a file's whole content. Memory files have nothing to map, so this is a copy."""
+        with self.lock:
+            inode = self._lookup(path)
+            if inode.kind != "file":
+                raise IsADirectoryError(errno.EISDIR, "Is a directory", path)
+            data = self._read(inode, 0, -1)
+        yield data
+
+    def stats(self):
+        with self.lock:
+            lookups = self.cache_hits + self.cache_misses
+            return {
+                "inodes": len(self.inodes),
+                "blocks_used": self.next_block - len(self.free_blocks),
+                "cached_blocks": len(self.cache),
+                "dirty_blocks": len(self.dirty),
+                "dentries": len(self.dentries),
+                "cache_hit_ratio": self.cache_hits / lookups if lookups else 0.0,
+                "write_backs": self.write_backs,
+            }
+
+    # Image persistence
+
+    def flush(self):
+        """Write dirty blocks to the image, then replace the inode table beside it."""
+        if self.image is None:
+            return
+        with self.lock:
+            for block in sorted(self.dirty):
+                self._write_back(block, self.cache[block])
+            metadata = json.dumps({
+                "next_inode": self.next_inode,
+                "next_block": self.next_block,
+                "free_blocks": self.free_blocks,
+                "inodes": [[inode.number, inode.kind, inode.size, inode.mtime,
+                            inode.blocks if inode.kind == "file" else inode.entries]
+                           for inode in self.inodes.values()],
+            }).encode()
+            self.image.seek(0)
+            self.image.write(IMAGE_HEADER.pack(IMAGE_MAGIC, self.block_size))
+            self.image.flush()
+            os.fsync(self.image.fileno())  # Blocks are on disk before an inode table that points at them
+            temporary = self.metadata_path + ".tmp"
+            with open(temporary, "wb") as file:
+                file.write(metadata)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.metadata_path)
+
+    def _load_image(self):
+        magic, block_size = IMAGE_HEADER.unpack(self.image.read(IMAGE_HEADER.size))
+        if magic != IMAGE_MAGIC:
+            raise ValueError(f"'{self.image_path}' is not a filesystem image.")
+        self.block_size = block_size
+        with open(self.metadata_path, "rb") as file:
+            metadata = json.loads(file.read())
+        self.next_inode = metadata["next_inode"]
+        self.next_block = metadata["next_block"]
+        self.free_blocks = metadata["free_blocks"]
+        for number, kind, size, mtime, contents in metadata["inodes"]:
+            inode = _Inode(number, kind)
+            inode.size = size
+            inode.mtime = mtime
+            if kind == "file":
+                inode.blocks = contents
+            else:
+                inode.entries = contents
+            self.inodes[number] = inode
+        self.dentries["/"] = ROOT_INODE
+
+    def close(self):
+        """Flush to the image and close it."""
+        if self.image is not None:
+            self.flush()
+            self.image.close()
+            self.image = None
+
+
+BACKENDS = {
+    "os": OSBackend,
+    "memory": MemoryBackend,
+}
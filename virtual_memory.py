@@ -0,0 +1,376 @@
+import random
+import time
+from collections import OrderedDict
+
+
+class LRUPolicy:
+    """Evict the page that was used least recently."""
+
+    def __init__(self, frame_count):
+        self.pages = OrderedDict()  # Oldest first
+
+    def touch(self, page):
+        self.pages.move_to_end(page)
+
+    def insert(self, page):
+        self.pages[page] = None
+
+    def evict(self, incoming):
+        return self.pages.popitem(last=False)[0]
+
+    def remove(self, page):
+        self.pages.pop(page, None)
+
+
+class ClockPolicy:
+    """Second-chance replacement: a hand sweeps frames, clearing reference bits."""
+
+    def __init__(self, frame_count):
+        self.slots = [None] * frame_count  # Page in each clock slot
+        self.referenced = [False] * frame_count
+        self.position = {}  # Page -> slot
+        self.free_slots = list(range(frame_count - 1, -1, -1))
+        self.hand = 0
+
+    def touch(self, page):
+        self.referenced[self.position[page]] = True
+
+    def insert(self, page):
+        slot = self.free_slots.pop()
+        self.slots[slot] = page
+        self.referenced[slot] = True
+        self.position[page] = slot
+
+    def evict(self, incoming):
+        while True:
+            slot = self.hand
+            self.hand = (self.hand + 1) % len(self.slots)
+            page = self.slots[slot]
+            if page is None:
+                continue
+            if self.referenced[slot]:
+                self.referenced[slot] = False
+            else:
+                self.remove(page)
+                return page
+
+    def remove(self, page):
+        slot = self.position.pop(page, None)
+        if slot is not None:
+            self.slots[slot] = None
+            self.referenced[slot] = False
+            self.free_slots.append(slot)
+
+
+class LFUPolicy:
+    """Evict the least frequently used page, oldest first among ties, in O(1)."""
+
+    def __init__(self, frame_count):
+        self.frequency = {}  # Page -> use count
+        self.buckets = {}    # Use count -> pages in insertion order
+        self.min_frequency = 0
+
+    def _unlink(self, page):
+        count = self.frequency[page]
+        bucket = self.buckets[count]
+        del bucket[page]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_frequency == count:
+                self.min_frequency = count + 1
+        return count
+
+    def touch(self, page):
+        count = self._unlink(page) + 1
+        self.frequency[page] = count
+        self.buckets.setdefault(count, OrderedDict())[page] = None
+
+    def insert(self, page):
+        self.frequency[page] = 1
+        self.buckets.setdefault(1, OrderedDict())[page] = None
+        self.min_frequency = 1
+
+    def evict(self, incoming):
+        while self.min_frequency not in self.buckets:
+            self.min_frequency += 1
+        page = next(iter(self.buckets[self.min_frequency]))
+        self._unlink(page)
+        del self.frequency[page]
+        return page
+
+    def remove(self, page):
+        if page in self.frequency:
+            self._unlink(page)
+            del self.frequency[page]
+
+
+class ARCPolicy:
+    """Adaptive Replacement Cache (Megiddo and Modha).
+
+    Resident pages are split between T1 (seen once recently) and T2 (seen at
+    least twice). Ghost lists B1 and B2 remember recently evicted pages, and a
+    hit in either shifts the target size ``p`` of T1 towards whichever list
+    would have kept the page.
+    """
+
+    def __init__(self, frame_count):
+        self.capacity = frame_count
+        self.p = 0  # Target size of T1
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        self.adapted = None  # Ghost page whose hit has already moved p
+
+    def _adapt(self, page):
+        """Shift the T1 target after a ghost hit, once per incoming page."""
+        if page == self.adapted:
+            return
+        if page in self.b1:
+            self.p = min(self.capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+        elif page in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+        else:
+            return
+        self.adapted = page
+
+    def touch(self, page):
+        if page in self.t1:
+            del self.t1[page]
+        else:
+            del self.t2[page]
+        self.t2[page] = None
+
+    def insert(self, page):
+        self._adapt(page)
+        self.adapted = None
+        if page in self.b1:
+            del self.b1[page]
+            self.t2[page] = None
+        elif page in self.b2:
+            del self.b2[page]
+            self.t2[page] = None
+        else:
+            # Brand new page: keep the directory bounded at twice the cache size
+            if len(self.t1) + len(self.b1) >= self.capacity and self.b1:
+                self.b1.popitem(last=False)
+            elif len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) >= 2 * self.capacity and self.b2:
+                self.b2.popitem(last=False)
+            self.t1[page] = None
+
+    def evict(self, incoming):
+        self._adapt(incoming)
+        if self.t1 and (len(self.t1) > self.p or (incoming in self.b2 and len(self.t1) == self.p) or not self.t2):
+            page = self.t1.popitem(last=False)[0]
+            self.b1[page] = None
+        else:
+            page = self.t2.popitem(last=False)[0]
+            self.b2[page] = None
+        return page
+
+    def remove(self, page):
+        for queue in (self.t1, self.t2, self.b1, self.b2):
+            queue.pop(page, None)
+
+
+POLICIES = {
+    "lru": LRUPolicy,
+    "clock": ClockPolicy,
+    "lfu": LFUPolicy,
+    "arc": ARCPolicy,
+}
+
+
+class VirtualMemory:
+    def __init__(self, frame_count, swap_pages=0, policy="lru", page_size=1):
+        """Initialize the virtual memory layer.
+
+        ``frame_count`` physical frames of ``page_size`` MB back every task's
+        pages; pages that do not fit are evicted to a swap area of
+        ``swap_pages`` pages, so tasks may together commit up to
+        ``frame_count + swap_pages`` pages.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown page replacement policy '{policy}'.")
+        self.frame_count = frame_count
+        self.swap_pages = swap_pages
+        self.page_size = page_size
+        self.policy_name = policy
+        self.policy = POLICIES[policy](frame_count)
+        self.page_tables = {}    # Task -> {virtual page number: frame number, or None if not resident}
+        self.frames = [None] * frame_count  # Frame -> (task, page) held in it
+        self.free_frames = list(range(frame_count - 1, -1, -1))
+        self.swapped = set()     # Pages whose contents live in swap
+        self.dirty = set()       # Resident pages modified since they were loaded
+        self.committed_pages = 0  # Pages promised to tasks, resident or not
+        self.accesses = 0
+        self.hits = 0
+        self.faults = 0
+        self.evictions = 0
+        self.swap_ins = 0
+        self.swap_outs = 0
+
+    def create_address_space(self, task_name, pages):
+        """Give a task ``pages`` virtual pages. Returns False if that would overcommit swap."""
+        if task_name in self.page_tables:
+            return False
+        if self.committed_pages + pages > self.frame_count + self.swap_pages:
+            return False
+        self.page_tables[task_name] = dict.fromkeys(range(pages))
+        self.committed_pages += pages
+        return True
+
+    def release(self, task_name):
+        """Free every frame and swap slot held by a task."""
+        table = self.page_tables.pop(task_name, None)
+        if table is None:
+            return
+        for vpn, frame in table.items():
+            page = (task_name, vpn)
+            if frame is not None:
+                self.policy.remove(page)
+                self.frames[frame] = None
+                self.free_frames.append(frame)
+                self.dirty.discard(page)
+            self.swapped.discard(page)
+        self.committed_pages -= len(table)
+
+    def access(self, task_name, vpn, write=False):
+        """Reference one page, faulting it in if needed. Returns True on a hit."""
+        table = self.page_tables[task_name]
+        if vpn not in table:
+            raise IndexError(f"Page {vpn} is outside the address space of '{task_name}'.")
+        page = (task_name, vpn)
+        self.accesses += 1
+        if table[vpn] is not None:
+            self.hits += 1
+            self.policy.touch(page)
+            if write:
+                self.dirty.add(page)
+            return True
+
+        self.faults += 1
+        if self.free_frames:
+            frame = self.free_frames.pop()
+        else:
+            frame = self._evict(page)
+        if page in self.swapped:
+            self.swapped.discard(page)
+            self.swap_ins += 1
+        table[vpn] = frame
+        self.frames[frame] = page
+        self.policy.insert(page)
+        if write:
+            self.dirty.add(page)
+        return False
+
+    def _evict(self, incoming):
+        """Evict a victim chosen by the policy and return its frame."""
+        victim = self.policy.evict(incoming)
+        victim_task, victim_vpn = victim
+        table = self.page_tables[victim_task]
+        frame = table[victim_vpn]
+        table[victim_vpn] = None
+        self.evictions += 1
+        if victim in self.dirty:
+            # Only modified pages need writing back to swap
+            self.dirty.discard(victim)
+            self.swapped.add(victim)
+            self.swap_outs += 1
+        return frame
+
+    def touch_all(self, task_name, write=False):
+        """Reference every page of a task, as when it is scheduled to run."""
+        for vpn in range(len(self.page_tables.get(task_name, ()))):
+            self.access(task_name, vpn, write)
+
+    def hit_ratio(self):
+        return self.hits / self.accesses if self.accesses else 0.0
+
+    def fault_rate(self):
+        return self.faults / self.accesses if self.accesses else 0.0
+
+    def stats(self):
+        """Return a dict of counters and ratios."""
+        return {
+            "policy": self.policy_name,
+            "frames": self.frame_count,
+            "resident": self.frame_count - len(self.free_frames),
+            "committed_pages": self.committed_pages,
+            "accesses": self.accesses,
+            "hits": self.hits,
+            "faults": self.faults,
+            "evictions": self.evictions,
+            "swap_ins": self.swap_ins,
+            "swap_outs": self.swap_outs,
+            "hit_ratio": self.hit_ratio(),
+            "fault_rate": self.fault_rate(),
+        }
+
+
+def uniform_trace(tasks, pages, length, seed=0):
+    """Yield ``(task, vpn, write)`` references spread evenly over every page."""
+    rng = random.Random(seed)
+    for _ in range(length):
+        yield rng.randrange(tasks), rng.randrange(pages), rng.random() < 0.3
+
+
+def hot_cold_trace(tasks, pages, length, hot_fraction=0.2, hot_probability=0.8, seed=0):
+    """Yield references where ``hot_probability`` of accesses hit the first ``hot_fraction`` of pages."""
+    rng = random.Random(seed)
+    hot_pages = max(1, int(pages * hot_fraction))
+    for _ in range(length):
+        if rng.random() < hot_probability:
+            vpn = rng.randrange(hot_pages)
+        else:
+            vpn = rng.randrange(pages)
+        yield rng.randrange(tasks), vpn, rng.random() < 0.3
+
+
+def looping_trace(tasks, pages, length, seed=0):
+    """Yield each task sweeping its pages in order, the classic worst case for LRU."""
+    rng = random.Random(seed)
+    positions = [0] * tasks
+    for _ in range(length):
+        task = rng.randrange(tasks)
+        yield task, positions[task], False
+        positions[task] = (positions[task] + 1) % pages
+
+
+def scan_mixed_trace(tasks, pages, length, seed=0):
+    """Yield a hot working set interrupted by long one-off scans."""
+    rng = random.Random(seed)
+    hot_pages = max(1, pages // 10)
+    while length > 0:
+        for _ in range(min(length, 1000)):
+            yield rng.randrange(tasks), rng.randrange(hot_pages), rng.random() < 0.3
+        length -= 1000
+        scan = min(length, pages)
+        task = rng.randrange(tasks)
+        for vpn in range(scan):
+            yield task, vpn, False
+        length -= scan
+
+
+TRACES = {
+    "uniform": uniform_trace,
+    "hot_cold": hot_cold_trace,
+    "looping": looping_trace,
+    "scan_mixed": scan_mixed_trace,
+}
+
+
+def simulate(policy, frame_count, trace, tasks, pages):
+    """Replay a trace against a fresh VirtualMemory and return its stats plus throughput."""
+    memory = VirtualMemory(frame_count, swap_pages=tasks * pages, policy=policy)
+    for task in range(tasks):
+        memory.create_address_space(task, pages)
+    access = memory.access
+    start = time.perf_counter()
+    for task, vpn, write in trace:
+        access(task, vpn, write)
+    elapsed = time.perf_counter() - start
+    stats = memory.stats()
+    stats["seconds"] = elapsed
+    stats["accesses_per_second"] = stats["accesses"] / elapsed if elapsed else 0.0
+    return stats